@@ -260,7 +260,6 @@ class Command(BaseCommand):
     def _refresh_affected_indexes(self, credential_type_id, affected_topics):
         """Perform targeted search index refresh for affected topics"""
         try:
-            from api.v2.models.Topic import Topic
             from api.v2.search_indexes import CredentialIndex
             from api.v3.indexes.Topic import TopicIndex
             from haystack import connections
@@ -282,7 +281,9 @@ class Command(BaseCommand):
                 
                 # Update TopicIndex for affected topics
                 topic_index = TopicIndex()
-                topics_to_update = Topic.objects.filter(id__in=affected_topics)
+                topics_to_update = topic_index.index_queryset().filter(
+                    id__in=affected_topics
+                )
                 
                 if topics_to_update.exists():
                     self.stdout.write(
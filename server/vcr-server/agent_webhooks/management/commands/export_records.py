@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.v4.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORTS,
+    export_lines,
+    export_timestamp,
+    parse_updated_since,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports topics or credentials as newline-delimited JSON, optionally only "
+        "the records updated since a timestamp."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(EXPORTS))
+        parser.add_argument(
+            "--updated-since",
+            help="Only export records updated after this ISO 8601 timestamp",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Number of rows fetched from the database at a time",
+        )
+        parser.add_argument(
+            "--output", help="File to write the records to (default: stdout)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            updated_since = parse_updated_since(options["updated_since"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = timezone.now()
+        lines = export_lines(options["kind"], updated_since, options["chunk_size"])
+        count = 0
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                for line in lines:
+                    output.write(line)
+                    count += 1
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
+                count += 1
+
+        # the timestamp to pass as --updated-since to the next export
+        self.stderr.write(
+            f"Exported {count} {options['kind']} record(s); export timestamp: "
+            f"{export_timestamp(started)}"
+        )
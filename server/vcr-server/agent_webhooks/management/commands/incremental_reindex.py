@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.v2.models.SearchIndexCheckpoint import SearchIndexCheckpoint
+
+SEARCH_INDEXES = {
+    "credential": "api.v2.search_indexes.CredentialIndex",
+    "topic": "api.v3.indexes.Topic.TopicIndex",
+    "name": "api.v3.indexes.Name.NameIndex",
+    "address": "api.v3.indexes.Address.AddressIndex",
+}
+
+REINDEX_WORKERS = int(os.getenv("REINDEX_WORKERS") or min(4, os.cpu_count() or 1))
+
+
+def updated_rows(index, since, until):
+    """Rows of the index model updated after since (if any) and up to until."""
+    updated_field = index.get_updated_field()
+    # only ids are read from these rows, index_queryset() is used for the
+    # batches being prepared so its joins and annotations are not computed here
+    rows = index.get_model()._default_manager.all()
+    if since:
+        return rows.filter(
+            **{f"{updated_field}__gt": since, f"{updated_field}__lte": until}
+        )
+    # a full run also picks up rows that were never timestamped
+    return rows.filter(
+        Q(**{f"{updated_field}__lte": until}) | Q(**{f"{updated_field}__isnull": True})
+    )
+
+
+def init_worker():
+    django.setup()
+    connections.close_all()
+
+
+def index_range(index_cls, start, end, since, until, batch_size):
+    """Index the updated rows with ids in [start, end); returns the row count."""
+    index = import_string(index_cls)()
+    backend = index.get_backend()
+    # raise errors so the range is not checkpointed
+    backend.silently_fail = False
+    ids = list(
+        updated_rows(index, since, until)
+        .filter(id__gte=start, id__lt=end)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    for offset in range(0, len(ids), batch_size):
+        rows = index.index_queryset().filter(id__in=ids[offset : offset + batch_size])
+        backend.update(index, list(rows))
+    return len(ids)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reindexes search records updated since the last run, splitting the id space "
+        "into ranges processed in parallel. An interrupted run resumes where it stopped. "
+        "Deleted records are removed by the real-time Solr queue, not by this command."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--index",
+            action="append",
+            choices=sorted(SEARCH_INDEXES),
+            help="Index to update (may be repeated); defaults to all indexes",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=REINDEX_WORKERS,
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of records sent to Solr in each update",
+        )
+        parser.add_argument(
+            "--range-size",
+            type=int,
+            default=10000,
+            help="Number of ids handed to a worker at a time",
+        )
+        parser.add_argument(
+            "--overlap",
+            type=int,
+            default=300,
+            help="Seconds before the high-water mark to include, for late commits",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Discard the stored checkpoints and reindex everything",
+        )
+
+    def handle(self, *args, **options):
+        failed = []
+        for name in options["index"] or sorted(SEARCH_INDEXES):
+            if not self.reindex(SEARCH_INDEXES[name], **options):
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                "Reindexing did not complete for: {}; run again to resume".format(
+                    ", ".join(failed)
+                )
+            )
+
+    def reindex(self, index_cls, **options):
+        checkpoint, _created = SearchIndexCheckpoint.objects.get_or_create(
+            index_cls=index_cls
+        )
+        if options["full"]:
+            checkpoint.high_water = None
+            checkpoint.run_until = None
+        if checkpoint.run_until is None:
+            checkpoint.run_until = timezone.now()
+            checkpoint.set_completed_ranges(())
+            checkpoint.save()
+        else:
+            self.stdout.write(
+                f"Resuming {index_cls} up to {checkpoint.run_until.isoformat()}"
+            )
+
+        since = None
+        if checkpoint.high_water:
+            since = checkpoint.high_water - timedelta(seconds=options["overlap"])
+        until = checkpoint.run_until
+        completed = checkpoint.get_completed_ranges()
+        id_ranges = [
+            id_range
+            for id_range in self.id_ranges(
+                updated_rows(import_string(index_cls)(), since, until),
+                options["range_size"],
+            )
+            if id_range not in completed
+        ]
+        self.stdout.write(
+            f"Reindexing {index_cls}: {len(id_ranges)} id range(s) updated since "
+            f"{since.isoformat() if since else 'the beginning'}"
+        )
+
+        start_time = time.perf_counter()
+        indexed = 0
+        errors = 0
+        for id_range, result in self.run_ranges(
+            index_cls, id_ranges, since, until, **options
+        ):
+            if isinstance(result, Exception):
+                errors += 1
+                self.stderr.write(
+                    f"Failed to index {index_cls} ids {id_range}: {result}"
+                )
+                continue
+            indexed += result
+            completed.add(id_range)
+            checkpoint.set_completed_ranges(completed)
+            checkpoint.save()
+            elapsed = time.perf_counter() - start_time
+            self.stdout.write(
+                f" ... {len(completed)} range(s) done, {indexed} record(s) indexed "
+                f"({indexed / elapsed if elapsed else 0.0:.1f}/sec)"
+            )
+
+        if errors:
+            return False
+        checkpoint.high_water = until
+        checkpoint.run_until = None
+        checkpoint.set_completed_ranges(())
+        checkpoint.save()
+        self.stdout.write(
+            f"Reindexed {indexed} {index_cls} record(s) in "
+            f"{time.perf_counter() - start_time:.1f} sec"
+        )
+        return True
+
+    @staticmethod
+    def id_ranges(rows, range_size):
+        """Id ranges covering the rows, aligned so a resumed run gets the same ranges."""
+        bounds = rows.aggregate(min_id=Min("id"), max_id=Max("id"))
+        if bounds["min_id"] is None:
+            return []
+        first = bounds["min_id"] - bounds["min_id"] % range_size
+        return [
+            (start, start + range_size)
+            for start in range(first, bounds["max_id"] + 1, range_size)
+        ]
+
+    def run_ranges(self, index_cls, id_ranges, since, until, **options):
+        """Yield (id_range, row count or exception) as each range finishes."""
+        args = (since, until, options["batch_size"])
+        if options["workers"] <= 1 or len(id_ranges) <= 1:
+            for start, end in id_ranges:
+                try:
+                    yield (start, end), index_range(index_cls, start, end, *args)
+                except Exception as e:
+                    yield (start, end), e
+            return
+
+        # spawn rather than fork, the caller may be running other threads
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        ) as executor:
+            futures = {
+                executor.submit(index_range, index_cls, start, end, *args): (start, end)
+                for start, end in id_ranges
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
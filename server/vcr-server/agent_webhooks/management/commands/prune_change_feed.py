@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.v2.change_feed import (
+    CHANGE_FEED_BATCH_SIZE,
+    CHANGE_FEED_RETENTION_DAYS,
+    prune_changes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes change feed events older than the retention period. Consumers "
+        "that fall further behind need to export the records again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=CHANGE_FEED_RETENTION_DAYS,
+            help="Number of days of changes to keep",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CHANGE_FEED_BATCH_SIZE,
+            help="Number of events deleted at a time",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        deleted = prune_changes(before, options["batch_size"])
+        self.stdout.write(f"Deleted {deleted} change feed events before {before}")
@@ -1,40 +1,267 @@
-from django.core.management.base import BaseCommand
-from django.db import DEFAULT_DB_ALIAS
-from django.db.models import signals
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count, F, Max, Q
+from django.utils.dateparse import parse_date
 
 from api.v2.models.Credential import Credential
+from api.v2.models.ReprocessCheckpoint import ReprocessCheckpoint
 from agent_webhooks.utils.credential import CredentialManager
 from vcr_server.utils.solrqueue import SolrQueue
 
+LOGGER = logging.getLogger(__name__)
+
+REPROCESS_WORKERS = int(os.getenv("REPROCESS_WORKERS") or min(4, os.cpu_count() or 1))
+
+
+def filtered_credentials(filters):
+    credentials = Credential.objects.all()
+    if filters.get("credential_type"):
+        credentials = credentials.filter(
+            credential_type_id__in=filters["credential_type"]
+        )
+    if filters.get("issuer"):
+        # issuers may be given by id or DID
+        issuer_ids = [issuer for issuer in filters["issuer"] if issuer.isdigit()]
+        issuer_dids = [issuer for issuer in filters["issuer"] if not issuer.isdigit()]
+        credentials = credentials.filter(
+            Q(credential_type__issuer_id__in=issuer_ids)
+            | Q(credential_type__issuer__did__in=issuer_dids)
+        )
+    if filters.get("from_date"):
+        credentials = credentials.filter(
+            effective_date__date__gte=parse_date(filters["from_date"])
+        )
+    if filters.get("to_date"):
+        credentials = credentials.filter(
+            effective_date__date__lte=parse_date(filters["to_date"])
+        )
+    return credentials
+
+
+def init_worker():
+    django.setup()
+    connections.close_all()
+    # search index updates are written to the Solr queue table with each batch
+    SolrQueue("database").setup()
+
+
+def reprocess_range(filters, start, end, batch_size):
+    """
+    Reprocess the matching credentials with ids in [start, end), one
+    transaction per batch. Returns the number reprocessed and the failed ids.
+    """
+    manager = CredentialManager()
+    ids = list(
+        filtered_credentials(filters)
+        .filter(id__gte=start, id__lt=end)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    failed = []
+    for offset in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            credentials = (
+                Credential.objects.filter(id__in=ids[offset : offset + batch_size])
+                .select_related("credential_set", "credential_type", "topic")
+                .order_by("id")
+            )
+            reprocessed = []
+            for credential in credentials:
+                try:
+                    # each credential is reprocessed in its own savepoint
+                    manager.reprocess(credential)
+                    reprocessed.append(credential)
+                except Exception:
+                    LOGGER.exception("Failed to reprocess credential %s", credential.id)
+                    failed.append(credential.id)
+            # Now reindex
+            CredentialManager.send_saved(Credential, reprocessed)
+    return len(ids) - len(failed), failed
+
 
 class Command(BaseCommand):
-    help = "Reprocesses all credentials to populate search database"
+    help = (
+        "Reprocesses credentials to populate search database, splitting the id space "
+        "into ranges processed in parallel. An interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--credential-type",
+            action="append",
+            type=int,
+            help="Only reprocess credentials of this credential type id (may be repeated)",
+        )
+        parser.add_argument(
+            "--issuer",
+            action="append",
+            help="Only reprocess credentials from this issuer id or DID (may be repeated)",
+        )
+        parser.add_argument(
+            "--from-date",
+            help="Only reprocess credentials effective on or after this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--to-date",
+            help="Only reprocess credentials effective on or before this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=REPROCESS_WORKERS,
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of credentials reprocessed in each transaction",
+        )
+        parser.add_argument(
+            "--range-size",
+            type=int,
+            default=5000,
+            help="Number of credential ids handed to a worker at a time",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Discard the checkpoint of a previous run with the same filters",
+        )
 
     def handle(self, *args, **options):
-        queue = SolrQueue()
+        for date_option in ("from_date", "to_date"):
+            if options[date_option] and not parse_date(options[date_option]):
+                raise CommandError(f"Invalid date: {options[date_option]}")
+        queue = SolrQueue("database")
         with queue:
             self.reprocess(queue, *args, **options)
 
     def reprocess(self, queue, *args, **options):
         self.stdout.write("Starting...")
 
-        cred_count = Credential.objects.count()
-        self.stdout.write("Reprocessing {} credentials".format(cred_count))
+        filters = {
+            "credential_type": sorted(options["credential_type"] or []),
+            "issuer": sorted(options["issuer"] or []),
+            "from_date": options["from_date"],
+            "to_date": options["to_date"],
+        }
+        job_key = json.dumps(filters, sort_keys=True)
+        if options["restart"]:
+            ReprocessCheckpoint.objects.filter(job_key=job_key).delete()
+        checkpoint, created = ReprocessCheckpoint.objects.get_or_create(job_key=job_key)
+        if created or checkpoint.max_id is None:
+            # credentials received after the run starts are processed as usual
+            checkpoint.max_id = Credential.objects.aggregate(max_id=Max("id"))["max_id"]
+            checkpoint.save()
+        else:
+            self.stdout.write(f"Resuming previous run with filters {job_key}")
+
+        completed = checkpoint.get_completed_ranges()
+        range_counts = self.range_counts(
+            filtered_credentials(filters).filter(id__lte=checkpoint.max_id or 0),
+            options["range_size"],
+        )
+        pending = [id_range for id_range in range_counts if id_range not in completed]
+        total = sum(range_counts[id_range] for id_range in pending)
+        self.stdout.write(
+            "Reprocessing {} credentials in {} id range(s)".format(total, len(pending))
+        )
 
-        current_cred = 0
-        mgr = CredentialManager()
-        for credential in Credential.objects.all().iterator():
-            current_cred += 1
-            self.stdout.write(
-                "Processing credential id: {} ({} of {})".format(
-                    credential.id, current_cred, cred_count
+        start_time = time.perf_counter()
+        done = 0
+        failed = []
+        errors = 0
+        for id_range, result in self.run_ranges(filters, pending, **options):
+            if isinstance(result, Exception):
+                errors += 1
+                self.stderr.write(f"Failed to reprocess ids {id_range}: {result}")
+                continue
+            count, failed_ids = result
+            done += range_counts[id_range]
+            if failed_ids:
+                # the range is reprocessed again when the run is resumed
+                failed.extend(failed_ids)
+                errors += 1
+            else:
+                completed.add(id_range)
+                checkpoint.set_completed_ranges(completed)
+                checkpoint.save()
+            self.report_progress(done, total, time.perf_counter() - start_time)
+
+        if failed:
+            self.stderr.write(
+                "Failed to reprocess {} credential(s): {}".format(
+                    len(failed), ", ".join(str(cred_id) for cred_id in sorted(failed))
                 )
             )
+        if errors:
+            raise CommandError(
+                f"{errors} id range(s) did not complete; run again to resume"
+            )
+        checkpoint.delete()
+        self.stdout.write(
+            "Done; {} search index update(s) queued".format(queue.qsize())
+        )
 
-            # Remove and recreate search records
-            mgr.reprocess(credential)
+    @staticmethod
+    def range_counts(credentials, range_size):
+        """
+        Credential counts per aligned id range, skipping empty ranges, so a
+        resumed run gets the same ranges.
+        """
+        return {
+            (row["bucket"] * range_size, (row["bucket"] + 1) * range_size): row["count"]
+            for row in credentials.annotate(bucket=F("id") / range_size)
+            .values("bucket")
+            .annotate(count=Count("id"))
+            .order_by("bucket")
+        }
 
-            # Now reindex
-            signals.post_save.send(
-                sender=Credential, instance=credential, using=DEFAULT_DB_ALIAS
+    def report_progress(self, done, total, elapsed):
+        rate = done / elapsed if elapsed else 0.0
+        eta = timedelta(seconds=int((total - done) / rate)) if rate else "unknown"
+        self.stdout.write(
+            " ... {} of {} credentials ({:.1f}%), {:.1f}/sec, ETA {}".format(
+                done, total, 100.0 * done / total if total else 100.0, rate, eta
             )
+        )
+
+    def run_ranges(self, filters, id_ranges, **options):
+        """Yield (id_range, result or exception) as each range finishes."""
+        batch_size = options["batch_size"]
+        if options["workers"] <= 1 or len(id_ranges) <= 1:
+            for start, end in id_ranges:
+                try:
+                    yield (start, end), reprocess_range(filters, start, end, batch_size)
+                except Exception as e:
+                    yield (start, end), e
+            return
+
+        # spawn rather than fork, the Solr queue threads are running
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        ) as executor:
+            futures = {
+                executor.submit(reprocess_range, filters, start, end, batch_size): (
+                    start,
+                    end,
+                )
+                for start, end in id_ranges
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
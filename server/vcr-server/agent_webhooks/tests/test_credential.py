@@ -1,7 +1,12 @@
 from datetime import datetime, timezone
 import json
+from unittest.mock import MagicMock, patch
 
+from django.db import connection
+from django.db.models import signals
 from django.test import TestCase
+from api.v2.models.Topic import Topic
+from subscriptions.models import HookableCredential
 
 from agent_webhooks.utils import credential
 
@@ -52,6 +57,68 @@ class CredentialManager_TestCase(TestCase):
         assert mgr.process_mapping(test_claim_mapping, test_cred) == "attr-value"
         assert mgr.process_mapping(test_processor_mapping, test_cred) == "TEST-VALUE"
 
+    def test_compiled_processor_config(self):
+        test_cred = credential.Credential(
+            {
+                "thread_id": "thread-12345-67890",
+                "schema_id": "schema id",
+                "cred_def_id": "not:a:did:987654",
+                "rev_reg_id": "rev reg id",
+                "attrs": {"attr": "attr-value"},
+            },
+            None,
+        )
+        credential_type = MagicMock(
+            id=-1,
+            processor_config={
+                "topic": {
+                    "source_id": {
+                        "input": "attr",
+                        "from": "claim",
+                        "processor": ["string_helpers.uppercase"],
+                    },
+                    "type": {"input": "topic-type", "from": "value"},
+                },
+                "credential": {
+                    "inactive": {
+                        "input": "x",
+                        "from": "value",
+                        "processor": ["no.such"],
+                    }
+                },
+            },
+        )
+
+        mgr = credential.CredentialManager()
+        compiled = mgr.compiled_processor_config(credential_type)
+        assert mgr.compiled_processor_config(credential_type) is compiled
+        topic_def = compiled["topic"][0]
+        assert mgr.process_mapping(topic_def["source_id"], test_cred) == "ATTR-VALUE"
+        assert mgr.process_mapping(topic_def["type"], test_cred) == "topic-type"
+        # configuration errors are raised when the mapping is used
+        with self.assertRaises(credential.CredentialException):
+            mgr.process_mapping(compiled["credential"]["inactive"], test_cred)
+
+        # an equal config loaded again is not recompiled
+        credential_type.processor_config = json.loads(
+            json.dumps(credential_type.processor_config)
+        )
+        assert mgr.compiled_processor_config(credential_type) is compiled
+
+        # a changed config is
+        credential_type.processor_config = json.loads(
+            json.dumps(credential_type.processor_config).replace(
+                "topic-type", "other-type"
+            )
+        )
+        recompiled = mgr.compiled_processor_config(credential_type)
+        assert recompiled is not compiled
+        assert recompiled["topic"][0]["type"](test_cred) == "other-type"
+
+        mgr.invalidate_processor_config(credential_type.id)
+        assert mgr.compiled_processor_config(credential_type) is not recompiled
+        mgr.invalidate_processor_config(credential_type.id)
+
     def test_resolve_topic(self):
         test_cred = credential.Credential(
             {
@@ -164,3 +231,181 @@ class CredentialManager_TestCase(TestCase):
             "revoked_date": datetime(2001, 1, 1, 12, 0, 0, 0, timezone.utc),
             "revoked": True,
         }
+
+    def test_batch_topic_specs(self):
+        test_cred = credential.Credential(
+            {
+                "thread_id": "thread-12345-67890",
+                "schema_id": "schema id",
+                "cred_def_id": "not:a:did:987654",
+                "rev_reg_id": "rev reg id",
+                "attrs": {"topic_id": "topic-source-id"},
+            },
+            None,
+        )
+        processor_config = {
+            "topic": [
+                {
+                    "source_id": {"input": "topic_id", "from": "claim"},
+                    "type": {"input": "topic-type", "from": "value"},
+                    "related_source_id": {
+                        "input": "related-source-id",
+                        "from": "value",
+                    },
+                    "related_type": {"input": "related-type", "from": "value"},
+                }
+            ]
+        }
+
+        mgr = credential.CredentialManager()
+        topic_spec, related_spec = mgr.batch_topic_specs(test_cred, processor_config)
+        assert topic_spec == ("topic-source-id", "topic-type")
+        assert related_spec == ("related-source-id", "related-type")
+
+        # topics resolved by name can't be batched
+        processor_config["topic"][0]["name"] = {"input": "topic_id", "from": "claim"}
+        assert mgr.batch_topic_specs(test_cred, processor_config) is None
+
+        with self.assertRaises(credential.CredentialException):
+            mgr.batch_topic_specs(test_cred, {"topic": {}})
+
+    def test_process_batch_isolates_errors(self):
+        good_cred = credential.Credential(
+            {
+                "thread_id": "thread-1",
+                "schema_id": "schema id",
+                "cred_def_id": "not:a:did:987654",
+                "rev_reg_id": None,
+                "attrs": {"topic_id": "topic-source-id"},
+            },
+            None,
+        )
+        bad_cred = credential.Credential(
+            {
+                "thread_id": "thread-2",
+                "schema_id": "schema id",
+                "cred_def_id": "not:a:did:987654",
+                "rev_reg_id": None,
+                "attrs": {},
+            },
+            None,
+        )
+        credential_type = MagicMock(
+            processor_config={
+                "topic": {
+                    "source_id": {"input": "topic_id", "from": "claim"},
+                    "type": {"input": "topic-type", "from": "value"},
+                }
+            }
+        )
+
+        mgr = credential.CredentialManager()
+        with patch.object(
+            mgr, "get_credential_type", return_value=credential_type
+        ), patch.object(
+            mgr, "populate_application_database_batch", return_value=["db-cred"]
+        ) as mock_populate:
+            results = mgr.process_batch([bad_cred, good_cred])
+
+        entries = mock_populate.call_args[0][0]
+        assert len(entries) == 1
+        assert entries[0]["topic_spec"] == ("topic-source-id", "topic-type")
+        assert results[0].db_credential is None
+        assert isinstance(results[0].error, credential.CredentialException)
+        assert results[1] == credential.BatchResult(good_cred, "db-cred", None)
+
+    def test_bulk_insert_signals(self):
+        handler = MagicMock()
+        signals.post_save.connect(handler, sender=HookableCredential, weak=False)
+        try:
+            with patch.object(
+                connection.features, "can_return_ids_from_bulk_insert", True
+            ):
+                credential.CredentialManager.bulk_insert(
+                    HookableCredential,
+                    [HookableCredential(corp_num="BC0000001")],
+                    send_signals=False,
+                )
+                handler.assert_not_called()
+
+                credential.CredentialManager.bulk_insert(
+                    HookableCredential, [HookableCredential(corp_num="BC0000002")]
+                )
+                assert handler.call_count == 1
+
+            # sqlite can't return the new ids, the instances are saved in turn
+            creds = [HookableCredential(corp_num="BC0000003") for _ in range(2)]
+            credential.CredentialManager.bulk_insert(HookableCredential, creds)
+            assert all(cred.pk for cred in creds)
+            assert handler.call_count == 3
+            assert handler.call_args[1]["created"]
+        finally:
+            signals.post_save.disconnect(handler, sender=HookableCredential)
+
+    def test_process_batch_rejects_duplicates(self):
+        creds = [
+            credential.Credential(
+                {
+                    "thread_id": "thread-1",
+                    "schema_id": "schema id",
+                    "cred_def_id": "not:a:did:987654",
+                    "rev_reg_id": None,
+                    "attrs": {"topic_id": "topic-source-id"},
+                },
+                None,
+            )
+            for _ in range(2)
+        ]
+        credential_type = MagicMock(
+            processor_config={
+                "topic": {
+                    "source_id": {"input": "topic_id", "from": "claim"},
+                    "type": {"input": "topic-type", "from": "value"},
+                }
+            }
+        )
+
+        mgr = credential.CredentialManager()
+        with patch.object(
+            mgr, "get_credential_type", return_value=credential_type
+        ), patch.object(
+            mgr, "populate_application_database_batch", return_value=["db-cred"]
+        ) as mock_populate:
+            results = mgr.process_batch(creds)
+
+        assert len(mock_populate.call_args[0][0]) == 1
+        assert results[0] == credential.BatchResult(creds[0], "db-cred", None)
+        assert results[1].db_credential is None
+        assert isinstance(results[1].error, credential.CredentialException)
+
+    def test_resolve_batch_topics_created_elsewhere(self):
+        bulk_create = Topic.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # another worker inserted one of the topics first
+            Topic.objects.get_or_create(source_id="BC0000001", type="registration")
+            return bulk_create(objs, **kwargs)
+
+        handler = MagicMock()
+        signals.post_save.connect(handler, sender=Topic, weak=False)
+        try:
+            with patch.object(
+                Topic.objects, "bulk_create", side_effect=racing_bulk_create
+            ):
+                topics = credential.CredentialManager.resolve_batch_topics(
+                    [("BC0000001", "registration"), ("BC0000002", "registration")]
+                )
+        finally:
+            signals.post_save.disconnect(handler, sender=Topic)
+        assert {spec: created for spec, (_, created) in topics.items()} == {
+            ("BC0000001", "registration"): False,
+            ("BC0000002", "registration"): True,
+        }
+        assert all(topic.pk for topic, _ in topics.values())
+        # post_save is sent for the topic inserted by the batch, so that it is
+        # indexed and added to the change feed
+        sent = [call[1]["instance"] for call in handler.call_args_list]
+        assert [
+            spec for spec, (topic, _) in topics.items() if any(t is topic for t in sent)
+        ] == [("BC0000002", "registration")]
+        assert handler.call_args[1]["created"]
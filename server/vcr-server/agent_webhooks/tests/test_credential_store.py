@@ -0,0 +1,126 @@
+import asyncio
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from api.v2.models.CredentialStoreRequest import CredentialStoreRequest
+
+from agent_webhooks.utils.credential_store import (
+    AGENT_STORE_CALLS,
+    AGENT_STORE_MAX_ATTEMPTS,
+    AGENT_STORE_TIMEOUT,
+    CredentialStoreDispatcher,
+    CredentialStoreError,
+    queue_store_credential,
+    store_lease,
+)
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise Exception(f"HTTP {self.status}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def request(self, method, url, json=None):
+        self.calls.append((method, url))
+        return FakeResponse(self.responses[(method, url)])
+
+
+@override_settings(AGENT_ADMIN_URL="http://agent")
+class CredentialStoreDispatcher_TestCase(TestCase):
+    def store(self, request, responses):
+        dispatcher = CredentialStoreDispatcher()
+        dispatcher._session = FakeSession(responses)
+        dispatcher._semaphore = asyncio.Semaphore(1)
+        error = asyncio.get_event_loop().run_until_complete(dispatcher._store(request))
+        return error, dispatcher._session.calls
+
+    def test_claim_leases_requests(self):
+        queue_store_credential("exch-1", "cred-1")
+        queue_store_credential("exch-2", "cred-2", v="2.0")
+
+        claimed = CredentialStoreDispatcher.claim(10)
+        assert [request.cred_ex_id for request in claimed] == ["exch-1", "exch-2"]
+        # in flight requests are not claimed again
+        assert CredentialStoreDispatcher.claim(10) == []
+
+    def test_store_lease(self):
+        # the lease covers every call of the batch timing out
+        assert store_lease(1, 10) == (AGENT_STORE_CALLS + 1) * AGENT_STORE_TIMEOUT
+        assert (
+            store_lease(100, 10) == (10 * AGENT_STORE_CALLS + 1) * AGENT_STORE_TIMEOUT
+        )
+
+    def test_store(self):
+        request = CredentialStoreRequest(
+            cred_ex_id="exch-1", credential_id="cred-1", version="2.0"
+        )
+        error, calls = self.store(
+            request,
+            {("POST", "http://agent/issue-credential-2.0/records/exch-1/store"): 200},
+        )
+        assert error is None
+        assert len(calls) == 1
+
+        # already in the wallet
+        request.existing = True
+        error, calls = self.store(
+            request, {("GET", "http://agent/credential/cred-1"): 200}
+        )
+        assert error is None
+        assert calls == [("GET", "http://agent/credential/cred-1")]
+
+    def test_store_missing_exchange(self):
+        request = CredentialStoreRequest(cred_ex_id="exch-1", credential_id="cred-1")
+        error, calls = self.store(
+            request,
+            {
+                ("POST", "http://agent/issue-credential/records/exch-1/store"): 404,
+                ("GET", "http://agent/credential/cred-1"): 404,
+            },
+        )
+        assert isinstance(error, CredentialStoreError)
+
+    def test_record(self):
+        for idx in range(3):
+            queue_store_credential(f"exch-{idx}", f"cred-{idx}")
+        requests = CredentialStoreDispatcher.claim(10)
+
+        CredentialStoreDispatcher.record(
+            requests,
+            [None, Exception("HTTP 503"), CredentialStoreError("missing")],
+        )
+
+        # the request that can't be stored is given up and removed
+        (retried,) = CredentialStoreRequest.objects.all()
+        assert retried.cred_ex_id == "exch-1"
+        assert retried.attempts == 1
+        assert retried.next_attempt is not None
+        assert CredentialStoreDispatcher.claim(10) == []
+
+        retried.attempts = AGENT_STORE_MAX_ATTEMPTS - 1
+        CredentialStoreDispatcher.record([retried], [Exception("HTTP 503")])
+        assert not CredentialStoreRequest.objects.exists()
+
+    def test_queue_notifies_dispatcher(self):
+        dispatcher = CredentialStoreDispatcher()
+        with patch.object(CredentialStoreDispatcher, "current", dispatcher), patch(
+            "agent_webhooks.utils.credential_store.transaction.on_commit"
+        ) as mock_on_commit:
+            queue_store_credential("exch-1", "cred-1")
+        mock_on_commit.assert_called_once_with(dispatcher.notify)
@@ -0,0 +1,117 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from api.v2.models.CredentialType import CredentialType
+from api.v2.models.Issuer import Issuer
+from api.v2.models.Schema import Schema
+
+from agent_webhooks.utils.credential_type_cache import (
+    CTYPE_CACHE_CHECK_INTERVAL,
+    CredentialTypeCache,
+    credential_type_cache,
+)
+
+
+class CredentialTypeCache_TestCase(TestCase):
+    def setUp(self):
+        self.issuer = Issuer.objects.create(did="issuer-did", name="issuer")
+        self.schema = Schema.objects.create(
+            name="schema", version="1.0", origin_did="issuer-did"
+        )
+        self.credential_type = CredentialType.objects.create(
+            issuer=self.issuer, schema=self.schema
+        )
+
+    def test_get_loads_once(self):
+        load = MagicMock(return_value=self.credential_type)
+        key = CredentialTypeCache.schema_key("issuer-did", "schema", "1.0")
+
+        assert credential_type_cache.get(key, load) == self.credential_type
+        assert credential_type_cache.get(key, load) == self.credential_type
+        load.assert_called_once()
+
+        # another worker only has the shared cache
+        worker_cache = CredentialTypeCache()
+        assert worker_cache.get(key, load) == self.credential_type
+        load.assert_called_once()
+
+    @patch("agent_webhooks.utils.credential_type_cache.CTYPE_CACHE_CHECK_INTERVAL", 0)
+    def test_registration_invalidates(self):
+        load = MagicMock(return_value=self.credential_type)
+        key = CredentialTypeCache.cred_def_key("issuer-did:3:CL:1:tag")
+        worker_cache = CredentialTypeCache()
+        worker_cache.get(key, load)
+
+        # recording the issue date doesn't discard the entry
+        self.credential_type.save(update_fields=["last_issue_date", "update_timestamp"])
+        worker_cache.get(key, load)
+        assert load.call_count == 1
+
+        self.issuer.save()
+        worker_cache.get(key, load)
+        assert load.call_count == 2
+
+        self.credential_type.description = "re-registered"
+        self.credential_type.save()
+        worker_cache.get(key, load)
+        assert load.call_count == 3
+
+    def test_generation_check_interval(self):
+        load = MagicMock(return_value=self.credential_type)
+        key = CredentialTypeCache.id_key(self.credential_type.id)
+        worker_cache = CredentialTypeCache()
+        worker_cache.get(key, load)
+
+        # registered by another worker, seen once the interval has passed
+        credential_type_cache.invalidate()
+        worker_cache.get(key, load)
+        assert load.call_count == 1
+
+        worker_cache._checked -= CTYPE_CACHE_CHECK_INTERVAL
+        worker_cache.get(key, load)
+        assert load.call_count == 2
+
+    @patch("agent_webhooks.utils.credential_type_cache.CTYPE_CACHE_TTL", 0)
+    def test_entries_expire(self):
+        load = MagicMock(return_value=self.credential_type)
+        key = CredentialTypeCache.id_key(self.credential_type.id)
+        worker_cache = CredentialTypeCache()
+        worker_cache.get(key, load)
+        worker_cache.get(key, load)
+        assert load.call_count == 2
+
+    def test_local_cache_is_bounded(self):
+        worker_cache = CredentialTypeCache(size=2)
+        for type_id in range(3):
+            worker_cache.get(
+                CredentialTypeCache.id_key(type_id), lambda: self.credential_type
+            )
+        assert list(worker_cache._local) == ["id:1", "id:2"]
+
+    def test_labels(self):
+        worker_cache = CredentialTypeCache()
+        self.credential_type.description = "registration"
+        self.credential_type.save()
+        labels = worker_cache.labels()
+        assert labels["issuer"] == {str(self.issuer.id): "issuer"}
+        assert labels["credential_type"] == {
+            str(self.credential_type.id): "registration"
+        }
+
+        with self.assertNumQueries(0):
+            assert worker_cache.labels() is labels
+
+        # registering an issuer refreshes the labels, once the generation is checked
+        self.issuer.name = "renamed issuer"
+        self.issuer.save()
+        worker_cache._checked -= CTYPE_CACHE_CHECK_INTERVAL
+        assert worker_cache.labels()["issuer"] == {
+            str(self.issuer.id): "renamed issuer"
+        }
+
+    @patch("agent_webhooks.utils.credential_type_cache.CTYPE_CACHE_TTL", 0)
+    def test_labels_expire(self):
+        worker_cache = CredentialTypeCache()
+        labels = worker_cache.labels()
+        assert worker_cache.labels() is not labels
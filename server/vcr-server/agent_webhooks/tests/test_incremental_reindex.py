@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from agent_webhooks.management.commands.incremental_reindex import (
+    Command,
+    updated_rows,
+)
+from api.v2.search_indexes import CredentialIndex
+from api.v2.models.SearchIndexCheckpoint import SearchIndexCheckpoint
+from api.v3.indexes.Topic import TopicIndex
+
+CREDENTIAL_INDEX = "api.v2.search_indexes.CredentialIndex"
+
+
+class IncrementalReindex_TestCase(TestCase):
+    def run_command(self):
+        call_command(
+            "incremental_reindex",
+            "--index=credential",
+            "--workers=1",
+            stdout=StringIO(),
+        )
+
+    @patch.object(Command, "id_ranges", return_value=[(0, 100), (100, 200), (200, 300)])
+    @patch("agent_webhooks.management.commands.incremental_reindex.index_range")
+    def test_resumes_after_failed_range(self, mock_index_range, mock_id_ranges):
+        def index_range(index_cls, start, end, since, until, batch_size):
+            if start == 100:
+                raise Exception("Solr is down")
+            return 10
+
+        mock_index_range.side_effect = index_range
+        with self.assertRaises(CommandError):
+            self.run_command()
+
+        checkpoint = SearchIndexCheckpoint.objects.get(index_cls=CREDENTIAL_INDEX)
+        assert checkpoint.high_water is None
+        run_until = checkpoint.run_until
+        assert run_until is not None
+        assert checkpoint.get_completed_ranges() == {(0, 100), (200, 300)}
+
+        # the next run only processes the range that failed
+        mock_index_range.reset_mock()
+        mock_index_range.side_effect = None
+        mock_index_range.return_value = 10
+        self.run_command()
+
+        mock_index_range.assert_called_once_with(
+            CREDENTIAL_INDEX, 100, 200, None, run_until, 500
+        )
+        checkpoint.refresh_from_db()
+        assert checkpoint.high_water == run_until
+        assert checkpoint.run_until is None
+        assert checkpoint.get_completed_ranges() == set()
+
+    @patch.object(Command, "id_ranges", return_value=[])
+    def test_incremental_run_starts_from_high_water(self, mock_id_ranges):
+        self.run_command()
+        checkpoint = SearchIndexCheckpoint.objects.get(index_cls=CREDENTIAL_INDEX)
+        high_water = checkpoint.high_water
+
+        with patch(
+            "agent_webhooks.management.commands.incremental_reindex.updated_rows"
+        ) as mock_updated_rows:
+            self.run_command()
+        since = mock_updated_rows.call_args[0][1]
+        assert since < high_water
+
+    def test_id_ranges_are_aligned(self):
+        class Rows:
+            def aggregate(self, **kwargs):
+                return {"min_id": 1234, "max_id": 3000}
+
+        assert Command.id_ranges(Rows(), 1000) == [
+            (1000, 2000),
+            (2000, 3000),
+            (3000, 4000),
+        ]
+
+    def test_updated_rows(self):
+        now = timezone.now()
+        assert list(updated_rows(CredentialIndex(), None, now)) == []
+        assert list(updated_rows(CredentialIndex(), now, now)) == []
+
+    def test_updated_rows_skip_prepare_annotations(self):
+        rows = updated_rows(TopicIndex(), None, timezone.now())
+        assert not rows.query.annotations
+        assert not rows._prefetch_related_lookups
@@ -0,0 +1,116 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from agent_webhooks.management.commands.reprocess_credentials import (
+    Command,
+    filtered_credentials,
+)
+from api.v2.models.ReprocessCheckpoint import ReprocessCheckpoint
+
+COMMAND = "agent_webhooks.management.commands.reprocess_credentials"
+
+
+@patch(f"{COMMAND}.SolrQueue")
+class ReprocessCredentials_TestCase(TestCase):
+    def run_command(self, *args):
+        stdout = StringIO()
+        call_command(
+            "reprocess_credentials",
+            "--workers=1",
+            *args,
+            stdout=stdout,
+            stderr=StringIO(),
+        )
+        return stdout.getvalue()
+
+    @patch.object(
+        Command,
+        "range_counts",
+        return_value={(0, 100): 10, (100, 200): 20, (200, 300): 30},
+    )
+    @patch(f"{COMMAND}.reprocess_range")
+    def test_resumes_after_failed_range(
+        self, mock_reprocess_range, mock_range_counts, mock_queue
+    ):
+        def reprocess_range(filters, start, end, batch_size):
+            if start == 100:
+                raise Exception("Database is down")
+            return 10, []
+
+        mock_reprocess_range.side_effect = reprocess_range
+        with self.assertRaises(CommandError):
+            self.run_command("--credential-type=1")
+
+        checkpoint = ReprocessCheckpoint.objects.get()
+        assert checkpoint.get_completed_ranges() == {(0, 100), (200, 300)}
+
+        # the next run with the same filters only processes the range that failed
+        mock_reprocess_range.reset_mock()
+        mock_reprocess_range.side_effect = None
+        mock_reprocess_range.return_value = 20, []
+        output = self.run_command("--credential-type=1")
+
+        mock_reprocess_range.assert_called_once_with(
+            {
+                "credential_type": [1],
+                "issuer": [],
+                "from_date": None,
+                "to_date": None,
+            },
+            100,
+            200,
+            100,
+        )
+        assert "20 of 20 credentials (100.0%)" in output
+        assert not ReprocessCheckpoint.objects.exists()
+
+    @patch.object(Command, "range_counts", return_value={(0, 100): 10, (100, 200): 20})
+    @patch(f"{COMMAND}.reprocess_range")
+    def test_retries_range_with_failed_credentials(
+        self, mock_reprocess_range, mock_range_counts, mock_queue
+    ):
+        mock_reprocess_range.side_effect = lambda filters, start, end, batch_size: (
+            (19, [150]) if start == 100 else (10, [])
+        )
+        with self.assertRaises(CommandError):
+            self.run_command()
+
+        checkpoint = ReprocessCheckpoint.objects.get()
+        assert checkpoint.get_completed_ranges() == {(0, 100)}
+
+        mock_reprocess_range.reset_mock()
+        mock_reprocess_range.side_effect = None
+        mock_reprocess_range.return_value = 20, []
+        self.run_command()
+        assert mock_reprocess_range.call_args[0][1:3] == (100, 200)
+        assert not ReprocessCheckpoint.objects.exists()
+
+    @patch.object(Command, "range_counts", return_value={(0, 100): 10})
+    @patch(f"{COMMAND}.reprocess_range", return_value=(10, []))
+    def test_filters_are_tracked_separately(
+        self, mock_reprocess_range, mock_range_counts, mock_queue
+    ):
+        ReprocessCheckpoint.objects.create(
+            job_key="other", max_id=100, completed_ranges="[[0, 100]]"
+        )
+        self.run_command("--issuer=did:sov:abc", "--from-date=2020-01-01")
+        mock_reprocess_range.assert_called_once()
+        assert ReprocessCheckpoint.objects.filter(job_key="other").exists()
+
+    def test_invalid_date(self, mock_queue):
+        with self.assertRaises(CommandError):
+            self.run_command("--to-date=yesterday")
+
+    def test_filtered_credentials(self, mock_queue):
+        filters = {
+            "credential_type": [1],
+            "issuer": ["2", "did:sov:abc"],
+            "from_date": "2020-01-01",
+            "to_date": "2020-12-31",
+        }
+        assert list(filtered_credentials(filters)) == []
+        assert Command.range_counts(filtered_credentials(filters), 100) == {}
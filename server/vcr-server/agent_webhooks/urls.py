@@ -3,7 +3,10 @@ from django.urls import path
 
 from agent_webhooks import views, views_debug
 
-urlpatterns = [path("topic/<topic>/", views.agent_callback)]
+urlpatterns = [
+    path("topic/<topic>/", views.agent_callback),
+    path("credentials/batch/", views.receive_credential_batch),
+]
 
 # expose debug APIs if in debug mode
 if settings.DEBUG:
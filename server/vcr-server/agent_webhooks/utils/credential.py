@@ -4,20 +4,26 @@ import json as _json
 import logging
 import re
 import time
+from bisect import bisect_right
 from collections import namedtuple
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
 from importlib import import_module
 import os
 
 from django.core.exceptions import ValidationError
-from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Q, signals
 from django.db.utils import IntegrityError
 from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime
+from subscriptions.dispatcher import notify_dispatcher
 from subscriptions.models.HookableCredential import HookableCredential
 
+from api.v2.change_feed import record_changes
 from api.v2.models.Address import Address
 from api.v2.models.Attribute import Attribute
+from api.v2.models.ChangeEvent import ChangeEvent
 from api.v2.models.Claim import Claim
 from api.v2.models.Credential import Credential as CredentialModel
 from api.v2.models.CredentialSet import CredentialSet
@@ -28,6 +34,8 @@ from api.v2.models.Schema import Schema
 from api.v2.models.Topic import Topic
 from api.v2.models.TopicRelationship import TopicRelationship
 
+from agent_webhooks.utils.credential_type_cache import credential_type_cache
+
 LOGGER = logging.getLogger(__name__)
 
 PROCESSOR_FUNCTION_BASE_PATH = "api.v2.processor"
@@ -41,6 +49,9 @@ SUPPORTED_MODELS_MAPPING = {
 
 SchemaKey = namedtuple("SchemaKey", "origin_did name version")
 
+# Outcome of one credential in a batch: either db_credential or error is set
+BatchResult = namedtuple("BatchResult", "credential db_credential error")
+
 UPDATE_CRED_TYPE_TIMESTAMP = os.environ.get("UPDATE_CRED_TYPE_TIMESTAMP", "true")
 if UPDATE_CRED_TYPE_TIMESTAMP.upper() == "TRUE":
     print(">>> YES updating cred type timestamp")
@@ -57,7 +68,11 @@ else:
     print(">>> NO not creating detail claims for credentials")
     CREATE_CREDENTIAL_CLAIMS = False
 
-CTYPE_CACHE_MAX_AGE_MINS = int(os.environ.get("CTYPE_CACHE_MAX_AGE_MINS", "10"))
+# max number of credentials accepted by a single batch ingestion request
+MAX_CREDENTIAL_BATCH = int(os.environ.get("MAX_CREDENTIAL_BATCH", "500"))
+
+# compiled processor configs by credential type id: (processor_config, compiled)
+COMPILED_PROCESSOR_CONFIGS = {}
 
 
 def schema_key(s_id: str) -> SchemaKey:
@@ -74,6 +89,34 @@ def schema_key(s_id: str) -> SchemaKey:
     return SchemaKey(*s_key)
 
 
+@lru_cache(maxsize=None)
+def load_processor(function_path_with_name: str):
+    """
+    Resolve a processor function by dot notation. Last token is the
+    function name and all preceeding dots denote path of
+    module starting from `PROCESSOR_FUNCTION_BASE_PATH`
+    """
+    function_path, function_name = function_path_with_name.rsplit(".", 1)
+
+    # Does the file exist?
+    try:
+        function_module = import_module(
+            "{}.{}".format(PROCESSOR_FUNCTION_BASE_PATH, function_path)
+        )
+    except ModuleNotFoundError:
+        raise CredentialException(
+            "No processor module named '{}'".format(function_path)
+        )
+
+    # Does the function exist?
+    try:
+        return getattr(function_module, function_name)
+    except AttributeError:
+        raise CredentialException(
+            "Module '{}' has no function '{}'.".format(function_path, function_name)
+        )
+
+
 class CredentialException(Exception):
     pass
 
@@ -263,20 +306,6 @@ class CredentialManager(object):
     database based on rules provided by issuer are registration.
     """
 
-    def __init__(self) -> None:
-        self._init_ctype_cache()
-
-    def _init_ctype_cache(self):
-        self._cred_type_cache = {}
-        self._cred_type_cache_created = datetime.now()
-        self._cred_type_cache_max_age = self._cred_type_cache_created + timedelta(
-            minutes=CTYPE_CACHE_MAX_AGE_MINS
-        )
-
-    def _reinit_ctype_cache(self):
-        if self._cred_type_cache_max_age < datetime.now():
-            self._init_ctype_cache()
-
     @classmethod
     def get_claims(cls, credential):
         if isinstance(credential, Credential):
@@ -288,10 +317,39 @@ class CredentialManager(object):
     def process_mapping(cls, rules, credential):
         """
         Takes our mapping rules and returns a value from credential
+
+        The rules may be a mapping config or a mapper compiled from one.
+        """
+        mapper = cls.compile_mapping(rules)
+        if mapper is None:
+            return None
+        return mapper(credential)
+
+    @classmethod
+    def compile_mapping(cls, rules):
+        """
+        Compile mapping rules into a function returning the mapped value for a
+        credential, so the processor pipeline is only resolved once.
+
+        Configuration errors are raised when the mapper is called, as they would
+        be when processing the rules directly.
         """
         if not rules:
             return None
+        if callable(rules):
+            return rules
+        try:
+            return cls._compile_mapping(rules)
+        except CredentialException as e:
+            error = e
 
+            def mapper(credential):
+                raise error
+
+            return mapper
+
+    @classmethod
+    def _compile_mapping(cls, rules):
         # Get required values from config
         try:
             _input = rules["input"]
@@ -301,71 +359,117 @@ class CredentialManager(object):
                 "Every mapping must specify 'input' and 'from' values."
             )
 
-        # Processor is optional
-        processor = rules.get("processor")
-
-        claims = cls.get_claims(credential)
-
         # Get model field value from string literal or claim value
         if _from == "value":
-            mapped_value = _input
+
+            def extract(credential):
+                return _input
+
         elif _from == "claim":
-            try:
-                mapped_value = getattr(claims, _input)
-            except AttributeError:
-                raise CredentialException(
-                    "Credential does not contain the configured claim '{}'".format(
-                        _input
+
+            def extract(credential):
+                try:
+                    return getattr(cls.get_claims(credential), _input)
+                except AttributeError:
+                    raise CredentialException(
+                        "Credential does not contain the configured claim '{}'".format(
+                            _input
+                        )
                     )
-                )
+
         else:
             raise CredentialException(
                 "Supported field from values are 'value' and 'claim'"
                 + " but received '{}'".format(_from)
             )
 
-        # If we have a processor config, build pipeline of functions
-        # and run field value through pipeline
-        if processor is not None:
-            pipeline = []
-            # Construct pipeline by dot notation. Last token is the
-            # function name and all preceeding dots denote path of
-            # module starting from `PROCESSOR_FUNCTION_BASE_PATH``
-            for function_path_with_name in processor:
-                function_path, function_name = function_path_with_name.rsplit(".", 1)
+        # Processor is optional
+        processor = rules.get("processor")
+        if processor is None:
+            return extract
 
-                # Does the file exist?
-                try:
-                    function_module = import_module(
-                        "{}.{}".format(PROCESSOR_FUNCTION_BASE_PATH, function_path)
-                    )
-                except ModuleNotFoundError:
-                    raise CredentialException(
-                        "No processor module named '{}'".format(function_path)
-                    )
+        # If we have a processor config, run field value through pipeline
+        pipeline = tuple(
+            load_processor(function_path_with_name)
+            for function_path_with_name in processor
+        )
 
-                # Does the function exist?
-                try:
-                    function = getattr(function_module, function_name)
-                except AttributeError:
-                    raise CredentialException(
-                        "Module '{}' has no function '{}'.".format(
-                            function_path, function_name
-                        )
-                    )
+        def mapper(credential):
+            mapped_value = extract(credential)
+            for function in pipeline:
+                mapped_value = function(mapped_value)
+            return mapped_value
 
-                # Build up a list of functions to call
-                pipeline.append(function)
+        return mapper
 
-            # We want to run the pipeline in logical order
-            pipeline.reverse()
+    @classmethod
+    def compile_processor_config(cls, processor_config):
+        """
+        Compile the mapping rules of a processor config, keeping its structure
+        """
+        if not processor_config:
+            return processor_config
+        compiled = dict(processor_config)
+        if "topic" in compiled:
+            topic_defs = compiled["topic"]
+            # We accept object or array for topic def
+            if type(topic_defs) is dict:
+                topic_defs = [topic_defs]
+            compiled["topic"] = [
+                {key: cls.compile_mapping(rules) for key, rules in topic_def.items()}
+                for topic_def in topic_defs
+            ]
+        if compiled.get("credential"):
+            compiled["credential"] = {
+                key: cls.compile_mapping(rules)
+                for key, rules in compiled["credential"].items()
+            }
+        if compiled.get("mapping"):
+            compiled["mapping"] = [
+                dict(
+                    model_mapper,
+                    fields={
+                        field: cls.compile_mapping(field_mapper)
+                        for field, field_mapper in model_mapper["fields"].items()
+                    },
+                )
+                if "fields" in model_mapper
+                else model_mapper
+                for model_mapper in compiled["mapping"]
+            ]
+        return compiled
 
-            # Run pipeline
-            while len(pipeline) > 0:
-                function = pipeline.pop()
-                mapped_value = function(mapped_value)
+    @classmethod
+    def compiled_processor_config(cls, credential_type: CredentialType):
+        """
+        Fetch the compiled processor config for a credential type
 
-        return mapped_value
+        A credential type loaded again from the database is only recompiled
+        when its processor config has changed.
+        """
+        processor_config = credential_type.processor_config
+        cached = COMPILED_PROCESSOR_CONFIGS.get(credential_type.id)
+        if cached and cached[0] is not processor_config:
+            if cached[0] == processor_config:
+                cached = (processor_config, cached[1])
+                COMPILED_PROCESSOR_CONFIGS[credential_type.id] = cached
+            else:
+                cached = None
+        if not cached:
+            cached = (processor_config, cls.compile_processor_config(processor_config))
+            if credential_type.id:
+                COMPILED_PROCESSOR_CONFIGS[credential_type.id] = cached
+        return cached[1]
+
+    @classmethod
+    def invalidate_processor_config(cls, credential_type_id=None):
+        """
+        Drop the compiled processor config for a credential type, or all of them
+        """
+        if credential_type_id is None:
+            COMPILED_PROCESSOR_CONFIGS.clear()
+        else:
+            COMPILED_PROCESSOR_CONFIGS.pop(credential_type_id, None)
 
     def get_credential_type(self, credential: tuple[Credential, CredentialModel]):
         """
@@ -373,47 +477,19 @@ class CredentialManager(object):
         """
         LOGGER.debug(">>> get credential context")
 
-        # force re-init to get any issuer updates
-        self._reinit_ctype_cache()
-
         start_time = time.perf_counter()
         result = None
         type_id = getattr(credential, "credential_type_id", None)
         if type_id:
-            result = self._cred_type_cache.get(type_id)
-            if not result:
-                result = CredentialType.objects.get(pk=type_id)
-                self._cred_type_cache[type_id] = result
+            result = credential_type_cache.get(
+                credential_type_cache.id_key(type_id),
+                lambda: CredentialType.objects.get(pk=type_id),
+            )
         elif isinstance(credential, Credential):
-            cache_key = credential.cred_def_id
-            result = self._cred_type_cache.get(cache_key)
-            if not result:
-                try:
-                    issuer = Issuer.objects.get(did=credential.origin_did)
-                    schema = Schema.objects.get(
-                        origin_did=credential.schema_origin_did,
-                        name=credential.schema_name,
-                        version=credential.schema_version,
-                    )
-                except Issuer.DoesNotExist:
-                    raise CredentialException(
-                        "Issuer with did '{}' does not exist.".format(
-                            credential.origin_did
-                        )
-                    )
-                except Schema.DoesNotExist:
-                    raise CredentialException(
-                        "Schema with origin_did"
-                        + " '{}', name '{}', and version '{}' ".format(
-                            credential.schema_origin_did,
-                            credential.schema_name,
-                            credential.schema_version,
-                        )
-                        + " does not exist."
-                    )
-
-                result = CredentialType.objects.get(schema=schema, issuer=issuer)
-                self._cred_type_cache[cache_key] = result
+            result = credential_type_cache.get(
+                credential_type_cache.cred_def_key(credential.cred_def_id),
+                lambda: self.load_credential_type(credential),
+            )
         LOGGER.debug(
             "<<< get credential context: " + str(time.perf_counter() - start_time)
         )
@@ -421,6 +497,32 @@ class CredentialManager(object):
             raise CredentialException("Credential type not found")
         return result
 
+    @classmethod
+    def load_credential_type(cls, credential: Credential) -> CredentialType:
+        try:
+            issuer = Issuer.objects.get(did=credential.origin_did)
+            schema = Schema.objects.get(
+                origin_did=credential.schema_origin_did,
+                name=credential.schema_name,
+                version=credential.schema_version,
+            )
+        except Issuer.DoesNotExist:
+            raise CredentialException(
+                "Issuer with did '{}' does not exist.".format(credential.origin_did)
+            )
+        except Schema.DoesNotExist:
+            raise CredentialException(
+                "Schema with origin_did"
+                + " '{}', name '{}', and version '{}' ".format(
+                    credential.schema_origin_did,
+                    credential.schema_name,
+                    credential.schema_version,
+                )
+                + " does not exist."
+            )
+
+        return CredentialType.objects.get(schema=schema, issuer=issuer)
+
     def process(
         self, credential: Credential, check_from_did: str = None
     ) -> CredentialModel:
@@ -441,6 +543,64 @@ class CredentialManager(object):
 
         return self.populate_application_database(credential_type, credential)
 
+    def process_batch(self, credentials: list) -> list:
+        """
+        Processes a batch of incoming credentials using grouped queries and
+        bulk inserts, committing the batch in a single transaction.
+
+        Credentials which cannot be mapped are reported individually and do not
+        prevent the rest of the batch from being stored, as are repeats of a
+        thread_id earlier in the batch. Credentials whose topic is resolved by
+        name are stored through the single credential path.
+
+        Returns:
+            list -- a BatchResult for each credential, in the order received
+        """
+        results = [None] * len(credentials)
+        entries = []
+        fallback = []
+        thread_ids = set()
+
+        for idx, credential in enumerate(credentials):
+            if credential.thread_id in thread_ids:
+                results[idx] = BatchResult(
+                    credential,
+                    None,
+                    CredentialException(
+                        f"Duplicate credential in batch: {credential.thread_id}"
+                    ),
+                )
+                continue
+            thread_ids.add(credential.thread_id)
+            try:
+                credential_type = self.get_credential_type(credential)
+                entry = self.prepare_batch_entry(credential_type, credential)
+            except Exception as e:
+                results[idx] = BatchResult(credential, None, e)
+                continue
+            if entry is None:
+                fallback.append((idx, credential_type, credential))
+            else:
+                entries.append((idx, entry))
+
+        if entries:
+            db_credentials = self.populate_application_database_batch(
+                [entry for _, entry in entries]
+            )
+            for (idx, _), db_credential in zip(entries, db_credentials):
+                results[idx] = BatchResult(credentials[idx], db_credential, None)
+
+        for idx, credential_type, credential in fallback:
+            try:
+                db_credential = self.populate_application_database(
+                    credential_type, credential
+                )
+                results[idx] = BatchResult(credential, db_credential, None)
+            except Exception as e:
+                results[idx] = BatchResult(credential, None, e)
+
+        return results
+
     def reprocess(self, credential: CredentialModel):
         """
         Reprocesses an existing credential in order to update the related search models
@@ -448,7 +608,7 @@ class CredentialManager(object):
         This is currently only used by the CLI
         """
         credential_type = self.get_credential_type(credential)
-        processor_config = credential_type.processor_config
+        processor_config = self.compiled_processor_config(credential_type)
 
         with transaction.atomic():
             if not credential.credential_set:
@@ -793,7 +953,7 @@ class CredentialManager(object):
     ) -> CredentialModel:
         LOGGER.warn(">>> store cred in local database")
         start_time = time.perf_counter()
-        processor_config = credential_type.processor_config
+        processor_config = cls.compiled_processor_config(credential_type)
 
         (
             topic,
@@ -880,19 +1040,15 @@ class CredentialManager(object):
             # Update last issue date for credential type
             if UPDATE_CRED_TYPE_TIMESTAMP:
                 credential_type.last_issue_date = datetime.now(timezone.utc)
-                credential_type.save()
+                credential_type.save(
+                    update_fields=["last_issue_date", "update_timestamp"]
+                )
 
-            # Add to the set of "hookable credentials"
+            # Add to the set of "hookable credentials"; the hook dispatcher
+            # fires the subscribed hooks once the transaction commits, and
+            # marks the first credential of a topic as "New" if needed
             # TODO make this a configurable step of the process
-            new_hook_exists = HookableCredential.objects.filter(
-                corp_num=topic.source_id,
-                topic_status="New",
-            ).count()
-
-            if topic_created or new_hook_exists == 0:
-                topic_status = "New"
-            else:
-                topic_status = "Stream"
+            topic_status = "New" if topic_created else "Stream"
             hookable_cred_data = {
                 "cred_def_id": credential.cred_def_id,
                 "schema_name": credential.schema_name,
@@ -905,6 +1061,7 @@ class CredentialManager(object):
                 credential_json=hookable_cred_data,
             )
             hookable_cred.save()
+            notify_dispatcher()
 
             # This hack reindexes the Topic to account for active
             # Credentials that are created after Topic indexes are
@@ -943,3 +1100,471 @@ class CredentialManager(object):
         )
 
         return db_credential
+
+    @classmethod
+    def batch_topic_specs(cls, credential, processor_config):
+        """
+        Resolve the (source_id, type) of the topic and related topic for a
+        credential without touching the database
+
+        Returns None if the topic config looks topics up by name, in which case
+        the credential must go through `resolve_credential_topics`.
+        """
+        topic_defs = processor_config["topic"]
+        # We accept object or array for topic def
+        if type(topic_defs) is dict:
+            topic_defs = [topic_defs]
+
+        result = None
+        for topic_def in topic_defs:
+            if topic_def.get("name") or topic_def.get("related_name"):
+                return None
+
+            related_topic_source_id = cls.process_mapping(
+                topic_def.get("related_source_id"), credential
+            )
+            related_topic_type = cls.process_mapping(
+                topic_def.get("related_type"), credential
+            )
+            topic_source_id = cls.process_mapping(
+                topic_def.get("source_id"), credential
+            )
+            topic_type = cls.process_mapping(topic_def.get("type"), credential)
+
+            # Same precedence as resolve_credential_topics
+            if topic_source_id and topic_type:
+                related_spec = None
+                if related_topic_source_id and related_topic_type:
+                    related_spec = (related_topic_source_id, related_topic_type)
+                result = ((topic_source_id, topic_type), related_spec)
+
+        if not result:
+            raise CredentialException(
+                "Issuer registration 'topic' must specify at least one valid topic name "
+                "OR topic type and topic source_id"
+            )
+        return result
+
+    @classmethod
+    def prepare_batch_entry(
+        cls, credential_type: CredentialType, credential: Credential
+    ) -> dict:
+        """
+        Run all of the issuer mappings for a credential ahead of the batch
+        database writes
+
+        Returns None if the credential can't be stored as part of a batch.
+        """
+        processor_config = cls.compiled_processor_config(credential_type)
+
+        topic_specs = cls.batch_topic_specs(credential, processor_config)
+        if topic_specs is None:
+            return None
+        topic_spec, related_spec = topic_specs
+
+        cardinality = cls.credential_cardinality(credential, processor_config)
+        credential_args = {
+            "cardinality_hash": cardinality["hash"] if cardinality else None,
+            "credential_def_id": credential.cred_def_id,
+            "credential_type": credential_type,
+            "credential_id": credential.thread_id,
+        }
+        credential_args.update(
+            cls.process_credential_properties(credential, processor_config)
+        )
+
+        claims = {}
+        if CREATE_CREDENTIAL_CLAIMS:
+            for claim_attribute in credential.claim_attributes:
+                claims[claim_attribute] = getattr(credential, claim_attribute)
+
+        return {
+            "credential": credential,
+            "credential_type": credential_type,
+            "topic_spec": topic_spec,
+            "related_spec": related_spec,
+            "credential_args": credential_args,
+            "claims": claims,
+        }
+
+    @classmethod
+    def bulk_insert(cls, model_cls, instances: list, send_signals=True) -> list:
+        """
+        Insert model instances in one statement where the database can return
+        the new primary keys, otherwise fall back to saving them one at a time
+
+        Unless send_signals is False, post_save is sent for every instance so
+        that search indexing and web hooks behave as they do for individual
+        saves. The fallback always sends the signals, as save() does.
+        """
+        if not instances:
+            return instances
+        if connection.features.can_return_ids_from_bulk_insert:
+            model_cls.objects.bulk_create(instances)
+            if send_signals:
+                cls.send_saved(model_cls, instances, created=True)
+        else:
+            for instance in instances:
+                instance.save(force_insert=True)
+        return instances
+
+    @classmethod
+    def send_saved(cls, model_cls, instances, created=False):
+        for instance in instances:
+            signals.post_save.send(
+                sender=model_cls,
+                instance=instance,
+                created=created,
+                update_fields=None,
+                raw=False,
+                using=DEFAULT_DB_ALIAS,
+            )
+
+    @classmethod
+    def resolve_batch_topics(cls, topic_specs) -> dict:
+        """
+        Find or create all of the topics for a batch in grouped queries
+
+        Returns:
+            dict -- (topic, created) keyed by (source_id, type)
+        """
+        topic_specs = set(topic_specs)
+
+        def spec_query(specs):
+            query = Q()
+            for source_id, topic_type in specs:
+                query |= Q(source_id=source_id, type=topic_type)
+            return query
+
+        topics = {
+            (topic.source_id, topic.type): (topic, False)
+            for topic in Topic.objects.filter(spec_query(topic_specs))
+        }
+
+        missing = [spec for spec in topic_specs if spec not in topics]
+        if missing:
+            new_topics = []
+            for source_id, topic_type in missing:
+                topic = Topic(source_id=source_id, type=topic_type)
+                try:
+                    topic.clean_fields()
+                except ValidationError:
+                    raise CredentialException(
+                        "Django validation error while creating topic"
+                    )
+                new_topics.append(topic)
+            try:
+                with transaction.atomic():
+                    Topic.objects.bulk_create(new_topics)
+                created = set(missing)
+            except IntegrityError:
+                # Other threads created some of the topics first, only the
+                # topics inserted here count as created
+                created = set()
+                for topic in new_topics:
+                    try:
+                        with transaction.atomic():
+                            Topic.objects.bulk_create([topic])
+                        created.add((topic.source_id, topic.type))
+                    except IntegrityError:
+                        pass
+            inserted = []
+            for topic in Topic.objects.filter(spec_query(missing)):
+                spec = (topic.source_id, topic.type)
+                topics[spec] = (topic, spec in created)
+                if spec in created:
+                    inserted.append(topic)
+            # Index and record the new topics, related ones included, as
+            # find_or_create_topic does
+            cls.send_saved(Topic, inserted, created=True)
+
+        return topics
+
+    @classmethod
+    def update_credential_sets_batch(
+        cls, db_credentials: list, set_keys: list
+    ) -> tuple:
+        """
+        Assign a batch of new credentials to their credential sets
+
+        This applies the same rules as `update_credential_set` to each credential
+        in turn, but loads the existing sets and their active credentials up front.
+
+        Returns:
+            tuple -- (new sets, updated sets, updated existing credentials)
+        """
+        query = Q()
+        for topic_id, credential_type_id, cardinality_hash in set(set_keys):
+            query |= Q(
+                topic_id=topic_id,
+                credential_type_id=credential_type_id,
+                cardinality_hash=cardinality_hash,
+            )
+        states = {}
+        for cred_set in CredentialSet.objects.filter(query):
+            key = (
+                cred_set.topic_id,
+                cred_set.credential_type_id,
+                cred_set.cardinality_hash,
+            )
+            states[key] = {"set": cred_set, "active": [], "created": False}
+        if states:
+            sets_by_id = {state["set"].id: state for state in states.values()}
+            for prev_cred in CredentialModel.objects.filter(
+                credential_set_id__in=sets_by_id.keys(), revoked=False
+            ).order_by("effective_date"):
+                sets_by_id[prev_cred.credential_set_id]["active"].append(prev_cred)
+
+        batch_ids = {credential.id for credential in db_credentials}
+        updated_sets = {}
+        updated_creds = {}
+        for credential, key in zip(db_credentials, set_keys):
+            state = states.get(key)
+            if state is None:
+                cred_set = CredentialSet(
+                    topic_id=key[0],
+                    credential_type_id=key[1],
+                    cardinality_hash=key[2],
+                    first_effective_date=credential.effective_date,
+                    last_effective_date=(
+                        credential.revoked_date if credential.revoked else None
+                    ),
+                    latest_credential=credential,
+                )
+                states[key] = state = {"set": cred_set, "active": [], "created": True}
+                credential.latest = True
+            else:
+                cred_set = state["set"]
+                latest_cred = credential
+                still_active = []
+
+                for prev_cred in state["active"]:
+                    if prev_cred.effective_date <= credential.effective_date:
+                        prev_cred.latest = False
+                        prev_cred.revoked = True
+                        prev_cred.revoked_by = credential
+                        prev_cred.revoked_date = credential.effective_date
+                        if prev_cred.id not in batch_ids:
+                            updated_creds[prev_cred.id] = prev_cred
+                    else:
+                        still_active.append(prev_cred)
+                        latest_cred = prev_cred
+                        if not credential.revoked:
+                            credential.revoked = True
+                            credential.revoked_by = prev_cred
+                            credential.revoked_date = prev_cred.effective_date
+                state["active"] = still_active
+
+                cred_set.latest_credential = latest_cred
+                cred_set.first_effective_date = (
+                    credential.effective_date
+                    if cred_set.first_effective_date is None
+                    else min(cred_set.first_effective_date, credential.effective_date)
+                )
+                if latest_cred.revoked:
+                    cred_set.last_effective_date = (
+                        latest_cred.revoked_date
+                        if cred_set.last_effective_date is None
+                        else max(cred_set.last_effective_date, latest_cred.revoked_date)
+                    )
+                else:
+                    cred_set.last_effective_date = None
+                credential.latest = latest_cred is credential
+
+                if latest_cred is not credential and not latest_cred.latest:
+                    latest_cred.latest = True
+                    if latest_cred.id not in batch_ids:
+                        updated_creds[latest_cred.id] = latest_cred
+                if not state["created"]:
+                    updated_sets[cred_set.id] = cred_set
+
+            credential.credential_set = cred_set
+            if not credential.revoked:
+                # keep the active credentials ordered by effective date
+                dates = [c.effective_date for c in state["active"]]
+                state["active"].insert(
+                    bisect_right(dates, credential.effective_date), credential
+                )
+
+        new_sets = [state["set"] for state in states.values() if state["created"]]
+        return new_sets, list(updated_sets.values()), list(updated_creds.values())
+
+    @classmethod
+    def populate_application_database_batch(cls, entries: list) -> list:
+        """
+        Store a batch of prepared credentials (see `prepare_batch_entry`)
+
+        Returns:
+            list -- the database credentials, in the order of the entries
+        """
+        LOGGER.warn(">>> store %d creds in local database", len(entries))
+        start_time = time.perf_counter()
+
+        topic_specs = [entry["topic_spec"] for entry in entries]
+        topic_specs.extend(
+            entry["related_spec"] for entry in entries if entry["related_spec"]
+        )
+        topics = cls.resolve_batch_topics(topic_specs)
+        # Only the first credential for a new topic counts as creating it
+        created_topics = {spec for spec, (_, created) in topics.items() if created}
+        cardinality_prep = CredentialSet._meta.get_field(
+            "cardinality_hash"
+        ).get_prep_value
+
+        with transaction.atomic():
+            # Acquire locks on the topics to block competing credentials,
+            # in a consistent order to avoid deadlocks with other batches.
+            # The locks are released when the transaction ends
+            topic_ids = sorted({topics[entry["topic_spec"]][0].id for entry in entries})
+            list(
+                Topic.objects.select_for_update()
+                .filter(pk__in=topic_ids)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+
+            db_credentials = []
+            set_keys = []
+            for entry in entries:
+                topic = topics[entry["topic_spec"]][0]
+                db_credential = CredentialModel(topic=topic, **entry["credential_args"])
+                db_credentials.append(db_credential)
+                set_keys.append(
+                    (
+                        topic.id,
+                        entry["credential_type"].id,
+                        cardinality_prep(entry["credential_args"]["cardinality_hash"]),
+                    )
+                )
+            cls.bulk_insert(CredentialModel, db_credentials, send_signals=False)
+
+            # Add the credentials to the change feed, their topics are added
+            # when created or saved
+            record_changes(db_credentials, ChangeEvent.CREATED)
+
+            # Create and associate claims for these credentials
+            if CREATE_CREDENTIAL_CLAIMS:
+                Claim.objects.bulk_create(
+                    [
+                        Claim(credential=db_credential, name=name, value=value)
+                        for entry, db_credential in zip(entries, db_credentials)
+                        for name, value in entry["claims"].items()
+                    ]
+                )
+
+            # Assign to credential sets
+            new_sets, updated_sets, updated_creds = cls.update_credential_sets_batch(
+                db_credentials, set_keys
+            )
+            now = timezone.now()
+            cls.bulk_insert(CredentialSet, new_sets, send_signals=False)
+            if updated_sets:
+                for cred_set in updated_sets:
+                    cred_set.update_timestamp = now
+                CredentialSet.objects.bulk_update(
+                    updated_sets,
+                    [
+                        "latest_credential",
+                        "first_effective_date",
+                        "last_effective_date",
+                        "update_timestamp",
+                    ],
+                )
+            for db_credential in db_credentials:
+                # pick up the ids of the newly created sets
+                db_credential.credential_set = db_credential.credential_set
+                db_credential.update_timestamp = now
+            for prev_cred in updated_creds:
+                prev_cred.update_timestamp = now
+            CredentialModel.objects.bulk_update(
+                db_credentials + updated_creds,
+                [
+                    "credential_set",
+                    "latest",
+                    "revoked",
+                    "revoked_by",
+                    "revoked_date",
+                    "update_timestamp",
+                ],
+            )
+
+            # Save search models
+            if CREATE_CREDENTIAL_CLAIMS:
+                search_models = {}
+                for entry, db_credential in zip(entries, db_credentials):
+                    for model in cls.create_search_models(
+                        db_credential,
+                        cls.compiled_processor_config(entry["credential_type"]),
+                        save=False,
+                    ):
+                        search_models.setdefault(model.__class__, []).append(model)
+                for model_cls, models in search_models.items():
+                    cls.bulk_insert(model_cls, models)
+
+            # Update last issue date for credential types
+            if UPDATE_CRED_TYPE_TIMESTAMP:
+                credential_types = {
+                    entry["credential_type"].id: entry["credential_type"]
+                    for entry in entries
+                }
+                CredentialType.objects.filter(pk__in=credential_types.keys()).update(
+                    last_issue_date=now
+                )
+                for credential_type in credential_types.values():
+                    credential_type.last_issue_date = now
+
+            # Add to the set of "hookable credentials", for the hook dispatcher
+            hookable_creds = []
+            for entry in entries:
+                topic = topics[entry["topic_spec"]][0]
+                credential = entry["credential"]
+                if entry["topic_spec"] in created_topics:
+                    topic_status = "New"
+                    created_topics.discard(entry["topic_spec"])
+                else:
+                    topic_status = "Stream"
+                hookable_creds.append(
+                    HookableCredential(
+                        topic_status=topic_status,
+                        corp_num=topic.source_id,
+                        credential_type=entry["credential_type"].schema.name,
+                        credential_json={
+                            "cred_def_id": credential.cred_def_id,
+                            "schema_name": credential.schema_name,
+                            "attributes": entry["claims"],
+                        },
+                    )
+                )
+            cls.bulk_insert(HookableCredential, hookable_creds)
+            notify_dispatcher()
+
+            # Reindex the credentials and their topics once the batch commits
+            cls.send_saved(CredentialModel, db_credentials, created=True)
+            cls.send_saved(CredentialModel, updated_creds)
+            batch_topics = [
+                topic for topic, _ in topics.values() if topic.id in topic_ids
+            ]
+            Topic.objects.filter(pk__in=topic_ids).update(update_timestamp=now)
+            cls.send_saved(Topic, batch_topics)
+
+        # create any relationships in a separate transaction
+        with transaction.atomic():
+            TopicRelationship.objects.bulk_create(
+                [
+                    TopicRelationship(
+                        credential=db_credential,
+                        topic=topics[entry["topic_spec"]][0],
+                        related_topic=topics[entry["related_spec"]][0],
+                    )
+                    for entry, db_credential in zip(entries, db_credentials)
+                    if entry["related_spec"]
+                ]
+            )
+
+        LOGGER.warn(
+            "<<< store %d creds in local database: %s",
+            len(entries),
+            str(time.perf_counter() - start_time),
+        )
+
+        return db_credentials
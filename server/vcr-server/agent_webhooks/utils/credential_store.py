@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+
+import aiohttp
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.v2.models.CredentialStoreRequest import CredentialStoreRequest
+
+LOGGER = logging.getLogger(__name__)
+
+# acknowledge credential webhooks before the agent stores the credential
+AGENT_STORE_ASYNC = (os.getenv("AGENT_STORE_ASYNC") or "true").upper() == "TRUE"
+
+# max number of concurrent requests to the agent admin API
+AGENT_STORE_CONCURRENCY = int(os.getenv("AGENT_STORE_CONCURRENCY") or 10)
+# max number of store requests claimed at a time
+AGENT_STORE_BATCH = int(os.getenv("AGENT_STORE_BATCH") or 100)
+# seconds between checks for requests queued by other workers, or due for a retry
+AGENT_STORE_POLL_INTERVAL = float(os.getenv("AGENT_STORE_POLL_INTERVAL") or 5)
+# seconds allowed for each agent admin API call
+AGENT_STORE_TIMEOUT = float(os.getenv("AGENT_STORE_TIMEOUT") or 30)
+AGENT_STORE_MAX_ATTEMPTS = int(os.getenv("AGENT_STORE_MAX_ATTEMPTS") or 10)
+AGENT_STORE_RETRY_DELAY = float(os.getenv("AGENT_STORE_RETRY_DELAY") or 5)
+AGENT_STORE_MAX_RETRY_DELAY = float(os.getenv("AGENT_STORE_MAX_RETRY_DELAY") or 600)
+# max number of agent admin API calls made for one store request
+AGENT_STORE_CALLS = 3
+
+
+class CredentialStoreError(Exception):
+    """The agent can't store the credential, retrying won't help"""
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before the given attempt, doubling each time."""
+    return min(
+        AGENT_STORE_RETRY_DELAY * 2 ** max(attempts - 1, 0),
+        AGENT_STORE_MAX_RETRY_DELAY,
+    )
+
+
+def store_lease(limit: int, concurrency: int = None) -> float:
+    """
+    Seconds a batch of store requests is leased for: long enough to send the
+    whole batch even if every call times out.
+    """
+    concurrency = concurrency or AGENT_STORE_CONCURRENCY
+    rounds = -(-limit // concurrency)
+    return (rounds * AGENT_STORE_CALLS + 1) * AGENT_STORE_TIMEOUT
+
+
+def run_db(func, *args):
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def queue_store_credential(cred_ex_id, cred_id, existing=False, v=None):
+    """
+    Record a request for the agent to store a processed credential in its
+    wallet; the dispatcher is woken when the transaction commits.
+    """
+    CredentialStoreRequest.objects.create(
+        cred_ex_id=cred_ex_id, credential_id=cred_id, existing=existing, version=v
+    )
+    dispatcher = CredentialStoreDispatcher.current
+    if dispatcher:
+        transaction.on_commit(dispatcher.notify)
+
+
+class CredentialStoreDispatcher:
+    """
+    Sends queued store requests to the agent over pooled keep-alive
+    connections, with a bound on the number of concurrent calls.
+
+    Claimed requests are leased to the dispatcher while they are in flight, so
+    several server instances can share the outbox.
+    """
+
+    current = None
+
+    def __init__(self, concurrency: int = None):
+        self._concurrency = concurrency or AGENT_STORE_CONCURRENCY
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._wakeup = None
+        self._task = None
+
+    def setup(self, app=None):
+        LOGGER.info("Setting up credential store dispatcher ...")
+        if app is not None:
+            app["credential_store"] = self
+            app.on_startup.append(self.app_start)
+            app.on_cleanup.append(self.app_stop)
+        CredentialStoreDispatcher.current = self
+
+    async def app_start(self, _app=None):
+        self._loop = asyncio.get_event_loop()
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self._concurrency),
+            headers=settings.ADMIN_REQUEST_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=AGENT_STORE_TIMEOUT),
+        )
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def app_stop(self, _app=None):
+        LOGGER.info("Stopping credential store dispatcher ...")
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+        if CredentialStoreDispatcher.current is self:
+            CredentialStoreDispatcher.current = None
+
+    def notify(self):
+        """Wake the dispatcher; may be called from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch()
+            except Exception:
+                LOGGER.exception("Error dispatching credential store requests")
+                claimed = 0
+            if claimed >= AGENT_STORE_BATCH:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), AGENT_STORE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch(self) -> int:
+        """Send one batch of store requests; returns the number claimed."""
+        requests = await self._loop.run_in_executor(
+            None, run_db, self.claim, AGENT_STORE_BATCH, self._concurrency
+        )
+        if requests:
+            results = await asyncio.gather(
+                *(self._store(request) for request in requests)
+            )
+            await self._loop.run_in_executor(
+                None, run_db, self.record, requests, results
+            )
+        return len(requests)
+
+    @staticmethod
+    def claim(limit: int, concurrency: int = None) -> list:
+        now = timezone.now()
+        with transaction.atomic():
+            requests = list(
+                CredentialStoreRequest.objects.filter(
+                    Q(next_attempt__isnull=True) | Q(next_attempt__lte=now)
+                ).select_for_update(skip_locked=True)[:limit]
+            )
+            # lease the requests while they are in flight
+            CredentialStoreRequest.objects.filter(
+                id__in=[request.id for request in requests]
+            ).update(
+                next_attempt=now
+                + timedelta(seconds=store_lease(len(requests), concurrency))
+            )
+        return requests
+
+    @staticmethod
+    def record(requests: list, results: list):
+        """
+        Remove the stored requests and those that ran out of attempts, and
+        schedule retries for the others.
+        """
+        now = timezone.now()
+        done = []
+        failed = []
+        for request, error in zip(requests, results):
+            if error is None:
+                done.append(request.id)
+                continue
+            request.error = str(error) or error.__class__.__name__
+            if isinstance(error, CredentialStoreError):
+                request.attempts = AGENT_STORE_MAX_ATTEMPTS
+            else:
+                request.attempts += 1
+            if request.attempts >= AGENT_STORE_MAX_ATTEMPTS:
+                LOGGER.error(
+                    " >>> Giving up storing credential %s, exch id: %s: %s",
+                    request.credential_id,
+                    request.cred_ex_id,
+                    request.error,
+                )
+                done.append(request.id)
+                continue
+            request.next_attempt = now + timedelta(
+                seconds=retry_delay(request.attempts)
+            )
+            failed.append(request)
+        if done:
+            CredentialStoreRequest.objects.filter(id__in=done).delete()
+        if failed:
+            CredentialStoreRequest.objects.bulk_update(
+                failed, ["attempts", "next_attempt", "error"]
+            )
+
+    async def _store(self, request: CredentialStoreRequest):
+        async with self._semaphore:
+            try:
+                await self.store(request)
+            except Exception as e:
+                return e
+        return None
+
+    async def store(self, request: CredentialStoreRequest):
+        """
+        Instruct the agent to store a processed credential in its wallet.
+        """
+        admin_url = settings.AGENT_ADMIN_URL
+        cred_id = request.credential_id
+
+        # check if the credential is in the wallet already
+        existing = request.existing
+        if existing:
+            status = await self._call("GET", f"{admin_url}/credential/{cred_id}")
+            existing = status != 404
+
+        # Instruct the agent to store the credential in wallet
+        if not existing:
+            status = await self._call(
+                "POST",
+                f"{admin_url}/issue-credential{'-' + request.version if request.version else ''}"
+                f"/records/{request.cred_ex_id}/store",
+                json={"credential_id": cred_id},
+            )
+            if status == 404:
+                # TODO assume the credential exchange has completed?
+                status = await self._call("GET", f"{admin_url}/credential/{cred_id}")
+                if status == 404:
+                    raise CredentialStoreError(
+                        "Error cred exchange id is missing but credential is not available"
+                    )
+
+    async def _call(self, method: str, url: str, json=None) -> int:
+        """Call the agent admin API; errors other than not found are raised."""
+        async with self._session.request(method, url, json=json) as resp:
+            if resp.status != 404:
+                resp.raise_for_status()
+            return resp.status
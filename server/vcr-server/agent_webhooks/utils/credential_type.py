@@ -6,6 +6,7 @@ from api.v2.models.Issuer import Issuer
 from api.v2.models.Schema import Schema
 
 from agent_webhooks.schemas import CredentialTypeDefSchema
+from agent_webhooks.utils.credential import CredentialManager
 
 LOGGER = logging.getLogger(__name__)
 
@@ -65,6 +66,8 @@ class CredentialTypeManager:
             credential_type.raw_data = credential_type_def.get("raw_data")
 
             credential_type.save()
+            # the issuer may have changed the mappings
+            CredentialManager.invalidate_processor_config(credential_type.id)
             credential_types.append(credential_type)
 
         return credential_types
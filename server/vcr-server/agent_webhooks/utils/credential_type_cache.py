@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from api.v2.models.CredentialType import CredentialType
+from api.v2.models.Issuer import Issuer
+from api.v2.models.Schema import Schema
+
+LOGGER = logging.getLogger(__name__)
+
+# max number of credential types held by the local cache in each process
+CTYPE_CACHE_SIZE = int(os.environ.get("CTYPE_CACHE_SIZE", "500"))
+# seconds a cached credential type is used before it is loaded again
+CTYPE_CACHE_TTL = int(os.environ.get("CTYPE_CACHE_TTL", "300"))
+# seconds between checks of the shared generation counter
+CTYPE_CACHE_CHECK_INTERVAL = float(os.environ.get("CTYPE_CACHE_CHECK_INTERVAL", "5"))
+
+GENERATION_KEY = "credential_type_cache.generation"
+
+# saves of these fields alone happen for every credential and don't change lookups
+ISSUE_DATE_FIELDS = frozenset(("last_issue_date", "update_timestamp"))
+
+
+class CredentialTypeCache:
+    """
+    Credential type lookups shared between workers through the Django cache,
+    with a local LRU in front.
+
+    Entries expire after CTYPE_CACHE_TTL seconds. Saving or deleting an
+    issuer, schema or credential type bumps a generation counter in the
+    shared cache, which discards every entry in this process at once and in
+    the other workers within CTYPE_CACHE_CHECK_INTERVAL seconds. Workers only
+    share the counter with a shared cache backend (CACHE_BACKEND); with the
+    default per-process LocMemCache, changes made by another process are only
+    picked up when the entries expire.
+
+    The display text of all issuers and credential types, used to label search
+    facets, is held the same way.
+    """
+
+    def __init__(self, size: int = CTYPE_CACHE_SIZE):
+        self._size = size
+        self._local = OrderedDict()
+        self._generation = None
+        self._checked = 0.0
+        self._labels = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cred_def_key(cred_def_id: str) -> str:
+        return f"cred_def:{cred_def_id}"
+
+    @staticmethod
+    def schema_key(origin_did: str, schema_name: str, schema_version: str) -> str:
+        return f"schema:{origin_did}:{schema_name}:{schema_version}"
+
+    @staticmethod
+    def id_key(credential_type_id: int) -> str:
+        return f"id:{credential_type_id}"
+
+    def generation(self) -> int:
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            # start from a random value so stale entries of an evicted counter
+            # are not picked up again
+            cache.add(GENERATION_KEY, self._generation_seed(), timeout=None)
+            generation = cache.get(GENERATION_KEY)
+        return generation
+
+    def current_generation(self) -> int:
+        """
+        The shared generation, read at most every CTYPE_CACHE_CHECK_INTERVAL
+        seconds; local entries are discarded when it changes
+        """
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._generation is not None
+                and now - self._checked < CTYPE_CACHE_CHECK_INTERVAL
+            ):
+                return self._generation
+        generation = self.generation()
+        with self._lock:
+            if generation != self._generation:
+                self._local.clear()
+                self._generation = generation
+            self._checked = now
+        return generation
+
+    def shared_key(self, generation: int, key: str) -> str:
+        # issuer DIDs and schema names are not valid memcached keys
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"credential_type:{generation}:{digest}"
+
+    def get(self, key: str, load) -> CredentialType:
+        """
+        Fetch the credential type cached under key, calling load() on a miss
+        """
+        generation = self.current_generation()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[1] > now:
+                self._local.move_to_end(key)
+                return entry[0]
+
+        shared_key = self.shared_key(generation, key)
+        credential_type = cache.get(shared_key)
+        if credential_type is None:
+            credential_type = load()
+            cache.set(shared_key, credential_type, timeout=CTYPE_CACHE_TTL)
+
+        with self._lock:
+            if generation == self._generation:
+                self._local[key] = (credential_type, now + CTYPE_CACHE_TTL)
+                while len(self._local) > self._size:
+                    self._local.popitem(last=False)
+        return credential_type
+
+    def labels(self) -> dict:
+        """
+        Issuer names and credential type descriptions by id, loaded once for
+        each generation and at most kept for CTYPE_CACHE_TTL seconds
+        """
+        generation = self.current_generation()
+        now = time.monotonic()
+        labels = self._labels
+        if labels is None or labels[0] != generation or labels[1] <= now:
+            labels = (
+                generation,
+                now + CTYPE_CACHE_TTL,
+                {
+                    "issuer": {
+                        str(pk): name
+                        for pk, name in Issuer.objects.values_list("id", "name")
+                    },
+                    "credential_type": {
+                        str(pk): description
+                        for pk, description in CredentialType.objects.values_list(
+                            "id", "description"
+                        )
+                    },
+                },
+            )
+            self._labels = labels
+        return labels[2]
+
+    def invalidate(self):
+        """
+        Discard every cached credential type
+
+        This is repeated when the current transaction commits, in case another
+        worker cached the previous version in the meantime.
+        """
+        self._invalidate()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(self._invalidate)
+
+    def _invalidate(self):
+        LOGGER.debug("Invalidating the credential type cache")
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            # the counter was evicted
+            cache.set(GENERATION_KEY, self._generation_seed(), timeout=None)
+        with self._lock:
+            self._local.clear()
+            self._generation = None
+            self._labels = None
+
+    @staticmethod
+    def _generation_seed() -> int:
+        return int.from_bytes(os.urandom(4), "big")
+
+
+credential_type_cache = CredentialTypeCache()
+
+
+@receiver(signals.post_save, sender=CredentialType)
+def credential_type_saved(sender, update_fields=None, **kwargs):
+    if update_fields and ISSUE_DATE_FIELDS.issuperset(update_fields):
+        return
+    credential_type_cache.invalidate()
+
+
+@receiver(signals.post_delete, sender=CredentialType)
+@receiver(signals.post_save, sender=Issuer)
+@receiver(signals.post_delete, sender=Issuer)
+@receiver(signals.post_save, sender=Schema)
+@receiver(signals.post_delete, sender=Schema)
+def credential_type_changed(sender, **kwargs):
+    credential_type_cache.invalidate()
@@ -21,6 +21,7 @@ from api.v2.models import (
 
 from agent_webhooks.enums import FormatEnum
 from agent_webhooks.schemas import CredentialDefSchema
+from agent_webhooks.utils.credential_type_cache import credential_type_cache
 
 LOGGER = logging.getLogger(__name__)
 
@@ -90,12 +91,20 @@ class CredentialManager:
     ) -> CredentialType:
         """Get the credential type based on the credential data."""
 
-        # Get the credential type from the data
-        try:
-            origin_did = credential_def.get("origin_did")
-            name = credential_def.get("schema")
-            version = credential_def.get("version")
+        origin_did = credential_def.get("origin_did")
+        name = credential_def.get("schema")
+        version = credential_def.get("version")
+        return credential_type_cache.get(
+            credential_type_cache.schema_key(origin_did, name, version),
+            lambda: self._load_credential_type(origin_did, name, version),
+        )
 
+    def _load_credential_type(
+        self, origin_did: str, name: str, version: str
+    ) -> CredentialType:
+        """Load the credential type from the database."""
+
+        try:
             issuer = Issuer.objects.get(did=origin_did)
             schema = Schema.objects.get(
                 origin_did=origin_did,
@@ -22,7 +22,15 @@ from agent_webhooks.handlers.vc_di_credential_type import (
 from agent_webhooks.handlers.vc_di_credential import (
     handle_credential as handle_vc_di_credential,
 )
-from agent_webhooks.utils.credential import Credential, CredentialManager
+from agent_webhooks.utils.credential import (
+    MAX_CREDENTIAL_BATCH,
+    Credential,
+    CredentialManager,
+)
+from agent_webhooks.utils.credential_store import (
+    AGENT_STORE_ASYNC,
+    queue_store_credential,
+)
 from agent_webhooks.utils.issuer import IssuerManager
 
 LOGGER = logging.getLogger(__name__)
@@ -413,10 +421,6 @@ def handle_register_issuer(message):
     issuer_manager = IssuerManager()
     updated = issuer_manager.register_issuer(message)
 
-    # reset the global CredentialManager instance (to clear the CredentialType cache)
-    global credential_manager
-    credential_manager = CredentialManager()
-
     return Response(
         content_type="application/json", data={"result": updated.serialize()}
     )
@@ -579,46 +583,9 @@ def receive_credential(cred_ex_id, cred_data, v=None):
         else:
             ret_cred_id = cred_data["thread_id"]
 
-        # check if the credential is in the wallet already
-        if existing:
-            resp = call_agent_with_retry(
-                f"{settings.AGENT_ADMIN_URL}/credential/{ret_cred_id}",
-                post_method=False,
-                headers=settings.ADMIN_REQUEST_HEADERS,
-            )
-            if resp.status_code == 404:
-                existing = False
-
-        # Instruct the agent to store the credential in wallet
-        if not existing:
-            # post with retry - if returned status is 503 unavailable retry a few times
-            resp = call_agent_with_retry(
-                f"{settings.AGENT_ADMIN_URL}/issue-credential{'-' + v if v else ''}/records/{cred_ex_id}/store",
-                post_method=True,
-                payload={"credential_id": ret_cred_id},
-                headers=settings.ADMIN_REQUEST_HEADERS,
-            )
-            if resp.status_code == 404:
-                # TODO assume the credential exchange has completed?
-                resp = call_agent_with_retry(
-                    f"{settings.AGENT_ADMIN_URL}/credential/{ret_cred_id}",
-                    post_method=False,
-                    headers=settings.ADMIN_REQUEST_HEADERS,
-                )
-                if resp.status_code == 404:
-                    LOGGER.error(
-                        " >>> Error cred exchange id is missing but credential is not available for "
-                        + cred_ex_id
-                        + ", "
-                        + ret_cred_id
-                    )
-                    return Response(
-                        "Error cred exchange id is missing but credential is not available",
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                pass
-            else:
-                resp.raise_for_status()
+        error = request_store_credential(cred_ex_id, ret_cred_id, existing, v)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
 
         response_data = {
             "success": True,
@@ -630,6 +597,181 @@ def receive_credential(cred_ex_id, cred_data, v=None):
         raise e
 
 
+def request_store_credential(cred_ex_id, cred_id, existing=False, v=None):
+    """
+    Have the agent store a processed credential in its wallet. With
+    AGENT_STORE_ASYNC the request is queued and the webhook is acknowledged
+    without waiting for the agent.
+
+    Returns an error message if the agent could not store the credential.
+    """
+    if AGENT_STORE_ASYNC:
+        queue_store_credential(cred_ex_id, cred_id, existing, v)
+        return None
+    return store_credential(cred_ex_id, cred_id, existing, v)
+
+
+def store_credential(cred_ex_id, cred_id, existing=False, v=None):
+    """
+    Instruct the agent to store a processed credential in its wallet.
+
+    Returns an error message if the agent could not store the credential.
+    """
+    # check if the credential is in the wallet already
+    if existing:
+        resp = call_agent_with_retry(
+            f"{settings.AGENT_ADMIN_URL}/credential/{cred_id}",
+            post_method=False,
+            headers=settings.ADMIN_REQUEST_HEADERS,
+        )
+        if resp.status_code == 404:
+            existing = False
+
+    # Instruct the agent to store the credential in wallet
+    if not existing:
+        # post with retry - if returned status is 503 unavailable retry a few times
+        resp = call_agent_with_retry(
+            f"{settings.AGENT_ADMIN_URL}/issue-credential{'-' + v if v else ''}/records/{cred_ex_id}/store",
+            post_method=True,
+            payload={"credential_id": cred_id},
+            headers=settings.ADMIN_REQUEST_HEADERS,
+        )
+        if resp.status_code == 404:
+            # TODO assume the credential exchange has completed?
+            resp = call_agent_with_retry(
+                f"{settings.AGENT_ADMIN_URL}/credential/{cred_id}",
+                post_method=False,
+                headers=settings.ADMIN_REQUEST_HEADERS,
+            )
+            if resp.status_code == 404:
+                LOGGER.error(
+                    " >>> Error cred exchange id is missing but credential is not available for "
+                    + cred_ex_id
+                    + ", "
+                    + cred_id
+                )
+                return (
+                    "Error cred exchange id is missing but credential is not available"
+                )
+        else:
+            resp.raise_for_status()
+
+    return None
+
+
+@swagger_auto_schema(method="post", auto_schema=None)
+@api_view(["POST"])
+@permission_classes((permissions.AllowAny,))
+def receive_credential_batch(request):
+    """
+    Receives a batch of issued credentials, for bulk issuer loads.
+
+    The credentials are stored in the database in a single transaction and then
+    stored in the agent wallet one at a time (or queued for the agent, with
+    AGENT_STORE_ASYNC). Each credential in the batch has
+    the same form as the data extracted from a "credential_received" webhook:
+
+        message = {
+            "credentials": [
+                {
+                    "cred_ex_id": "e2f41814-d625-4218-9f53-879111398372",
+                    "version": "2.0",
+                    "credential": {
+                        "thread_id": "dd56313f-1787-47f7-8838-d6931284ae30",
+                        "schema_id": "...",
+                        "cred_def_id": "...",
+                        "rev_reg_id": null,
+                        "attrs": {"corp_num": "FM0243624", ...}
+                    }
+                },
+                ...
+            ]
+        }
+
+    The response reports the outcome for each credential, in the same order.
+    """
+    start_time = time.perf_counter()
+    method = "agent_callback.credential_batch"
+
+    entries = (
+        request.data.get("credentials") if isinstance(request.data, dict) else None
+    )
+    if not isinstance(entries, list):
+        return Response(
+            "Expected a list of credentials", status=status.HTTP_400_BAD_REQUEST
+        )
+    if MAX_CREDENTIAL_BATCH < len(entries):
+        return Response(
+            f"Batch exceeds the maximum of {MAX_CREDENTIAL_BATCH} credentials",
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    results = [None] * len(entries)
+    credentials = {}
+    for idx, entry in enumerate(entries):
+        try:
+            entry["cred_ex_id"]
+            credentials[idx] = Credential(entry["credential"])
+        except (KeyError, TypeError) as e:
+            results[idx] = {"success": False, "error": f"Invalid credential: {e}"}
+
+    if PROCESS_INBOUND_CREDENTIALS:
+        # sanity check that we haven't received these credentials yet
+        existing_ids = set(
+            CredentialModel.objects.filter(
+                credential_id__in=[c.thread_id for c in credentials.values()]
+            ).values_list("credential_id", flat=True)
+        )
+        existing = {
+            idx for idx, c in credentials.items() if c.thread_id in existing_ids
+        }
+        for idx in existing:
+            LOGGER.error(
+                " >>> Received duplicate for credential_id: "
+                + credentials[idx].thread_id
+                + ", exch id: "
+                + entries[idx]["cred_ex_id"]
+            )
+        new_idxs = [idx for idx in credentials if idx not in existing]
+        processed = credential_manager.process_batch(
+            [credentials[idx] for idx in new_idxs]
+        )
+        for idx, result in zip(new_idxs, processed):
+            if result.error:
+                LOGGER.error(result.error)
+                results[idx] = {"success": False, "error": str(result.error)}
+    else:
+        existing = set()
+
+    for idx, credential in credentials.items():
+        if results[idx]:
+            continue
+        entry = entries[idx]
+        try:
+            error = request_store_credential(
+                entry["cred_ex_id"],
+                credential.thread_id,
+                idx in existing,
+                entry.get("version"),
+            )
+        except Exception as e:
+            LOGGER.error(e)
+            error = str(e)
+        results[idx] = (
+            {"success": False, "error": error}
+            if error
+            else {
+                "success": True,
+                "details": f"Received credential with id {credential.thread_id}",
+            }
+        )
+
+    end_time = time.perf_counter()
+    log_timing_method(method, start_time, end_time, True)
+
+    return Response({"results": results})
+
+
 def raise_random_exception(cred_ex_id, method=""):
     if 1 == random.randint(1, 50):
         print(f"Raise random exception for {cred_ex_id} from method: {method}")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiV2Config(AppConfig):
     name = "api.v2"
     label = "api_v2"
+
+    def ready(self):
+        # record topic and credential changes in the change feed
+        from . import change_feed  # noqa: F401
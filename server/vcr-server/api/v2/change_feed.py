@@ -0,0 +1,181 @@
+import logging
+import os
+import threading
+import zlib
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+from django.db.models import Max, signals
+from django.dispatch import receiver
+
+from api.v2.models.Address import Address
+from api.v2.models.Attribute import Attribute
+from api.v2.models.ChangeEvent import ChangeEvent
+from api.v2.models.Credential import Credential
+from api.v2.models.CredentialSet import CredentialSet
+from api.v2.models.Name import Name
+from api.v2.models.Topic import Topic
+from api.v2.transaction_marker import written_in_transaction
+
+LOGGER = logging.getLogger(__name__)
+
+# number of committed events numbered per statement
+CHANGE_FEED_BATCH_SIZE = int(os.getenv("CHANGE_FEED_BATCH_SIZE") or 1000)
+# days a numbered event is kept, see the prune_change_feed command
+CHANGE_FEED_RETENTION_DAYS = int(os.getenv("CHANGE_FEED_RETENTION_DAYS") or 30)
+
+SEQUENCE_LOCK_KEY = zlib.crc32(b"change_feed:sequence")
+
+OBJECT_TYPES = ((Topic, ChangeEvent.TOPIC), (Credential, ChangeEvent.CREDENTIAL))
+
+_local = threading.local()
+
+
+def object_type(instance):
+    for model_cls, name in OBJECT_TYPES:
+        if isinstance(instance, model_cls):
+            return name
+    return None
+
+
+def recorded_changes(conn):
+    """The changes already recorded in the current transaction"""
+    return written_in_transaction(_local, conn)
+
+
+def record_changes(instances, change=ChangeEvent.UPDATED):
+    """
+    Add topics and credentials to the change feed. Within a transaction each
+    object is recorded once per kind of change, and an update is not recorded
+    for an object created in the same transaction.
+    """
+    conn = transaction.get_connection()
+    recorded = recorded_changes(conn) if conn.in_atomic_block else set()
+    events = []
+    for instance in instances:
+        name = object_type(instance)
+        if name is None or instance.pk is None:
+            continue
+        key = (name, instance.pk)
+        if (key, change) in recorded or (
+            change == ChangeEvent.UPDATED and (key, ChangeEvent.CREATED) in recorded
+        ):
+            continue
+        recorded.add((key, change))
+        events.append(
+            ChangeEvent(object_type=name, object_id=instance.pk, change=change)
+        )
+    if events:
+        ChangeEvent.objects.bulk_create(events)
+
+
+def record_change(instance, created=False, deleted=False):
+    if deleted:
+        change = ChangeEvent.DELETED
+    elif created:
+        change = ChangeEvent.CREATED
+    else:
+        change = ChangeEvent.UPDATED
+    record_changes([instance], change)
+
+
+def related_changes(instance):
+    """
+    The objects changed along with instance: those reached through its
+    reindex_related relations, as for search indexing
+    """
+    for related in getattr(instance, "reindex_related", ()):
+        try:
+            related_obj = getattr(instance, related)
+        except ObjectDoesNotExist:
+            continue
+        if related_obj is None:
+            continue
+        yield related_obj
+        yield from related_changes(related_obj)
+
+
+@receiver(signals.post_save, sender=Topic)
+@receiver(signals.post_save, sender=Credential)
+@receiver(signals.post_save, sender=CredentialSet)
+@receiver(signals.post_save, sender=Name)
+@receiver(signals.post_save, sender=Address)
+@receiver(signals.post_save, sender=Attribute)
+def instance_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    record_change(instance, created=created)
+    record_changes(list(related_changes(instance)))
+
+
+@receiver(signals.post_delete, sender=Topic)
+@receiver(signals.post_delete, sender=Credential)
+@receiver(signals.post_delete, sender=CredentialSet)
+@receiver(signals.post_delete, sender=Name)
+@receiver(signals.post_delete, sender=Address)
+@receiver(signals.post_delete, sender=Attribute)
+def instance_deleted(sender, instance, **kwargs):
+    record_change(instance, deleted=True)
+    # objects reached through reindex_related were changed, not deleted
+    record_changes(list(related_changes(instance)))
+
+
+def assign_sequence():
+    """
+    Number the committed events that have no sequence number yet, in the order
+    they were recorded. Numbering is serialized by a Postgres advisory lock,
+    and an event is only numbered once it is visible to every reader, so the
+    sequence seen by consumers only grows.
+    """
+    if not ChangeEvent.objects.filter(seq__isnull=True).exists():
+        # nothing to number, don't wait for the lock
+        return 0
+    assigned = 0
+    while True:
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_advisory_xact_lock(%s)", [SEQUENCE_LOCK_KEY]
+                    )
+            last = ChangeEvent.objects.aggregate(last=Max("seq"))["last"] or 0
+            pending = list(
+                ChangeEvent.objects.filter(seq__isnull=True).order_by("id")[
+                    :CHANGE_FEED_BATCH_SIZE
+                ]
+            )
+            for event in pending:
+                last += 1
+                event.seq = last
+            ChangeEvent.objects.bulk_update(pending, ["seq"])
+        assigned += len(pending)
+        if len(pending) < CHANGE_FEED_BATCH_SIZE:
+            break
+    if assigned:
+        LOGGER.debug("Numbered %d change feed events", assigned)
+    return assigned
+
+
+def prune_changes(before, batch_size=None):
+    """
+    Delete the numbered events recorded before a datetime, in batches;
+    returns the number deleted
+    """
+    batch_size = batch_size or CHANGE_FEED_BATCH_SIZE
+    deleted = 0
+    while True:
+        ids = list(
+            ChangeEvent.objects.filter(
+                seq__isnull=False, create_timestamp__lt=before
+            ).values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted += ChangeEvent.objects.filter(id__in=ids).delete()[0]
+    return deleted
+
+
+def changes_after(after, limit):
+    """Up to limit numbered events after the sequence number after"""
+    assign_sequence()
+    return list(ChangeEvent.objects.filter(seq__gt=after).order_by("seq")[:limit])
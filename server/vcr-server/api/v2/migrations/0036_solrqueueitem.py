@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0035_credential_format'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolrQueueItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, blank=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, blank=True, null=True)),
+                ('index_cls', models.TextField()),
+                ('using', models.TextField(null=True)),
+                ('object_id', models.TextField()),
+                ('remove', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'solr_queue',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0036_solrqueueitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solrqueueitem',
+            name='partition',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterIndexTogether(
+            name='solrqueueitem',
+            index_together={('index_cls', 'partition')},
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0037_solrqueueitem_partition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solrqueueitem',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='solrqueueitem',
+            name='next_attempt',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.CreateModel(
+            name='SolrDeadLetter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, blank=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, blank=True, null=True)),
+                ('index_cls', models.TextField()),
+                ('using', models.TextField(null=True)),
+                ('object_id', models.TextField()),
+                ('remove', models.BooleanField(default=False)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(null=True)),
+            ],
+            options={
+                'db_table': 'solr_dead_letter',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0038_solr_retry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, blank=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, blank=True, null=True)),
+                ('index_cls', models.TextField(unique=True)),
+                ('high_water', models.DateTimeField(null=True)),
+                ('run_until', models.DateTimeField(null=True)),
+                ('completed_ranges', models.TextField(default='[]')),
+            ],
+            options={
+                'db_table': 'search_index_checkpoint',
+                'ordering': ('id',),
+            },
+        ),
+    ]
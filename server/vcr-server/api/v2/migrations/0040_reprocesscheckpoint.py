@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0039_searchindexcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReprocessCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, blank=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, blank=True, null=True)),
+                ('job_key', models.TextField(unique=True)),
+                ('max_id', models.IntegerField(null=True)),
+                ('completed_ranges', models.TextField(default='[]')),
+            ],
+            options={
+                'db_table': 'reprocess_checkpoint',
+                'ordering': ('id',),
+            },
+        ),
+    ]
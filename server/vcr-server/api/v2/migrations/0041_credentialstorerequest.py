@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0040_reprocesscheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CredentialStoreRequest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, blank=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, blank=True, null=True)),
+                ('cred_ex_id', models.TextField()),
+                ('credential_id', models.TextField()),
+                ('existing', models.BooleanField(default=False)),
+                ('version', models.TextField(null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(db_index=True, null=True)),
+                ('error', models.TextField(null=True)),
+            ],
+            options={
+                'db_table': 'credential_store_outbox',
+                'ordering': ('id',),
+            },
+        ),
+    ]
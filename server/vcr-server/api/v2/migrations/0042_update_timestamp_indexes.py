@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0041_credentialstorerequest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='credential',
+            index=models.Index(fields=['update_timestamp'], name='credential_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['update_timestamp'], name='topic_updated_idx'),
+        ),
+    ]
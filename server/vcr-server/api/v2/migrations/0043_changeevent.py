@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0042_update_timestamp_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, blank=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, blank=True, null=True)),
+                ('seq', models.BigIntegerField(null=True, unique=True)),
+                ('object_type', models.CharField(max_length=16)),
+                ('object_id', models.IntegerField()),
+                ('change', models.CharField(max_length=16)),
+            ],
+            options={
+                'db_table': 'change_feed',
+                'ordering': ('id',),
+            },
+        ),
+    ]
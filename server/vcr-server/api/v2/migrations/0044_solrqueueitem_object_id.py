@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v2', '0043_changeevent'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='solrqueueitem',
+            index_together={('index_cls', 'partition'), ('index_cls', 'object_id')},
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import models
+
+from .Auditable import Auditable
+
+
+class ChangeEvent(Auditable):
+    """
+    A topic or credential that was created, updated or deleted. Events are
+    numbered in seq once they are committed, so consumers of the change feed
+    never see a lower number appear after a higher one.
+    """
+
+    TOPIC = "topic"
+    CREDENTIAL = "credential"
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+    seq = models.BigIntegerField(null=True, unique=True)
+    object_type = models.CharField(max_length=16)
+    object_id = models.IntegerField()
+    change = models.CharField(max_length=16)
+
+    class Meta:
+        db_table = "change_feed"
+        ordering = ("id",)
@@ -56,6 +56,9 @@ class Credential(Auditable):
         db_table = "credential"
         ordering = ("id",)
         index_together = ["topic", "latest", "revoked"]
+        indexes = [
+            models.Index(fields=["update_timestamp"], name="credential_updated_idx")
+        ]
 
     _cache = None
 
@@ -80,7 +83,11 @@ class Credential(Auditable):
 
     @property
     def all_categories(self):
-        return self._cached("categories", self.attributes.filter(format="category"))
+        # may be prefetched for topic indexing
+        categories = getattr(self, "category_attributes", None)
+        if categories is None:
+            categories = self.attributes.filter(format="category")
+        return self._cached("categories", categories)
 
     @property
     def all_credential_type_ids(self):
@@ -0,0 +1,22 @@
+from django.db import models
+
+from .Auditable import Auditable
+
+
+class CredentialStoreRequest(Auditable):
+    """
+    A processed credential waiting for the agent to store it in its wallet;
+    the request is retried until the agent accepts it
+    """
+
+    cred_ex_id = models.TextField()
+    credential_id = models.TextField()
+    existing = models.BooleanField(default=False)
+    version = models.TextField(null=True)
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, db_index=True)
+    error = models.TextField(null=True)
+
+    class Meta:
+        db_table = "credential_store_outbox"
+        ordering = ("id",)
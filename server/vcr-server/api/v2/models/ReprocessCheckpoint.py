@@ -0,0 +1,30 @@
+import json
+
+from django.db import models
+
+from .Auditable import Auditable
+
+
+class ReprocessCheckpoint(Auditable):
+    """
+    Progress of a reprocess_credentials run, keyed by its filters: the highest
+    credential id when the run started and the id ranges it has finished
+    """
+
+    job_key = models.TextField(unique=True)
+    max_id = models.IntegerField(null=True)
+    completed_ranges = models.TextField(default="[]")
+
+    class Meta:
+        db_table = "reprocess_checkpoint"
+        ordering = ("id",)
+
+    def get_completed_ranges(self):
+        return {
+            tuple(id_range) for id_range in json.loads(self.completed_ranges or "[]")
+        }
+
+    def set_completed_ranges(self, id_ranges):
+        self.completed_ranges = json.dumps(
+            sorted(list(id_range) for id_range in id_ranges)
+        )
@@ -0,0 +1,32 @@
+import json
+
+from django.db import models
+
+from .Auditable import Auditable
+
+
+class SearchIndexCheckpoint(Auditable):
+    """
+    Progress of incremental reindexing for one search index: rows updated up
+    to high_water are indexed; a run in progress covers rows updated up to
+    run_until and records the id ranges it has finished
+    """
+
+    index_cls = models.TextField(unique=True)
+    high_water = models.DateTimeField(null=True)
+    run_until = models.DateTimeField(null=True)
+    completed_ranges = models.TextField(default="[]")
+
+    class Meta:
+        db_table = "search_index_checkpoint"
+        ordering = ("id",)
+
+    def get_completed_ranges(self):
+        return {
+            tuple(id_range) for id_range in json.loads(self.completed_ranges or "[]")
+        }
+
+    def set_completed_ranges(self, id_ranges):
+        self.completed_ranges = json.dumps(
+            sorted(list(id_range) for id_range in id_ranges)
+        )
@@ -0,0 +1,21 @@
+from django.db import models
+
+from .Auditable import Auditable
+
+
+class SolrDeadLetter(Auditable):
+    """
+    A search index update or removal that kept failing and was taken out of
+    the Solr queue; it can be re-driven once the cause is fixed
+    """
+
+    index_cls = models.TextField()
+    using = models.TextField(null=True)
+    object_id = models.TextField()
+    remove = models.BooleanField(default=False)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(null=True)
+
+    class Meta:
+        db_table = "solr_dead_letter"
+        ordering = ("id",)
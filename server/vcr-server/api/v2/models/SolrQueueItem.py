@@ -0,0 +1,23 @@
+from django.db import models
+
+from .Auditable import Auditable
+
+
+class SolrQueueItem(Auditable):
+    """
+    A pending search index update or removal, written in the same database
+    transaction as the change to the indexed record
+    """
+
+    index_cls = models.TextField()
+    using = models.TextField(null=True)
+    object_id = models.TextField()
+    partition = models.IntegerField(default=0)
+    remove = models.BooleanField(default=False)
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = "solr_queue"
+        index_together = [["index_cls", "partition"], ["index_cls", "object_id"]]
+        ordering = ("id",)
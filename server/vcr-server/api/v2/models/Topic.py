@@ -1,4 +1,7 @@
+from operator import attrgetter
+
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 from .Address import Address
@@ -31,15 +34,21 @@ class Topic(Auditable):
         db_table = "topic"
         unique_together = (("source_id", "type"),)
         ordering = ("id",)
+        indexes = [models.Index(fields=["update_timestamp"], name="topic_updated_idx")]
+
+    # Topics loaded in bulk carry prefetched `active_credentials` and
+    # `foundational_sets` lists (see api.v4.serializers.search.projection),
+    # which the methods below use instead of querying per topic.
 
-    @property
+    @cached_property
     def foundational_credential(self):
-        if self.credential_sets:
-            foundational_set = self.credential_sets.filter(
+        foundational_sets = getattr(self, "foundational_sets", None)
+        if foundational_sets is None:
+            foundational_sets = self.credential_sets.filter(
                 credential_type__description=self.type
-            ).all()
-            if foundational_set and 0 < len(foundational_set):
-                return foundational_set[0].latest_credential
+            ).select_related("latest_credential")[:1]
+        for foundational_set in foundational_sets:
+            return foundational_set.latest_credential
         return None
 
     def save(self, *args, **kwargs):
@@ -50,7 +59,19 @@ class Topic(Auditable):
         self.full_clean()
         super(Topic, self).save(*args, **kwargs)
 
+    def _prefetched_active(self, related):
+        """Related rows of the prefetched active credentials, if any"""
+        active = getattr(self, "active_credentials", None)
+        if active is None:
+            return None
+        return sorted(
+            (row for cred in active for row in getattr(cred, related).all()),
+            key=attrgetter("id"),
+        )
+
     def get_active_credential_ids(self):
+        if self._active_cred_ids is None and hasattr(self, "active_credentials"):
+            self._active_cred_ids = {cred.id for cred in self.active_credentials}
         if self._active_cred_ids is None:
             self._active_cred_ids = set(
                 self.credentials.filter(latest=True, revoked=False)
@@ -60,6 +81,10 @@ class Topic(Auditable):
         return self._active_cred_ids
 
     def get_active_credential_type_ids(self):
+        if self._active_cred_type_ids is None and hasattr(self, "active_credentials"):
+            self._active_cred_type_ids = {
+                cred.credential_type_id for cred in self.active_credentials
+            }
         if self._active_cred_type_ids is None:
             self._active_cred_type_ids = set(
                 self.credentials.filter(latest=True, revoked=False)
@@ -69,12 +94,22 @@ class Topic(Auditable):
         return self._active_cred_type_ids
 
     def get_active_addresses(self):
+        prefetched = self._prefetched_active("addresses")
+        if prefetched is not None:
+            return prefetched
         creds = self.get_active_credential_ids()
         if creds:
             return Address.objects.filter(credential_id__in=creds)
         return []
 
     def get_active_attributes(self):
+        prefetched = self._prefetched_active("attributes")
+        if prefetched is not None:
+            return [
+                attr
+                for attr in prefetched
+                if attr.credential.credential_type.description == self.type
+            ]
         creds = self.get_active_credential_ids()
         if creds:
             return Attribute.objects.filter(
@@ -84,24 +119,19 @@ class Topic(Auditable):
         return []
 
     def get_active_names(self):
+        prefetched = self._prefetched_active("names")
+        if prefetched is not None:
+            return prefetched
         creds = self.get_active_credential_ids()
         if creds:
             return Name.objects.filter(credential_id__in=creds)
         return []
 
     def get_local_name(self):
-        creds = self.get_active_credential_ids()
-        if creds:
-            names = Name.objects.filter(credential_id__in=creds)
-            return local_name(names)
-        return None
+        return local_name(self.get_active_names())
 
     def get_remote_name(self):
-        creds = self.get_active_credential_ids()
-        if creds:
-            names = Name.objects.filter(credential_id__in=creds)
-            return remote_name(names)
-        return None
+        return remote_name(self.get_active_names())
 
     def get_active_related_to(self):
         return self.related_to.filter(
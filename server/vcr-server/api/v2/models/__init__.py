@@ -1,12 +1,18 @@
 from .Address import Address
 from .Attribute import Attribute
+from .ChangeEvent import ChangeEvent
 from .Claim import Claim
 from .Credential import Credential
 from .CredentialSet import CredentialSet
+from .CredentialStoreRequest import CredentialStoreRequest
 from .CredentialType import CredentialType
 from .Issuer import Issuer
 from .Name import Name
+from .ReprocessCheckpoint import ReprocessCheckpoint
 from .Schema import Schema
+from .SearchIndexCheckpoint import SearchIndexCheckpoint
+from .SolrDeadLetter import SolrDeadLetter
+from .SolrQueueItem import SolrQueueItem
 from .Topic import Topic
 from .TopicRelationship import TopicRelationship
 from .User import User
@@ -14,13 +20,19 @@ from .User import User
 __all__ = [
     "Address",
     "Attribute",
+    "ChangeEvent",
     "Claim",
     "Credential",
     "CredentialSet",
+    "CredentialStoreRequest",
     "CredentialType",
     "Issuer",
     "Name",
+    "ReprocessCheckpoint",
     "Schema",
+    "SearchIndexCheckpoint",
+    "SolrDeadLetter",
+    "SolrQueueItem",
     "Topic",
     "TopicRelationship",
     "User",
@@ -1,8 +1,11 @@
 import logging
+import threading
 
 from django.db import transaction
 from haystack import indexes
 
+from api.v2.transaction_marker import written_in_transaction
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -15,6 +18,7 @@ class TxnAwareSearchIndex(indexes.SearchIndex):
         self._transaction_added = {}
         self._transaction_removed = {}
         self._transaction_savepts = None
+        self._local = threading.local()
 
     def reset(self):
         LOGGER.debug("Resetting TxnAwareSearchIndex ...")
@@ -22,10 +26,29 @@ class TxnAwareSearchIndex(indexes.SearchIndex):
         self._transaction_removed = {}
         self._transaction_savepts = None
 
+    def queue_in_transaction(self, conn, using, instance, delete=False):
+        """
+        Write an index item to a transactional backend queue as part of the
+        current transaction, once per instance
+        """
+        queued = written_in_transaction(self._local, conn)
+        key = (using, instance.id, delete)
+        if key not in queued:
+            queued.add(key)
+            if delete:
+                self._backend_queue.delete(self.__class__, using, [instance])
+            else:
+                self._backend_queue.add(self.__class__, using, [instance])
+
     def update_object(self, instance, using=None, **kwargs):
         LOGGER.debug("Updating object; %s ...", instance.id)
         conn = transaction.get_connection()
-        if conn.in_atomic_block:
+        if conn.in_atomic_block and getattr(
+            self._backend_queue, "transactional", False
+        ):
+            if self.should_update(instance, **kwargs):
+                self.queue_in_transaction(conn, using, instance)
+        elif conn.in_atomic_block:
             if self._transaction_savepts != conn.savepoint_ids:
                 self._transaction_savepts = conn.savepoint_ids
                 conn.on_commit(self.transaction_committed)
@@ -49,7 +72,11 @@ class TxnAwareSearchIndex(indexes.SearchIndex):
     def remove_object(self, instance, using=None, **kwargs):
         LOGGER.debug("Removing object; %s ...", instance.id)
         conn = transaction.get_connection()
-        if conn.in_atomic_block:
+        if conn.in_atomic_block and getattr(
+            self._backend_queue, "transactional", False
+        ):
+            self.queue_in_transaction(conn, using, instance, delete=True)
+        elif conn.in_atomic_block:
             if self._transaction_savepts != conn.savepoint_ids:
                 self._transaction_savepts = conn.savepoint_ids
                 conn.on_commit(self.transaction_committed)
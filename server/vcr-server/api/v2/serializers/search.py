@@ -11,8 +11,6 @@ from rest_framework.utils.serializer_helpers import ReturnDict
 
 from api.v2.models.Address import Address
 from api.v2.models.Attribute import Attribute
-from api.v2.models.CredentialType import CredentialType
-from api.v2.models.Issuer import Issuer
 from api.v2.models.Name import Name
 from api.v2.search_indexes import CredentialIndex
 from api.v2.serializers.rest import (AddressSerializer, AttributeSerializer,
@@ -28,8 +26,16 @@ from api.v2.serializers.rest import (AddressSerializer, AttributeSerializer,
                                      TopicRelationshipSerializer,
                                      TopicSerializer)
 
+from agent_webhooks.utils.credential_type_cache import credential_type_cache
+
 logger = logging.getLogger(__name__)
 
+# display text of facet values, by facet field
+facet_label_map = {
+    "issuer_id": "issuer",
+    "credential_type_id": "credential_type",
+}
+
 
 class SearchResultsListSerializer(ListSerializer):
     @staticmethod
@@ -347,13 +353,13 @@ class CredentialFacetSerializer(HaystackFacetSerializer):
 
     def format_facets(self, field_name, facets):
         result = []
+        labels = facet_label_map.get(field_name)
+        if labels:
+            labels = credential_type_cache.labels()[labels]
         for facet in facets:
             row = {"value": facet[0], "count": facet[1]}
-            # naive method - can be optimized
-            if field_name == "issuer_id":
-                row["text"] = Issuer.objects.get(pk=row["value"]).name
-            elif field_name == "credential_type_id":
-                row["text"] = CredentialType.objects.get(pk=row["value"]).description
+            if labels:
+                row["text"] = labels.get(str(row["value"]))
             result.append(row)
         return result
 
@@ -1,8 +1,12 @@
+import json
 from unittest.mock import patch
 
 from django.http import HttpRequest, JsonResponse
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
 
+from api.v2.models.SolrDeadLetter import SolrDeadLetter
+from api.v2.models.User import User
 from api.v2.views import misc
 
 # TODO: figure out why the request.POST dictionary gets reset, thus making the test fail
@@ -105,3 +109,46 @@ class Misc_Quickload_TestCase(TestCase):
             ).content,
             "The JsonResponse should match.",
         )
+
+
+class Misc_SolrDeadLetters_TestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.admin = User.objects.create(username="admin", DID="admin", is_staff=True)
+        SolrDeadLetter.objects.create(
+            index_cls="api.v2.search_indexes.CredentialIndex",
+            object_id="1",
+            attempts=8,
+            error="Bad document",
+        )
+
+    def test_dead_letters_require_admin(self):
+        request = self.factory.get("/api/v2/solr/dead-letters")
+        result = misc.solr_dead_letters(request)
+        self.assertIn(result.status_code, (401, 403))
+
+    def test_dead_letters_list(self):
+        request = self.factory.get("/api/v2/solr/dead-letters")
+        force_authenticate(request, user=self.admin)
+        result = misc.solr_dead_letters(request)
+        self.assertEqual(result.status_code, 200)
+        self.assertIn(b'"count": 1', result.content)
+
+    def test_dead_letters_limit(self):
+        for limit in ("-1", "0", "100000"):
+            request = self.factory.get("/api/v2/solr/dead-letters", {"limit": limit})
+            force_authenticate(request, user=self.admin)
+            result = misc.solr_dead_letters(request)
+            self.assertEqual(result.status_code, 200)
+            self.assertEqual(len(json.loads(result.content)["results"]), 1)
+
+    @patch("api.v2.views.misc.redrive_dead_letters", autospec=True)
+    def test_dead_letters_redrive(self, mock_redrive):
+        mock_redrive.return_value = 1
+        request = self.factory.post(
+            "/api/v2/solr/dead-letters/redrive", {"ids": [1]}, format="json"
+        )
+        force_authenticate(request, user=self.admin)
+        result = misc.redrive_solr_dead_letters(request)
+        mock_redrive.assert_called_once_with([1])
+        self.assertEqual(result.content, JsonResponse({"requeued": 1}).content)
@@ -1,11 +1,18 @@
+from django.db import connection
 from django.test import modify_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from api.v2.models.Credential import Credential
+from api.v2.models.CredentialSet import CredentialSet
 from api.v2.models.CredentialType import CredentialType
 from api.v2.models.Issuer import Issuer
+from api.v2.models.Name import Name
 from api.v2.models.Schema import Schema
+from api.v2.models.Topic import Topic
+from api.v2.models.TopicRelationship import TopicRelationship
 
 
 @modify_settings(
@@ -219,3 +226,91 @@ class CredentialTypeViewSetTest(APITestCase):
 
         response2 = self.client.get(url + "/2/logo")
         self.assertEqual(response2.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@modify_settings(
+    MIDDLEWARE={"remove": "app.middleware.routing.HTTPHeaderRoutingMiddleware"}
+)
+class TopicViewSetTest(APITestCase):
+    def setUp(self):
+        schema = Schema.objects.create(
+            name="test-schema", version="0.0.1", origin_did="not:a:did:456"
+        )
+        issuer = Issuer.objects.create(did="not:a:did:456", name="Test Issuer 1")
+        self.credType = CredentialType.objects.create(
+            schema=schema, issuer=issuer, description="registration"
+        )
+        self.topic = Topic.objects.create(source_id="BC0000001", type="registration")
+        self.related_topic = Topic.objects.create(
+            source_id="BC0000002", type="registration"
+        )
+        self.add_credential(self.related_topic, "Related Name", "entity_name")
+
+    def add_credential(self, topic, text=None, name_type="entity_name"):
+        credential = Credential.objects.create(
+            topic=topic,
+            credential_type=self.credType,
+            credential_id=f"{topic.source_id}-{topic.credentials.count()}",
+            latest=True,
+        )
+        credential.credential_set = CredentialSet.objects.create(
+            topic=topic, credential_type=self.credType, latest_credential=credential
+        )
+        credential.save()
+        if text:
+            Name.objects.create(credential=credential, text=text, type=name_type)
+        return credential
+
+    def get_credential_sets(self):
+        url = reverse("v2:topic-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"{url}/{self.topic.id}/credentialset")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, len(queries)
+
+    def test_list_credential_sets(self):
+        credential = self.add_credential(
+            self.topic, "Assumed Name", "entity_name_assumed"
+        )
+        Name.objects.create(
+            credential=credential, text="Legal Name", type="entity_name"
+        )
+        TopicRelationship.objects.create(
+            credential=credential, topic=self.topic, related_topic=self.related_topic
+        )
+        # no names of its own, so the names of the topic are used
+        self.add_credential(self.topic)
+
+        data, _ = self.get_credential_sets()
+        self.assertEqual(len(data), 2)
+        first = data[0]["credentials"][0]
+        self.assertEqual(first["local_name"]["text"], "Assumed Name")
+        self.assertEqual(first["remote_name"]["text"], "Legal Name")
+        self.assertEqual(first["topic"]["local_name"]["text"], "Assumed Name")
+        self.assertEqual(
+            first["related_topics"][0]["local_name"]["text"], "Related Name"
+        )
+        self.assertEqual(first["related_topics"][0]["remote_name"], {})
+        self.assertEqual(first["credential_type"]["description"], "registration")
+        second = data[1]["credentials"][0]
+        self.assertEqual(second["names"], [])
+        self.assertEqual(second["local_name"]["text"], "Assumed Name")
+
+    def test_list_credential_sets_queries(self):
+        credential = self.add_credential(self.topic, "Name 0")
+        TopicRelationship.objects.create(
+            credential=credential, topic=self.topic, related_topic=self.related_topic
+        )
+        _, expected = self.get_credential_sets()
+
+        for idx in range(1, 4):
+            credential = self.add_credential(self.topic, f"Name {idx}")
+            TopicRelationship.objects.create(
+                credential=credential,
+                topic=self.topic,
+                related_topic=self.related_topic,
+            )
+        data, num_queries = self.get_credential_sets()
+        self.assertEqual(len(data), 4)
+        # the same number of queries for any number of credentials
+        self.assertEqual(num_queries, expected)
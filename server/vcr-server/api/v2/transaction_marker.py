@@ -0,0 +1,31 @@
+class TransactionMarker:
+    """
+    No-op on_commit hook marking the transaction (and savepoint) that a set of
+    rows were written in. Django drops the hook if the transaction or
+    savepoint is rolled back, which tells us the written rows are gone too.
+    """
+
+    def __init__(self, savepoint_ids):
+        self.savepoint_ids = savepoint_ids
+        self.written = set()
+
+    def __call__(self):
+        pass
+
+
+def written_in_transaction(local, conn) -> set:
+    """
+    The keys of the rows written in the current transaction and savepoint;
+    the marker is kept per thread in local
+    """
+    marker = getattr(local, "marker", None)
+    # atomic blocks without a savepoint are rolled back with the enclosing one
+    savepoint_ids = [sid for sid in conn.savepoint_ids if sid is not None]
+    if (
+        marker is None
+        or marker.savepoint_ids != savepoint_ids
+        or not any(hook[1] is marker for hook in conn.run_on_commit)
+    ):
+        marker = local.marker = TransactionMarker(savepoint_ids)
+        conn.on_commit(marker)
+    return marker.written
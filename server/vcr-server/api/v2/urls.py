@@ -51,6 +51,8 @@ miscPatterns = [
     path("quickload", misc.quickload),
     path("status/reset", clear_stats),
     path("status", get_stats),
+    path("solr/dead-letters", misc.solr_dead_letters),
+    path("solr/dead-letters/redrive", misc.redrive_solr_dead_letters),
 ]
 
 swaggerPatterns = [
@@ -13,7 +13,8 @@ import time
 import json
 
 
-from subscriptions.models import CredentialHookStats
+from subscriptions.utils import hook_stats_report
+from api.v2.search.index import TxnAwareSearchIndex
 
 from django.conf import settings
 from django.forms.models import model_to_dict
@@ -154,16 +155,12 @@ def get_stats(request, *args, **kwargs):
         hook_worker_stats = {}
         if "subscriptions" in settings.INSTALLED_APPS:
             # Only add hook stats IF the module is enabled/in use
-            for item in CredentialHookStats.objects.all():
-                hook_worker_stats[f"web_hook.worker_stats.{item.worker_id}"] = {
-                    "total_count": item.total_count,
-                    "attempt_count": item.attempt_count,
-                    "success_count": item.success_count,
-                    "fail_count": item.fail_count,
-                    "retry_count": item.retry_count,
-                    "retry_fail_count": item.retry_fail_count
-                }
-        return JsonResponse({**timings, **hook_worker_stats})
+            hook_worker_stats = hook_stats_report()
+        solr_queue_stats = {}
+        if TxnAwareSearchIndex._backend_queue:
+            # throughput of the real-time indexing workers in this process
+            solr_queue_stats = TxnAwareSearchIndex._backend_queue.stats()
+        return JsonResponse({**timings, **hook_worker_stats, **solr_queue_stats})
     finally:
         timing_lock.release()
 
@@ -2,6 +2,7 @@ import logging
 
 from django.conf import settings
 from django.db import connection
+from django.forms.models import model_to_dict
 from django.http import JsonResponse
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -21,10 +22,15 @@ from api.v2.models.CredentialType import CredentialType
 from api.v2.models.Issuer import Issuer
 from api.v2.models.Topic import Topic
 from api.v2.models.Name import Name
+from api.v2.models.SolrDeadLetter import SolrDeadLetter
 from api.v2.utils import model_counts, record_count, solr_counts
+from vcr_server.utils.solrqueue import redrive_dead_letters
 
 LOGGER = logging.getLogger(__name__)
 
+# max number of dead letters listed at once
+DEAD_LETTERS_MAX_LIMIT = 1000
+
 
 @swagger_auto_schema(
     method="get", operation_id="api_v2_quickload", operation_description="quick load"
@@ -103,3 +109,44 @@ def send_feedback(request, *args, **kwargs):
     comments = request.POST.get("comments")
     email_feedback(from_name, from_email, reason, comments)
     return JsonResponse({"status": "ok"})
+
+
+@swagger_auto_schema(
+    method="get",
+    operation_id="api_v2_solr_dead_letters",
+    operation_description="Search index updates that failed and were taken out of the Solr queue",
+)
+@api_view(["GET"])
+@permission_classes((permissions.IsAdminUser,))
+def solr_dead_letters(request, *args, **kwargs):
+    try:
+        limit = int(request.GET.get("limit", 100))
+    except ValueError:
+        limit = 100
+    limit = min(max(limit, 1), DEAD_LETTERS_MAX_LIMIT)
+    letters = SolrDeadLetter.objects.all()[:limit]
+    return JsonResponse(
+        {
+            "count": SolrDeadLetter.objects.count(),
+            "results": [
+                {**model_to_dict(letter), "create_timestamp": letter.create_timestamp}
+                for letter in letters
+            ],
+        }
+    )
+
+
+@swagger_auto_schema(
+    method="post",
+    operation_id="api_v2_solr_dead_letters_redrive",
+    operation_description="Move failed search index updates back onto the Solr queue",
+)
+@api_view(["POST"])
+@permission_classes((permissions.IsAdminUser,))
+def redrive_solr_dead_letters(request, *args, **kwargs):
+    # re-drive the listed ids, or everything if no ids are given
+    ids = request.data.get("ids") if hasattr(request.data, "get") else None
+    if ids is not None and not isinstance(ids, list):
+        return JsonResponse({"detail": "ids must be a list"}, status=400)
+    count = redrive_dead_letters(ids)
+    return JsonResponse({"requeued": count})
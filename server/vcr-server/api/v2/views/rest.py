@@ -5,7 +5,7 @@ from logging import getLogger
 from time import sleep
 
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as filters
@@ -208,66 +208,59 @@ class TopicViewSet(ReadOnlyModelViewSet):
     def list_credential_sets(self, request, pk=None):
         item = self.get_object()
 
+        # Load every credential, name and topic shown in a fixed number of
+        # queries; local and remote names are then resolved in memory
+        active_credentials = Credential.objects.filter(latest=True, revoked=False)
         credential_sets = (
             item.credential_sets
-            # .select_related("credential_type", "topic")
             .prefetch_related(
-                # "credentials__addresses",
-                "credentials__related_topics",
-                "credentials__credential_type",
+                Prefetch(
+                    "credentials",
+                    queryset=Credential.objects.select_related("credential_type"),
+                ),
+                "credentials__names",
                 "credentials__topic",
+                "credentials__related_topics",
+                Prefetch(
+                    "credentials__topic__credentials",
+                    queryset=active_credentials,
+                    to_attr="active_credentials",
+                ),
+                "credentials__topic__active_credentials__names",
+                Prefetch(
+                    "credentials__related_topics__credentials",
+                    queryset=active_credentials,
+                    to_attr="active_credentials",
+                ),
+                "credentials__related_topics__active_credentials__names",
             )
             .order_by("first_effective_date")
             .all()
         )
 
+        def format_name(name):
+            if not name:
+                return {}
+            return {
+                "id": name.id,
+                "text": name.text or None,
+                "language": name.language or None,
+                "credential_id": name.credential_id or None,
+                "type": name.type or None,
+            }
+
+        # Credential names fall back to the names of the topic
         def get_credential_local_name(credential):
-            if not credential.get_local_name():
-                return get_topic_local_name(credential.topic)
-            else:
-                return {
-                    "id": credential.get_local_name().id,
-                    "text": credential.get_local_name().text or None,
-                    "language": credential.get_local_name().language or None,
-                    "credential_id": credential.get_local_name().credential_id or None,
-                    "type": credential.get_local_name().type or None,
-                }
+            return format_name(credential.get_local_name())
 
         def get_credential_remote_name(credential):
-            if not credential.get_remote_name():
-                return get_topic_remote_name(credential.topic)
-            else:
-                return {
-                    "id": credential.get_remote_name().id,
-                    "text": credential.get_remote_name().text or None,
-                    "language": credential.get_remote_name().language or None,
-                    "credential_id": credential.get_remote_name().credential_id or None,
-                    "type": credential.get_remote_name().type or None,
-                }
+            return format_name(credential.get_remote_name())
 
         def get_topic_local_name(topic):
-            if not topic.get_local_name():
-                return {}
-            else:
-                return {
-                    "id": topic.get_local_name().id,
-                    "text": topic.get_local_name().text or None,
-                    "language": topic.get_local_name().language or None,
-                    "credential_id": topic.get_local_name().credential_id or None,
-                    "type": topic.get_local_name().type or None,
-                }
+            return format_name(topic.get_local_name())
 
         def get_topic_remote_name(topic):
-            if not topic.get_remote_name():
-                return {}
-            else:
-                return { 
-                    "id": topic.get_remote_name().id,
-                    "text": topic.get_remote_name().text or None,
-                    "language": topic.get_remote_name().language or None,
-                    "credential_id": topic.get_remote_name().credential_id or None,
-                    "type": topic.get_remote_name().type or None,
-                }
+            return format_name(topic.get_remote_name())
 
         data = [
             {
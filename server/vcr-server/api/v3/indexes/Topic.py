@@ -1,9 +1,12 @@
 import logging
 
+from django.db.models import Exists, OuterRef
 from haystack import indexes
 
+from api.v2.models.Credential import Credential
 from api.v2.models.Topic import Topic as TopicModel
 from api.v2.search.index import TxnAwareSearchIndex
+from api.v4.serializers.search.projection import prefetch_projection, topic_projection
 
 LOGGER = logging.getLogger(__name__)
 
@@ -22,10 +25,25 @@ class TopicIndex(TxnAwareSearchIndex, indexes.Indexable):
     topic_credential_type_id = indexes.MultiValueField()
     topic_all_credentials_inactive = indexes.BooleanField()
     topic_all_credentials_revoked = indexes.BooleanField()
+    topic_projection = indexes.CharField(indexed=False, null=True)
 
     def get_model(self):
         return TopicModel
 
+    def index_queryset(self, using=None):
+        # load what the prepare methods need for a whole batch of topics in a
+        # fixed number of queries
+        credentials = Credential.objects.filter(topic=OuterRef("pk"))
+        queryset = prefetch_projection(
+            super(TopicIndex, self)
+            .index_queryset(using)
+            .annotate(
+                has_active_credential=Exists(credentials.filter(inactive=False)),
+                has_unrevoked_credential=Exists(credentials.filter(revoked=False)),
+            )
+        )
+        return queryset
+
     @staticmethod
     def prepare_topic_issuer_id(obj):
         if obj.foundational_credential:
@@ -82,19 +100,22 @@ class TopicIndex(TxnAwareSearchIndex, indexes.Indexable):
 
     @staticmethod
     def prepare_topic_all_credentials_inactive(obj):
-        all_creds_inactive = True
-        for credential in obj.credentials.all():
-            if not credential.inactive:
-                all_creds_inactive = False
-        return all_creds_inactive
+        has_active = getattr(obj, "has_active_credential", None)
+        if has_active is None:
+            has_active = obj.credentials.filter(inactive=False).exists()
+        return not has_active
 
     @staticmethod
     def prepare_topic_all_credentials_revoked(obj):
-        all_creds_revoked = True
-        for credential in obj.credentials.all():
-            if not credential.revoked:
-                all_creds_revoked = False
-        return all_creds_revoked
+        has_unrevoked = getattr(obj, "has_unrevoked_credential", None)
+        if has_unrevoked is None:
+            has_unrevoked = obj.credentials.filter(revoked=False).exists()
+        return not has_unrevoked
+
+    @staticmethod
+    def prepare_topic_projection(obj):
+        # stored so search results can be served without loading the topic
+        return topic_projection(obj)
 
     def get_updated_field(self):
         return "update_timestamp"
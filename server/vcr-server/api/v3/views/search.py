@@ -44,7 +44,7 @@ from api.v2.serializers.search import (
     CredentialTopicSearchSerializer,
 )
 
-from vcr_server.pagination import ResultLimitPagination
+from vcr_server.pagination import ResultLimitPagination, SearchPagination
 
 
 LOGGER = logging.getLogger(__name__)
@@ -211,6 +211,20 @@ credential_search_swagger_params = [
         description="Filter by Topic ID",
         type=openapi.TYPE_STRING,
     ),
+    openapi.Parameter(
+        "cursor",
+        openapi.IN_QUERY,
+        description="Page through the results with a cursor instead of page numbers: '*' for the first page, then follow the 'next' links",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "count",
+        openapi.IN_QUERY,
+        description="Include the total number of results with cursor pages",
+        type=openapi.TYPE_STRING,
+        enum=["false", "true"],
+        default="false",
+    ),
 ]
 
 
@@ -228,6 +242,7 @@ class CredentialSearchView(AriesHaystackViewSet, FacetMixin):
     index_models = [Credential]
     load_all = True
     serializer_class = CredentialSearchSerializer
+    pagination_class = SearchPagination
     # enable normal filtering
     filter_backends = [
         CredNameFilter,
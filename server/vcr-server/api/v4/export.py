@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+
+from django.db.models import Exists, OuterRef, Q, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.v2.models.Credential import Credential
+from api.v2.models.Topic import Topic
+
+from api.v4.serializers.rest.export import (
+    ExportCredentialSerializer,
+    ExportTopicSerializer,
+)
+from api.v4.serializers.search.projection import projection_prefetches
+
+# number of rows fetched from the database cursor, and prefetched for, at a time
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE") or 500)
+# seconds the export timestamp is set back by: records saved before an export
+# starts but committed after it are exported again by the next one
+EXPORT_TIMESTAMP_OVERLAP = int(os.getenv("EXPORT_TIMESTAMP_OVERLAP") or 300)
+
+
+def parse_updated_since(value):
+    """Parse an ISO 8601 timestamp; naive timestamps are taken as UTC"""
+    if not value:
+        return None
+    updated_since = parse_datetime(value)
+    if updated_since is None:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if timezone.is_naive(updated_since):
+        updated_since = timezone.make_aware(updated_since, dt_timezone.utc)
+    return updated_since
+
+
+def export_timestamp(started):
+    """The UTC timestamp to pass as updated_since to the next export"""
+    since = started - timedelta(seconds=EXPORT_TIMESTAMP_OVERLAP)
+    return since.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def topic_rows(updated_since=None):
+    queryset = Topic.objects.all()
+    if updated_since:
+        # a topic changes with its credentials
+        changed_credentials = Credential.objects.filter(
+            topic=OuterRef("pk"), update_timestamp__gt=updated_since
+        )
+        queryset = queryset.annotate(
+            credentials_changed=Exists(changed_credentials)
+        ).filter(Q(update_timestamp__gt=updated_since) | Q(credentials_changed=True))
+    return queryset, projection_prefetches(), ExportTopicSerializer
+
+
+def credential_rows(updated_since=None):
+    queryset = Credential.objects.select_related("credential_set")
+    if updated_since:
+        queryset = queryset.filter(update_timestamp__gt=updated_since)
+    return queryset, ["names", "addresses", "attributes"], ExportCredentialSerializer
+
+
+EXPORTS = {
+    "topic": topic_rows,
+    "credential": credential_rows,
+}
+
+
+def export_records(kind, updated_since=None, chunk_size=None):
+    """
+    Yield the serialized records of a kind in id order, updated after
+    updated_since if given. Rows are read through a server-side cursor and
+    their related rows are prefetched one chunk at a time.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    queryset, prefetches, serializer_class = EXPORTS[kind](updated_since)
+    chunk = []
+    for row in queryset.order_by("id").iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from serialize_chunk(chunk, prefetches, serializer_class)
+            chunk = []
+    if chunk:
+        yield from serialize_chunk(chunk, prefetches, serializer_class)
+
+
+def serialize_chunk(rows, prefetches, serializer_class):
+    prefetch_related_objects(rows, *prefetches)
+    for row in rows:
+        yield serializer_class(row).data
+
+
+def export_lines(kind, updated_since=None, chunk_size=None):
+    """Records of a kind as newline-delimited JSON"""
+    for record in export_records(kind, updated_since, chunk_size):
+        yield json.dumps(record, cls=JSONEncoder) + "\n"
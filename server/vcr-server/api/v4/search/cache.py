@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import os
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+LOGGER = logging.getLogger(__name__)
+
+# seconds a cached search response is kept; 0 (the default) disables the
+# cache. Responses are discarded whenever the search index changes, which the
+# Solr queue signals through the cache: only enable it along with a shared
+# cache backend (CACHE_BACKEND), the default LocMemCache is per process.
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT") or 0)
+# seconds browsers and CDNs may reuse a response before revalidating it
+SEARCH_CACHE_MAX_AGE = int(os.getenv("SEARCH_CACHE_MAX_AGE") or 0)
+
+INDEX_GENERATION_KEY = "search_index.generation"
+
+
+def index_generation() -> int:
+    """The current generation of the search index"""
+    generation = cache.get(INDEX_GENERATION_KEY)
+    if generation is None:
+        # start from a random value so responses cached under an evicted
+        # counter are not picked up again
+        cache.add(INDEX_GENERATION_KEY, _generation_seed(), timeout=None)
+        generation = cache.get(INDEX_GENERATION_KEY)
+    return generation
+
+
+def bump_index_generation():
+    """Discard every cached search response after the index has changed"""
+    try:
+        cache.incr(INDEX_GENERATION_KEY)
+    except ValueError:
+        # the counter was evicted
+        cache.set(INDEX_GENERATION_KEY, _generation_seed(), timeout=None)
+
+
+def _generation_seed() -> int:
+    return int.from_bytes(os.urandom(4), "big")
+
+
+def normalized_params(query_params) -> list:
+    """Query parameters in a stable order, without empty values"""
+    params = []
+    for key in sorted(query_params):
+        values = sorted(
+            value.strip() for value in query_params.getlist(key) if value.strip()
+        )
+        if values:
+            params.append((key, values))
+    return params
+
+
+def response_key(request, generation: int) -> str:
+    # the host is included since paginated responses hold absolute links
+    key = json.dumps(
+        [request.get_host(), request.path, normalized_params(request.query_params)]
+    )
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return f"search_response:{generation}:{digest}"
+
+
+def response_etag(data) -> str:
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return '"{}"'.format(hashlib.sha1(body.encode("utf-8")).hexdigest())
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """
+    Whether an If-None-Match header matches the entity tag; the comparison is
+    weak, W/ prefixes are ignored
+    """
+    etags = parse_etags(if_none_match)
+    if etags == ["*"]:
+        return True
+    return etag in {tag[2:] if tag.startswith("W/") else tag for tag in etags}
+
+
+def is_cacheable(request) -> bool:
+    return (
+        SEARCH_CACHE_TIMEOUT > 0
+        and request.method == "GET"
+        and "HTTP_AUTHORIZATION" not in request.META
+        and not request.user.is_authenticated
+    )
+
+
+def cache_search_response(view_method):
+    """
+    Cache the responses of anonymous search requests by their query
+    parameters, and answer If-None-Match requests for an unchanged response
+    with 304 Not Modified.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return view_method(self, request, *args, **kwargs)
+
+        key = response_key(request, index_generation())
+        cached = cache.get(key)
+        if cached is not None:
+            etag, data = cached
+        else:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            etag = response_etag(data)
+            cache.set(key, (etag, data), SEARCH_CACHE_TIMEOUT)
+
+        if etag_matches(etag, request.META.get("HTTP_IF_NONE_MATCH", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=SEARCH_CACHE_MAX_AGE)
+        patch_vary_headers(response, ("Accept", "Authorization"))
+        return response
+
+    return wrapper
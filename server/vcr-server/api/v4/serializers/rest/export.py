@@ -0,0 +1,46 @@
+from rest_framework.serializers import DateTimeField, ModelSerializer
+
+from api.v2.models.Credential import Credential
+from api.v2.serializers.rest import (
+    CredentialAddressSerializer,
+    CredentialNameSerializer,
+    CredentialSetSerializer,
+)
+
+from api.v4.serializers.rest.credential import CredentialAttributeSerializer
+from api.v4.serializers.search.projection import TopicProjectionSerializer
+
+
+class ExportTopicSerializer(TopicProjectionSerializer):
+    create_timestamp = DateTimeField()
+    update_timestamp = DateTimeField()
+
+
+class ExportCredentialSerializer(ModelSerializer):
+    credential_set = CredentialSetSerializer()
+    names = CredentialNameSerializer(many=True)
+    addresses = CredentialAddressSerializer(many=True)
+    attributes = CredentialAttributeSerializer(many=True)
+
+    class Meta:
+        model = Credential
+        fields = (
+            "id",
+            "create_timestamp",
+            "update_timestamp",
+            "credential_id",
+            "credential_def_id",
+            "credential_type",
+            "topic",
+            "credential_set",
+            "effective_date",
+            "inactive",
+            "latest",
+            "revoked",
+            "revoked_date",
+            "revoked_by",
+            "names",
+            "addresses",
+            "attributes",
+        )
+        read_only_fields = fields
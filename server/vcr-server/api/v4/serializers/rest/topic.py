@@ -0,0 +1,6 @@
+from rest_framework.serializers import CharField, Serializer
+
+
+class TopicLookupSerializer(Serializer):
+    type = CharField()
+    source_id = CharField()
@@ -0,0 +1,130 @@
+import json
+
+from django.db.models import F, Prefetch
+from rest_framework.serializers import (
+    BooleanField,
+    CharField,
+    DateTimeField,
+    IntegerField,
+    Serializer,
+    SerializerMethodField,
+)
+
+from api.v2.models.Attribute import Attribute
+from api.v2.models.Credential import Credential
+from api.v2.models.CredentialSet import CredentialSet
+from api.v2.serializers.rest import (
+    AddressSerializer,
+    CredentialSetSerializer,
+    NameSerializer,
+    TopicAttributeSerializer,
+)
+
+
+class TopicNameSerializer(NameSerializer):
+
+    credential_id = SerializerMethodField()
+
+    @staticmethod
+    def get_credential_id(obj):
+        return obj.credential_id
+
+    class Meta(NameSerializer.Meta):
+        fields = ("id", "text", "language", "type", "credential_id")
+
+
+class TopicAddressSerializer(AddressSerializer):
+
+    credential_id = SerializerMethodField()
+
+    @staticmethod
+    def get_credential_id(obj):
+        return obj.credential_id
+
+    class Meta(AddressSerializer.Meta):
+        fields = ("id", "addressee", "civic_address", "city",
+                  "province", "postal_code", "country", "credential_id")
+
+
+class TopicProjectionSerializer(Serializer):
+    """
+    Topic search result fields that depend on the topic's credentials, stored
+    with the topic in the search index. The topic is reindexed whenever one of
+    its credentials changes.
+
+    The credential type is only referenced by id, since issuer registration
+    can change it without touching the topic.
+    """
+
+    id = IntegerField()
+    source_id = CharField()
+    type = CharField()
+    names = TopicNameSerializer(source="get_active_names", many=True)
+    addresses = TopicAddressSerializer(source="get_active_addresses", many=True)
+    attributes = TopicAttributeSerializer(source="get_active_attributes", many=True)
+    credential_set = CredentialSetSerializer(
+        source="foundational_credential.credential_set")
+    credential_type_id = IntegerField(
+        source="foundational_credential.credential_type_id")
+    inactive = BooleanField(source="foundational_credential.inactive")
+    revoked = BooleanField(source="foundational_credential.revoked")
+    effective_date = DateTimeField(source="foundational_credential.effective_date")
+    revoked_date = DateTimeField(source="foundational_credential.revoked_date")
+
+
+def projection_prefetches() -> list:
+    """
+    Lookups prefetching the active and foundational credentials of topics,
+    with the names, addresses and attributes the projection is built from
+    """
+    active_credentials = Credential.objects.filter(
+        latest=True, revoked=False
+    ).select_related("credential_type")
+    foundational_sets = CredentialSet.objects.filter(
+        credential_type__description=F("topic__type")
+    ).select_related(
+        "latest_credential__credential_set",
+        "latest_credential__credential_type",
+    )
+    categories = Attribute.objects.filter(format="category")
+    return [
+        Prefetch(
+            "credentials",
+            queryset=active_credentials,
+            to_attr="active_credentials",
+        ),
+        "active_credentials__names",
+        "active_credentials__addresses",
+        "active_credentials__attributes",
+        Prefetch(
+            "credential_sets",
+            queryset=foundational_sets,
+            to_attr="foundational_sets",
+        ),
+        Prefetch(
+            "foundational_sets__latest_credential__attributes",
+            queryset=categories,
+            to_attr="category_attributes",
+        ),
+    ]
+
+
+def prefetch_projection(queryset):
+    return queryset.prefetch_related(*projection_prefetches())
+
+
+def topic_projection(topic) -> str:
+    return json.dumps(TopicProjectionSerializer(topic).data)
+
+
+def stored_projection(result):
+    """
+    The projection stored with a topic search result, or None for results
+    indexed before projections were added
+    """
+    projection = getattr(result, "_projection", None)
+    if projection is None:
+        stored = getattr(result, "topic_projection", None)
+        projection = json.loads(stored) if stored else False
+        result._projection = projection
+    return projection or None
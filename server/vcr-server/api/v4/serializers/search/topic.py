@@ -1,24 +1,30 @@
 from collections import OrderedDict
 
-from rest_framework.serializers import BooleanField, CharField, DateTimeField, IntegerField, SerializerMethodField
+from rest_framework.serializers import BooleanField, CharField, DateTimeField, IntegerField, ListSerializer
 from drf_haystack.serializers import HaystackSerializer
 
 from api.v2.models.CredentialType import CredentialType
-from api.v2.models.Issuer import Issuer
 
 from api.v2.serializers.rest import (
-    AddressSerializer,
     CredentialSetSerializer,
     CredentialTypeSerializer,
-    NameSerializer,
     TopicAttributeSerializer,
 )
 from api.v2.serializers.search import (
     CredentialFacetSerializer,
+    facet_label_map,
 )
 
 from api.v3.indexes.Topic import TopicIndex
 
+from agent_webhooks.utils.credential_type_cache import credential_type_cache
+
+from api.v4.serializers.search.projection import (
+    TopicAddressSerializer,
+    TopicNameSerializer,
+    stored_projection,
+)
+
 
 facet_filter_display_map = {
     "topic_category": "category",
@@ -27,30 +33,28 @@ facet_filter_display_map = {
     "topic_credential_type_id": "credential_type_id",
 }
 
-
-class TopicNameSerializer(NameSerializer):
-
-    credential_id = SerializerMethodField()
-
-    @staticmethod
-    def get_credential_id(obj):
-        return obj.credential.id
-
-    class Meta(NameSerializer.Meta):
-        fields = ("id", "text", "language", "type", "credential_id")
-
-
-class TopicAddressSerializer(AddressSerializer):
-
-    credential_id = SerializerMethodField()
-
-    @staticmethod
-    def get_credential_id(obj):
-        return obj.credential.id
-
-    class Meta(AddressSerializer.Meta):
-        fields = ("id", "addressee", "civic_address", "city",
-                  "province", "postal_code", "country", "credential_id")
+# display text of facet values, by facet field; topic type_id facets hold
+# credential type ids
+topic_facet_label_map = {**facet_label_map, "type_id": "credential_type"}
+
+
+class SearchListSerializer(ListSerializer):
+
+    def to_representation(self, data):
+        results = list(data)
+        # credential types of the results with stored projections, in one query
+        type_ids = set()
+        for result in results:
+            projection = stored_projection(result)
+            if projection and projection.get("credential_type_id"):
+                type_ids.add(projection["credential_type_id"])
+        if type_ids:
+            self.child.credential_types = {
+                credential_type.id: CredentialTypeSerializer(credential_type).data
+                for credential_type in CredentialType.objects.filter(
+                    pk__in=type_ids).select_related("issuer")
+            }
+        return [self.child.to_representation(result) for result in results]
 
 
 class SearchSerializer(HaystackSerializer):
@@ -76,7 +80,34 @@ class SearchSerializer(HaystackSerializer):
     revoked_date = DateTimeField(
         source="object.foundational_credential.revoked_date")
 
+    credential_types = None
+
+    def to_representation(self, instance):
+        projection = stored_projection(instance)
+        if not projection:
+            return super(SearchSerializer, self).to_representation(instance)
+
+        # served from the search index, without loading the topic
+        type_id = projection.get("credential_type_id")
+        if self.credential_types is not None and type_id in self.credential_types:
+            credential_type = self.credential_types[type_id]
+        else:
+            credential_type = None
+            if type_id:
+                row = CredentialType.objects.select_related("issuer").filter(pk=type_id).first()
+                credential_type = row and CredentialTypeSerializer(row).data
+        result = OrderedDict()
+        for field in self.Meta.fields:
+            if field == "credential_type":
+                result[field] = credential_type
+            else:
+                result[field] = projection.get(field)
+        if getattr(instance, "highlighted", None):
+            result["highlighted"] = instance.highlighted[0]
+        return result
+
     class Meta:
+        list_serializer_class = SearchListSerializer
         index_classes = [TopicIndex]
         fields = ("id", "source_id", "type", "names", "addresses", "attributes", "credential_set",
                   "credential_type", "inactive", "revoked", "effective_date", "revoked_date")
@@ -107,28 +138,15 @@ class FacetSerializer(CredentialFacetSerializer):
         return [self.format_facet_field(field_name, facet, field_memo) for facet in facets]
 
     def format_facet_text(self, field_name, facets):
-        values = [facet[0] for facet in facets]
-        Model, field_selector, text = None, "", {}
-        if field_name == "issuer_id":
-            Model, field_selector = Issuer, "name"
-        elif field_name == "type_id" or field_name == "credential_type_id":
-            Model, field_selector = CredentialType, "description"
-
-        if Model and field_selector:
-            rows = Model.objects.filter(pk__in=values)
-            if len(rows):
-                text = {
-                    field_name: {
-                        str(row["id"]): row[field_selector] for row in rows.values()
-                    }
-                }
-
-        return text
+        labels = topic_facet_label_map.get(field_name)
+        if labels:
+            return {field_name: credential_type_cache.labels()[labels]}
+        return {}
 
     def format_facet_field(self, field_name, facet, field_memo):
         text, value, count = None, facet[0], facet[1]
-        if field_name in field_memo and value in field_memo[field_name]:
-            text = field_memo[field_name][value]
+        if field_name in field_memo:
+            text = field_memo[field_name].get(str(value))
         return {"value": value, "count": count, "text": text}
 
     class Meta:
@@ -0,0 +1,121 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.v2.change_feed import assign_sequence, record_change, record_changes
+from api.v2.models import (
+    ChangeEvent,
+    Credential,
+    CredentialType,
+    Issuer,
+    Name,
+    Schema,
+    Topic,
+)
+
+
+class TestChangeFeed(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.credential_type = CredentialType.objects.create(
+            schema=Schema.objects.create(
+                name="test_schema", version="0.0.1", origin_did="a:did:123"
+            ),
+            issuer=Issuer.objects.create(did="a:did:123", name="Test Issuer 1"),
+            description="test_topic_type",
+        )
+        cls.topic = Topic.objects.create(source_id="source_id", type="test_topic_type")
+        cls.credential = Credential.objects.create(
+            credential_id="credential",
+            credential_type=cls.credential_type,
+            topic=cls.topic,
+        )
+        ChangeEvent.objects.all().delete()
+
+    def changes(self):
+        return list(
+            ChangeEvent.objects.values_list("object_type", "object_id", "change")
+        )
+
+    def test_record_once_per_transaction(self):
+        record_change(self.topic, created=True)
+        record_changes([self.topic, self.credential])
+        record_change(self.credential)
+        record_change(self.credential_type)
+
+        assert self.changes() == [
+            ("topic", self.topic.id, "created"),
+            ("credential", self.credential.id, "updated"),
+        ]
+
+    def test_model_signals(self):
+        credential = Credential.objects.create(
+            credential_id="other_credential",
+            credential_type=self.credential_type,
+            topic=self.topic,
+        )
+        credential_id = credential.id
+        Name.objects.create(credential=self.credential, text="name")
+        credential.delete()
+
+        assert self.changes() == [
+            ("credential", credential_id, "created"),
+            ("topic", self.topic.id, "updated"),
+            ("credential", self.credential.id, "updated"),
+            ("credential", credential_id, "deleted"),
+        ]
+
+    @patch("api.v2.change_feed.connection")
+    def test_assign_sequence_skips_lock(self, mock_connection):
+        # nothing to number, the advisory lock is not taken
+        assert assign_sequence() == 0
+        mock_connection.cursor.assert_not_called()
+
+    def test_prune_changes(self):
+        record_changes([self.topic, self.credential], ChangeEvent.CREATED)
+        assign_sequence()
+        record_change(self.credential, deleted=True)
+        ChangeEvent.objects.update(create_timestamp=timezone.now() - timedelta(days=2))
+
+        call_command("prune_change_feed", "--days", "1", stdout=StringIO())
+        # events that are not numbered yet are kept
+        assert self.changes() == [("credential", self.credential.id, "deleted")]
+
+    def test_list_changes(self):
+        record_changes([self.topic, self.credential], ChangeEvent.CREATED)
+        record_change(self.credential, deleted=True)
+
+        response = self.client.get("/api/v4/changes", {"page_size": 2})
+        assert response.status_code == 200
+        data = response.json()
+        assert [
+            (row["seq"], row["type"], row["change"]) for row in data["results"]
+        ] == [
+            (1, "topic", "created"),
+            (2, "credential", "created"),
+        ]
+        assert data["last"] == 2
+        assert data["more"]
+
+        response = self.client.get(data["next"])
+        data = response.json()
+        assert [(row["seq"], row["change"]) for row in data["results"]] == [
+            (3, "deleted")
+        ]
+        assert not data["more"]
+
+        # changes recorded later are numbered after the ones already listed
+        topic = Topic.objects.create(
+            source_id="other_source_id", type="test_topic_type"
+        )
+        record_change(topic, created=True)
+        data = self.client.get(data["next"]).json()
+        assert [(row["seq"], row["id"]) for row in data["results"]] == [(4, topic.id)]
+
+    def test_list_changes_invalid(self):
+        response = self.client.get("/api/v4/changes", {"after": "x"})
+        assert response.status_code == 400
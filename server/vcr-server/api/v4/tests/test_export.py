@@ -0,0 +1,101 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.v2.models import (
+    Address,
+    Credential,
+    CredentialSet,
+    CredentialType,
+    Issuer,
+    Name,
+    Schema,
+    Topic,
+)
+from api.v4.export import EXPORT_TIMESTAMP_OVERLAP, parse_updated_since
+
+
+class TestExport(APITestCase):
+    def setUp(self):
+        credential_type = CredentialType.objects.create(
+            schema=Schema.objects.create(
+                name="test_schema", version="0.0.1", origin_did="a:did:123"
+            ),
+            issuer=Issuer.objects.create(did="a:did:123", name="Test Issuer 1"),
+            description="test_topic_type",
+        )
+        for idx in range(3):
+            topic = Topic.objects.create(
+                source_id=f"source_id_{idx}", type="test_topic_type"
+            )
+            credential = Credential.objects.create(
+                credential_id=f"credential_{idx}",
+                credential_type=credential_type,
+                topic=topic,
+                latest=True,
+            )
+            credential.credential_set = CredentialSet.objects.create(
+                credential_type=credential_type,
+                topic=topic,
+                latest_credential=credential,
+            )
+            credential.save()
+            Name.objects.create(credential=credential, text=f"Name {idx}")
+            Address.objects.create(credential=credential, city="Victoria")
+
+    def export(self, kind, **params):
+        response = self.client.get(f"/api/v4/export/{kind}", params)
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        return response, [json.loads(line) for line in lines]
+
+    def test_export_credentials(self):
+        response, records = self.export("credential")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        # in UTC, set back so records committed late are exported again
+        timestamp = response["Export-Timestamp"]
+        self.assertTrue(timestamp.endswith("Z"))
+        self.assertLess(
+            parse_updated_since(timestamp),
+            timezone.now() - timedelta(seconds=EXPORT_TIMESTAMP_OVERLAP - 5),
+        )
+        self.assertEqual(
+            [record["credential_id"] for record in records],
+            ["credential_0", "credential_1", "credential_2"],
+        )
+        self.assertEqual(records[0]["names"][0]["text"], "Name 0")
+        self.assertEqual(records[0]["addresses"][0]["credential_id"], records[0]["id"])
+        self.assertEqual(
+            records[0]["credential_set"]["latest_credential_id"], records[0]["id"]
+        )
+
+    def test_export_topics_updated_since(self):
+        since = timezone.now() + timedelta(seconds=1)
+        _, records = self.export("topic")
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]["names"][0]["text"], "Name 0")
+
+        _, records = self.export("topic", updated_since=since.isoformat())
+        self.assertEqual(records, [])
+
+        # a topic is exported again when one of its credentials changes
+        Credential.objects.filter(credential_id="credential_1").update(
+            update_timestamp=since + timedelta(seconds=1)
+        )
+        _, records = self.export("topic", updated_since=since.isoformat())
+        self.assertEqual([record["source_id"] for record in records], ["source_id_1"])
+
+        response = self.client.get("/api/v4/export/topic", {"updated_since": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command(
+            "export_records", "credential", chunk_size=2, stdout=out, stderr=StringIO()
+        )
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), 3)
@@ -0,0 +1,110 @@
+import json
+from unittest.mock import patch
+
+from rest_framework.test import APITestCase
+
+from api.v2.models import (
+    Credential,
+    CredentialSet,
+    CredentialType,
+    Issuer,
+    Name,
+    Schema,
+    Topic,
+)
+
+
+class TestRestViewTopic(APITestCase):
+    def setUp(self):
+        self.credential_type = CredentialType.objects.create(
+            schema=Schema.objects.create(
+                name="test_schema", version="0.0.1", origin_did="a:did:123"
+            ),
+            issuer=Issuer.objects.create(did="a:did:123", name="Test Issuer 1"),
+            description="registration.registries.ca",
+        )
+        for source_id in ("BC0000001", "BC0000002", "BC0000003"):
+            self.create_topic(source_id, "registration.registries.ca")
+
+    def create_topic(self, source_id, type, credential_type=None):
+        credential_type = credential_type or self.credential_type
+        topic = Topic.objects.create(source_id=source_id, type=type)
+        credential = Credential.objects.create(
+            credential_id=f"{source_id}_{type}_credential",
+            credential_type=credential_type,
+            topic=topic,
+            latest=True,
+        )
+        credential.credential_set = CredentialSet.objects.create(
+            credential_type=credential_type,
+            topic=topic,
+            latest_credential=credential,
+        )
+        credential.save()
+        Name.objects.create(
+            credential=credential, text=f"Name {source_id}", type="entity_name"
+        )
+
+    def lookup(self, data):
+        response = self.client.post("/api/v4/topic/lookup", data, format="json")
+        if response.streaming:
+            return response, json.loads(b"".join(response.streaming_content))
+        return response, response.data
+
+    def test_lookup(self):
+        response, data = self.lookup(
+            [
+                {"type": "registration", "source_id": "BC0000001"},
+                {"type": "registration.registries.ca", "source_id": "BC0000003"},
+                {"type": "registration.registries.ca", "source_id": "BC0000009"},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [topic["source_id"] for topic in data], ["BC0000001", "BC0000003"]
+        )
+        self.assertEqual(data[0]["names"][0]["text"], "Name BC0000001")
+        self.assertEqual(data[0]["credential_type_id"], self.credential_type.id)
+
+    def test_lookup_pairs(self):
+        self.create_topic(
+            "BC0000001",
+            "other",
+            CredentialType.objects.create(
+                schema=Schema.objects.create(
+                    name="other_schema", version="0.0.1", origin_did="a:did:123"
+                ),
+                issuer=self.credential_type.issuer,
+                description="other",
+            ),
+        )
+        response, data = self.lookup(
+            [
+                {"type": "other", "source_id": "BC0000001"},
+                {"type": "registration", "source_id": "BC0000002"},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        # registration/BC0000001 matches a requested type and source id, but
+        # was not requested
+        self.assertEqual(
+            {(topic["type"], topic["source_id"]) for topic in data},
+            {("registration.registries.ca", "BC0000002"), ("other", "BC0000001")},
+        )
+
+        response, data = self.lookup([])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data, [])
+
+    def test_lookup_limit(self):
+        with patch("api.v4.views.rest.topic.TOPIC_LOOKUP_MAX", 2):
+            response, _ = self.lookup(
+                [
+                    {"type": "registration", "source_id": f"BC000000{idx}"}
+                    for idx in range(3)
+                ]
+            )
+        self.assertEqual(response.status_code, 400)
+
+        response, _ = self.lookup([{"type": "registration"}])
+        self.assertEqual(response.status_code, 400)
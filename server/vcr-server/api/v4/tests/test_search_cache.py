@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from api.v4.search.cache import (
+    bump_index_generation,
+    cache_search_response,
+    etag_matches,
+)
+
+
+class SearchView(APIView):
+    permission_classes = (permissions.AllowAny,)
+    search = MagicMock()
+
+    @cache_search_response
+    def get(self, request):
+        return Response({"results": self.search()})
+
+
+@patch("api.v4.search.cache.SEARCH_CACHE_TIMEOUT", 300)
+class TestSearchCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        SearchView.search = MagicMock(return_value=["result"])
+        self.factory = APIRequestFactory()
+        self.view = SearchView.as_view()
+
+    def test_response_is_cached_by_normalized_params(self):
+        first = self.view(self.factory.get("/search", {"q": "name", "inactive": ""}))
+        second = self.view(self.factory.get("/search", {"q": " name "}))
+
+        assert first.data == second.data == {"results": ["result"]}
+        assert first["ETag"] == second["ETag"]
+        SearchView.search.assert_called_once()
+
+    def test_disabled(self):
+        with patch("api.v4.search.cache.SEARCH_CACHE_TIMEOUT", 0):
+            self.view(self.factory.get("/search", {"q": "name"}))
+            response = self.view(self.factory.get("/search", {"q": "name"}))
+
+        assert SearchView.search.call_count == 2
+        assert not response.has_header("ETag")
+
+    def test_index_change_discards_responses(self):
+        first = self.view(self.factory.get("/search", {"q": "name"}))
+        bump_index_generation()
+        SearchView.search.return_value = ["updated"]
+        second = self.view(self.factory.get("/search", {"q": "name"}))
+
+        assert second.data == {"results": ["updated"]}
+        assert first["ETag"] != second["ETag"]
+
+    def test_if_none_match(self):
+        etag = self.view(self.factory.get("/search", {"q": "name"}))["ETag"]
+        bump_index_generation()
+
+        # the response is the same after reindexing
+        response = self.view(
+            self.factory.get("/search", {"q": "name"}, HTTP_IF_NONE_MATCH=etag)
+        )
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+    def test_etag_matches(self):
+        etag = '"abc"'
+        assert etag_matches(etag, '"abc"')
+        assert etag_matches(etag, '"xyz", W/"abc"')
+        assert etag_matches(etag, "*")
+        assert not etag_matches(etag, "")
+        assert not etag_matches(etag, '"abcd"')
+        assert not etag_matches(etag, '"xabc"')
+
+    def test_authenticated_requests_are_not_cached(self):
+        user = get_user_model().objects.create(username="user")
+        for _ in range(2):
+            request = self.factory.get("/search", {"q": "name"})
+            force_authenticate(request, user)
+            response = self.view(request)
+            assert not response.has_header("ETag")
+        assert SearchView.search.call_count == 2
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+from urllib.parse import parse_qsl, urlparse
+
+from django.core.cache import cache
+from django.test import TestCase
+from haystack.models import SearchResult
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+
+from api.v3.views.search import CredentialSearchView
+from api.v4.views.search import credential, topic
+from vcr_server.pagination import SearchPagination
+
+
+class ResultSerializer(serializers.Serializer):
+    id = serializers.CharField(source="pk")
+
+
+def get_serializer(self, *args, **kwargs):
+    return ResultSerializer(*args, **kwargs)
+
+
+def cursor_page(self, queryset, cursor, page_size):
+    """Pages through five results, the cursor mark is the next offset"""
+    ids = ["1", "2", "3", "4", "5"]
+    start = 0 if cursor == "*" else int(cursor)
+    results = [
+        SearchResult("api_v2", "credential", pk, 1.0)
+        for pk in ids[start : start + page_size]
+    ]
+    end = start + page_size
+    return results, str(end) if end < len(ids) else None, len(ids)
+
+
+@patch.object(SearchPagination, "cursor_page", cursor_page)
+class SearchViewCursor_TestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def crawl(self, view_class, params):
+        view = view_class.as_view({"get": "list"})
+        pages = []
+        url = "/search"
+        while params is not None:
+            response = view(self.factory.get(url, params))
+            assert response.status_code == 200
+            pages.append(response.data)
+            next_link = response.data["next"]
+            params = dict(parse_qsl(urlparse(next_link).query)) if next_link else None
+        return pages
+
+    def test_search_views_use_cursor_pagination(self):
+        for view_class in (
+            CredentialSearchView,
+            credential.SearchView,
+            topic.SearchView,
+        ):
+            assert view_class.pagination_class is SearchPagination
+
+    def test_crawl(self):
+        for view_class in (credential.SearchView, topic.SearchView):
+            with patch.object(view_class, "get_serializer", get_serializer):
+                pages = self.crawl(view_class, {"cursor": "*", "page_size": 2})
+
+            assert [[result["id"] for result in page["results"]] for page in pages] == [
+                ["1", "2"],
+                ["3", "4"],
+                ["5"],
+            ]
+            assert all("total" not in page for page in pages)
+
+    def test_crawl_with_count(self):
+        with patch.object(credential.SearchView, "get_serializer", get_serializer):
+            (page, *_rest) = self.crawl(
+                credential.SearchView, {"cursor": "*", "page_size": 5, "count": "true"}
+            )
+        assert page["total"] == 5
+        assert page["next"] is None
@@ -0,0 +1,142 @@
+from unittest.mock import PropertyMock, patch
+
+from django.test import TestCase
+
+from api.v2.models import (
+    Attribute,
+    Credential,
+    CredentialSet,
+    CredentialType,
+    Issuer,
+    Name,
+    Schema,
+    Topic,
+)
+from api.v2.serializers.search import CredentialFacetSerializer
+from api.v3.indexes.Topic import TopicIndex
+from api.v4.serializers.search.topic import FacetSerializer, SearchSerializer
+
+
+class SearchResult:
+    """Stand-in for the haystack search result of a topic"""
+
+    searchindex = TopicIndex()
+
+    def __init__(self, topic, topic_projection=None):
+        self._topic = topic
+        self.topic_projection = topic_projection
+
+    @property
+    def object(self):
+        return self._topic
+
+
+class TestSearchTopicSerializer(TestCase):
+    def setUp(self):
+        self.credential_type = CredentialType.objects.create(
+            schema=Schema.objects.create(
+                name="test_schema", version="0.0.1", origin_did="a:did:123"
+            ),
+            issuer=Issuer.objects.create(did="a:did:123", name="Test Issuer 1"),
+            description="test_topic_type",
+        )
+        self.topic = self.create_topic("test_source_id", "Test Name")
+
+    def create_topic(self, source_id, name):
+        topic = Topic.objects.create(source_id=source_id, type="test_topic_type")
+        credential = Credential.objects.create(
+            credential_id=f"{source_id}_credential",
+            credential_type=self.credential_type,
+            topic=topic,
+            latest=True,
+        )
+        credential_set = CredentialSet.objects.create(
+            credential_type=self.credential_type,
+            topic=topic,
+            latest_credential=credential,
+        )
+        credential.credential_set = credential_set
+        credential.save()
+        Name.objects.create(credential=credential, text=name, type="entity_name")
+        Attribute.objects.create(
+            credential=credential, type="category", format="category", value="x"
+        )
+        return topic
+
+    def test_projection_matches_live_result(self):
+        live = SearchSerializer(SearchResult(self.topic)).data
+        projection = TopicIndex.prepare_topic_projection(self.topic)
+
+        with patch.object(SearchResult, "object", new_callable=PropertyMock) as obj:
+            served = SearchSerializer(
+                [SearchResult(self.topic, projection)], many=True
+            ).data
+            # the topic is not loaded
+            obj.assert_not_called()
+
+        assert served[0] == live
+        assert served[0]["names"][0]["text"] == "Test Name"
+        assert served[0]["credential_type"]["issuer"]["name"] == "Test Issuer 1"
+
+    def test_credential_type_is_current(self):
+        projection = TopicIndex.prepare_topic_projection(self.topic)
+        self.credential_type.issuer.name = "Renamed Issuer"
+        self.credential_type.issuer.save()
+
+        served = SearchSerializer(SearchResult(self.topic, projection)).data
+        assert served["credential_type"]["issuer"]["name"] == "Renamed Issuer"
+
+    def test_index_queryset_prefetches_batch(self):
+        for idx in range(3):
+            self.create_topic(f"other_source_id_{idx}", f"Other Name {idx}")
+        Credential.objects.filter(topic__source_id="other_source_id_0").update(
+            revoked=True, inactive=True
+        )
+        index = TopicIndex()
+        fields = (
+            "topic_issuer_id",
+            "topic_type_id",
+            "topic_inactive",
+            "topic_category",
+            "topic_name",
+            "topic_address",
+            "topic_credential_type_id",
+            "topic_all_credentials_inactive",
+            "topic_all_credentials_revoked",
+            "topic_projection",
+        )
+
+        def prepare(topic):
+            return {
+                field: getattr(index, f"prepare_{field}")(topic) for field in fields
+            }
+
+        expected = [prepare(topic) for topic in Topic.objects.all()]
+
+        # the same number of queries for any number of topics
+        with self.assertNumQueries(7):
+            prepared = [prepare(topic) for topic in index.index_queryset()]
+        assert prepared == expected
+        assert prepared[0]["topic_name"] == ["Test Name"]
+        assert prepared[0]["topic_category"] == ["category::x"]
+        assert not prepared[0]["topic_all_credentials_revoked"]
+        assert prepared[1]["topic_all_credentials_inactive"]
+        assert prepared[1]["topic_all_credentials_revoked"]
+
+    def test_facet_text(self):
+        serializer = FacetSerializer()
+        facets = [(str(self.credential_type.id), 1), ("0", 2)]
+        serializer.format_facets("type_id", facets)
+
+        # labels are not queried again
+        with self.assertNumQueries(0):
+            formatted = serializer.format_facets("type_id", facets)
+            issuers = serializer.format_facets(
+                "issuer_id", [(str(self.credential_type.issuer_id), 1)]
+            )
+        assert [facet["text"] for facet in formatted] == ["test_topic_type", None]
+        assert issuers[0]["text"] == "Test Issuer 1"
+
+        # v2 facets only label issuer and credential type ids
+        v2_formatted = CredentialFacetSerializer().format_facets("type_id", facets)
+        assert [facet.get("text") for facet in v2_formatted] == [None, None]
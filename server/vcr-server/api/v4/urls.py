@@ -14,7 +14,9 @@ from api.v4.views.search import (
     autocomplete as search_autocomplete,
 )
 from api.v4.views.rest import credential, credential_type, issuer, topic, schema
+from api.v4.views.misc.changes import list_changes
 from api.v4.views.misc.contact import send_contact
+from api.v4.views.misc.export import export_records
 from api.v4.views.misc.feedback import send_feedback
 
 app_name = "api_v4"
@@ -50,7 +52,9 @@ router.register(
 
 # Misc endpoints
 miscPatterns = [
+    path("changes", list_changes),
     path("contact", send_contact),
+    path("export/<kind>", export_records),
     path("feedback", send_feedback),
 ]
 
@@ -0,0 +1,85 @@
+import os
+
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from api.v2.change_feed import changes_after
+
+CHANGE_FEED_PAGE_SIZE = int(os.getenv("CHANGE_FEED_PAGE_SIZE") or 100)
+CHANGE_FEED_MAX_PAGE_SIZE = int(os.getenv("CHANGE_FEED_MAX_PAGE_SIZE") or 1000)
+
+
+def parse_int(query_params, name, default, minimum):
+    value = query_params.get(name)
+    if not value:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer"})
+    if value < minimum:
+        raise ValidationError({name: f"Must be at least {minimum}"})
+    return value
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter(
+            "after",
+            openapi.IN_QUERY,
+            description="Only return changes with a sequence number above this one. "
+            "Use the last sequence number of the previous page to continue.",
+            type=openapi.TYPE_INTEGER,
+        ),
+        openapi.Parameter(
+            "page_size",
+            openapi.IN_QUERY,
+            description="Maximum number of changes to return",
+            type=openapi.TYPE_INTEGER,
+        ),
+    ],
+)
+@api_view(["GET"])
+@permission_classes((permissions.AllowAny,))
+def list_changes(request):
+    """
+    The topics and credentials that were created, updated or deleted, in
+    sequence order. Sequence numbers only grow, so a consumer can keep the
+    last one it has seen and ask for the changes after it. An object may be
+    listed more than once; fetch it to get its current state.
+    """
+    after = parse_int(request.query_params, "after", 0, 0)
+    page_size = min(
+        parse_int(request.query_params, "page_size", CHANGE_FEED_PAGE_SIZE, 1),
+        CHANGE_FEED_MAX_PAGE_SIZE,
+    )
+    # one more to tell whether there is another page
+    events = changes_after(after, page_size + 1)
+    more = len(events) > page_size
+    events = events[:page_size]
+    last = events[-1].seq if events else after
+    url = request.build_absolute_uri()
+    return Response(
+        {
+            "results": [
+                {
+                    "seq": event.seq,
+                    "type": event.object_type,
+                    "id": event.object_id,
+                    "change": event.change,
+                    "timestamp": event.create_timestamp,
+                }
+                for event in events
+            ],
+            "last": last,
+            # the next page is empty until more changes are made
+            "next": replace_query_param(url, "after", last),
+            "more": more,
+        }
+    )
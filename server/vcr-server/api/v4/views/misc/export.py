@@ -0,0 +1,49 @@
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
+
+from api.v4.export import (
+    EXPORTS,
+    export_lines,
+    export_timestamp,
+    parse_updated_since,
+)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter(
+            "updated_since",
+            openapi.IN_QUERY,
+            description="Only export records updated after this ISO 8601 timestamp. "
+            "Use the Export-Timestamp header of the previous export to sync changes.",
+            type=openapi.TYPE_STRING,
+        ),
+    ],
+    responses={200: "Newline-delimited JSON records"},
+)
+@api_view(["GET"])
+@permission_classes((permissions.AllowAny,))
+def export_records(request, kind):
+    """
+    Export all topics or credentials as newline-delimited JSON, in id order
+    """
+    if kind not in EXPORTS:
+        raise NotFound()
+    try:
+        updated_since = parse_updated_since(request.query_params.get("updated_since"))
+    except ValueError as e:
+        raise ValidationError({"updated_since": str(e)})
+
+    # records updated from about now on are picked up by the next export
+    started = timezone.now()
+    response = StreamingHttpResponse(
+        export_lines(kind, updated_since), content_type="application/x-ndjson"
+    )
+    response["Export-Timestamp"] = export_timestamp(started)
+    return response
@@ -1,11 +1,18 @@
+import json
+import os
+
 from django.conf import settings
-from django.http import Http404
+from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
 from drf_yasg.utils import swagger_auto_schema
 
+from rest_framework import permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from api.v2.models.Topic import Topic
@@ -13,6 +20,30 @@ from api.v2.models.Topic import Topic
 from api.v2.serializers.rest import CredentialSetSerializer, TopicSerializer
 
 from api.v4.serializers.rest.credential import RestSerializer as CredentialSerializer
+from api.v4.serializers.rest.topic import TopicLookupSerializer
+from api.v4.serializers.search.projection import (
+    TopicProjectionSerializer,
+    prefetch_projection,
+)
+
+# max number of topics in a single lookup request
+TOPIC_LOOKUP_MAX = int(os.getenv("TOPIC_LOOKUP_MAX") or 1000)
+
+
+def resolve_type(type):
+    # Map type to a schema name, if an "old style" type is used
+    if settings.CRED_TYPE_SYNONYMS and type.lower() in settings.CRED_TYPE_SYNONYMS:
+        return settings.CRED_TYPE_SYNONYMS[type.lower()]
+    return type
+
+
+def stream_topics(topics):
+    yield "["
+    for idx, topic in enumerate(topics):
+        if idx:
+            yield ","
+        yield json.dumps(TopicProjectionSerializer(topic).data, cls=JSONEncoder)
+    yield "]"
 
 
 class RestView(ReadOnlyModelViewSet):
@@ -77,6 +108,44 @@ class RestView(ReadOnlyModelViewSet):
         response["item_count"] = len(data)
         return response
 
+    @swagger_auto_schema(
+        request_body=TopicLookupSerializer(many=True),
+        responses={200: TopicProjectionSerializer(many=True)},
+    )
+    @action(
+        detail=False,
+        url_path="lookup",
+        methods=["post"],
+        permission_classes=(permissions.AllowAny,),
+    )
+    def lookup(self, request):
+        """
+        Look up a list of topics by type and source id. The topics found are
+        returned with their names, addresses and foundational credential;
+        unknown topics are left out.
+        """
+        if isinstance(request.data, list) and len(request.data) > TOPIC_LOOKUP_MAX:
+            raise ValidationError(
+                f"At most {TOPIC_LOOKUP_MAX} topics can be looked up at a time"
+            )
+        lookups = TopicLookupSerializer(data=request.data, many=True)
+        lookups.is_valid(raise_exception=True)
+
+        # group the source ids by type so only the requested pairs are loaded
+        source_ids = {}
+        for lookup in lookups.validated_data:
+            source_ids.setdefault(resolve_type(lookup["type"]), set()).add(
+                lookup["source_id"]
+            )
+        query = Q()
+        for type, ids in source_ids.items():
+            query |= Q(type=type, source_id__in=ids)
+        topics = Topic.objects.filter(query) if source_ids else Topic.objects.none()
+        return StreamingHttpResponse(
+            stream_topics(prefetch_projection(topics)),
+            content_type="application/json",
+        )
+
     def get_object(self):
         if self.kwargs.get("pk"):
             return super(RestView, self).get_object()
@@ -86,9 +155,7 @@ class RestView(ReadOnlyModelViewSet):
         if not type or not source_id:
             raise Http404()
 
-        # Map type to a schema name, if an "old style" type is used
-        if settings.CRED_TYPE_SYNONYMS and type.lower() in settings.CRED_TYPE_SYNONYMS:
-            type = settings.CRED_TYPE_SYNONYMS[type.lower()]
+        type = resolve_type(type)
 
         queryset = self.filter_queryset(self.get_queryset())
         obj = get_object_or_404(queryset, type=type, source_id=source_id)
@@ -17,6 +17,7 @@ from api.v3.serializers.search import (
     TopicAutocompleteSerializer,
 )
 from api.v3.search_filters import StatusFilter as AutocompleteStatusFilter
+from api.v4.search.cache import cache_search_response
 from api.v4.search.filters.autocomplete import AutocompleteFilter
 from api.v4.search.filters.topic import (
     TopicCategoryFilter as AutocompleteCategoryFilter,
@@ -94,6 +95,7 @@ class SearchView(AggregateAutocompleteView):
         manual_parameters=_swagger_params,
         responses={200: AggregateAutocompleteSerializer(many=True)},
     )
+    @cache_search_response
     def list(self, *args, **kwargs):
         return super(SearchView, self).list(*args, **kwargs)
 
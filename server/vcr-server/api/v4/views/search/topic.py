@@ -11,12 +11,14 @@ from drf_haystack.filters import HaystackOrderingFilter
 from api.v2.search.filters import CustomFacetFilter
 
 from api.v2.models.Topic import Topic
+from vcr_server.pagination import SearchPagination
 
 from api.v3.views.search import (
     AriesHaystackViewSet,
     credential_search_swagger_params as swagger_params,
 )
 
+from api.v4.search.cache import cache_search_response
 from api.v4.search.filters.topic import (
     TopicCategoryFilter,
     TopicExactFilter,
@@ -71,6 +73,7 @@ class SearchView(AriesHaystackViewSet, FacetMixin):
     serializer_class = SearchSerializer
     facet_serializer_class = FacetSerializer
     facet_objects_serializer_class = SearchSerializer
+    pagination_class = SearchPagination
     ordering_fields = ("effective_date", "revoked_date", "score")
     ordering = "-score"
 
@@ -92,11 +95,13 @@ class SearchView(AriesHaystackViewSet, FacetMixin):
     ]
 
     @swagger_auto_schema(manual_parameters=_swagger_params)
+    @cache_search_response
     def list(self, *args, **kwargs):
         return super(SearchView, self).list(*args, **kwargs)
 
     # FacetMixin provides /facets
     @action(detail=False, methods=["get"], url_path="facets")
+    @cache_search_response
     def facets(self, request):
         queryset = self.get_queryset()
         facet_queryset = self.filter_facet_queryset(queryset)
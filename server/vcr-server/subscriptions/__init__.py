@@ -1,5 +1,7 @@
 import sys
 
+default_app_config = "subscriptions.apps.SubscriptionsConfig"
+
 if not any(
     k in sys.argv for k in ("collectstatic", "makemigrations", "migrate", "test")
 ):
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SubscriptionsConfig(AppConfig):
+    name = "subscriptions"
+
+    def ready(self):
+        # invalidate the subscription index whenever subscriptions change
+        from . import matcher  # noqa: F401
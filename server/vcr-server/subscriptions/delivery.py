@@ -0,0 +1,595 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import aiohttp
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from agent_webhooks.utils.credential_store import run_db
+
+from .matcher import subscription_matcher
+from .models.HookDelivery import HookDelivery
+from .models.Subscription import Subscription
+from .utils import HookStep, hook_stats, log_webhook_execution_result
+
+LOGGER = logging.getLogger(__name__)
+
+# max number of concurrent webhook requests
+HOOK_DELIVERY_CONCURRENCY = int(os.getenv("HOOK_DELIVERY_CONCURRENCY") or 20)
+# max number of pooled keep-alive connections to each subscriber host
+HOOK_DELIVERY_PER_HOST = int(os.getenv("HOOK_DELIVERY_PER_HOST") or 4)
+# max number of deliveries in flight, or waiting for their target
+HOOK_DELIVERY_BATCH = int(os.getenv("HOOK_DELIVERY_BATCH") or 200)
+# seconds between checks for deliveries queued by other workers, or due for a retry
+HOOK_DELIVERY_POLL_INTERVAL = float(os.getenv("HOOK_DELIVERY_POLL_INTERVAL") or 5)
+# seconds allowed for each webhook request, including connecting
+HOOK_DELIVERY_TIMEOUT = float(os.getenv("HOOK_DELIVERY_TIMEOUT") or 10)
+# seconds a claimed delivery is leased to the worker sending it
+HOOK_DELIVERY_LEASE = float(os.getenv("HOOK_DELIVERY_LEASE") or 300)
+# max number of deliveries in flight to one target
+HOOK_TARGET_CONCURRENCY = int(os.getenv("HOOK_TARGET_CONCURRENCY") or 2)
+# max requests per second to one target, 0 for no limit
+HOOK_TARGET_RATE = float(os.getenv("HOOK_TARGET_RATE") or 10)
+# consecutive failures that open the circuit of a target
+HOOK_CIRCUIT_FAILURES = int(os.getenv("HOOK_CIRCUIT_FAILURES") or 5)
+# seconds before a target with an open circuit is tried again
+HOOK_CIRCUIT_RESET = float(os.getenv("HOOK_CIRCUIT_RESET") or 60)
+# max number of records in a batch, for subscriptions delivered in batches
+HOOK_BATCH_MAX_SIZE = int(os.getenv("HOOK_BATCH_MAX_SIZE") or 1000)
+# milliseconds a batch waits to fill up, unless set by the subscription
+HOOK_BATCH_INTERVAL = int(os.getenv("HOOK_BATCH_INTERVAL") or 1000)
+
+
+class CircuitOpen(Exception):
+    """The target failed too often recently, the delivery is deferred"""
+
+    def __init__(self, until: float):
+        super().__init__("Circuit open")
+        self.until = until
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying the given attempt, as the celery task did."""
+    return float(settings.HOOK_RETRY_DELAY) ** (attempts - 1)
+
+
+def subscription_id(payload: dict):
+    """
+    Payloads of hooks with a subscription carry the subscription, the others
+    carry the hook itself
+    """
+    subscription = payload.get("subscription") or {}
+    if "subscription_type" in subscription:
+        return subscription.get("id")
+    return None
+
+
+def queue_delivery(target, payload, instance=None, hook=None):
+    """
+    HOOK_DELIVERER queueing a webhook payload in the delivery outbox; the
+    delivery worker is woken when the transaction commits.
+
+    The data of payloads for batched subscriptions is queued as a record of
+    the next batch.
+    """
+    subscription = getattr(hook, "subscription", None)
+    if subscription is not None and subscription.batch_size:
+        HookDelivery.objects.create(
+            hook=hook,
+            subscription=subscription,
+            target=target,
+            batched=True,
+            payload=json.dumps(payload.get("data"), default=str),
+        )
+    else:
+        HookDelivery.objects.create(
+            hook=hook,
+            subscription_id=subscription_id(payload),
+            target=target,
+            payload=json.dumps(payload, default=str),
+        )
+    worker = WebhookDeliveryWorker.current
+    if worker:
+        transaction.on_commit(worker.notify)
+
+
+def batch_payload(subscription: Subscription, sequence: int, records: list) -> str:
+    """
+    The payload of a batch; subscribers can use the sequence number to ignore
+    batches delivered again after a failure
+    """
+    return '{{"subscription": {}, "sequence": {}, "data": [{}]}}'.format(
+        json.dumps(subscription.dict(), default=str),
+        sequence,
+        ", ".join(record.payload for record in records),
+    )
+
+
+def close_batch(sub_id: int, now=None):
+    """
+    Replace the queued records of a batched subscription with a delivery per
+    batch, for the batches that are full or have waited long enough; returns
+    when the next batch is due, or None.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # the subscription row lock serializes batch numbering
+        subscription = (
+            Subscription.objects.select_for_update()
+            .select_related("owner")
+            .filter(id=sub_id)
+            .first()
+        )
+        if subscription is None:
+            return None
+        size = min(subscription.batch_size or HOOK_BATCH_MAX_SIZE, HOOK_BATCH_MAX_SIZE)
+        interval = timedelta(
+            milliseconds=HOOK_BATCH_INTERVAL
+            if subscription.batch_interval is None
+            else subscription.batch_interval
+        )
+        limit = size * 10
+        records = list(
+            HookDelivery.objects.filter(subscription=subscription, batched=True)
+            .only("id", "hook_id", "target", "payload", "create_timestamp")
+            .order_by("id")[:limit]
+        )
+        batches = [records[idx : idx + size] for idx in range(0, len(records), size)]
+        due = None
+        if len(records) >= limit:
+            due = now
+        elif (
+            batches
+            and len(batches[-1]) < size
+            and subscription.batch_size
+            and batches[-1][0].create_timestamp + interval > now
+        ):
+            # the last batch can still fill up
+            due = batches.pop()[0].create_timestamp + interval
+        if not batches:
+            return due
+        sequence = subscription.batch_sequence
+        deliveries = []
+        for batch in batches:
+            sequence += 1
+            deliveries.append(
+                HookDelivery(
+                    hook_id=batch[-1].hook_id,
+                    subscription=subscription,
+                    target=batch[-1].target,
+                    payload=batch_payload(subscription, sequence, batch),
+                )
+            )
+        HookDelivery.objects.bulk_create(deliveries)
+        HookDelivery.objects.filter(
+            id__in=[record.id for batch in batches for record in batch]
+        ).delete()
+        Subscription.objects.filter(id=subscription.id).update(batch_sequence=sequence)
+        LOGGER.debug(
+            "Closed batches %d to %d of subscription %d",
+            subscription.batch_sequence + 1,
+            sequence,
+            subscription.id,
+        )
+    return due
+
+
+def close_batches(now=None):
+    """
+    Close the batches of batched subscriptions that are ready to be sent;
+    returns the seconds until the next batch is due, or None.
+    """
+    now = now or timezone.now()
+    pending = (
+        HookDelivery.objects.filter(batched=True)
+        .values(
+            "subscription_id",
+            "subscription__batch_size",
+            "subscription__batch_interval",
+        )
+        .annotate(count=Count("id"), oldest=Min("create_timestamp"))
+        .order_by()
+    )
+    due = None
+    for group in pending:
+        interval = timedelta(
+            milliseconds=HOOK_BATCH_INTERVAL
+            if group["subscription__batch_interval"] is None
+            else group["subscription__batch_interval"]
+        )
+        next_due = group["oldest"] + interval
+        if (
+            not group["subscription__batch_size"]
+            or group["count"]
+            >= min(group["subscription__batch_size"], HOOK_BATCH_MAX_SIZE)
+            or next_due <= now
+        ):
+            next_due = close_batch(group["subscription_id"], now)
+            if next_due is None:
+                continue
+        wait = max((next_due - now).total_seconds(), 0)
+        due = wait if due is None else min(due, wait)
+    return due
+
+
+class TargetState:
+    """Rate limit and circuit breaker of one webhook target"""
+
+    def __init__(self, rate: float = None):
+        self.rate = HOOK_TARGET_RATE if rate is None else rate
+        self.tokens = max(self.rate, 1)
+        self.updated = time.monotonic()
+        self.failures = 0
+        self.open_until = 0.0
+        self.in_flight = 0
+        self.semaphore = asyncio.Semaphore(HOOK_TARGET_CONCURRENCY)
+
+    def is_open(self, now: float = None) -> bool:
+        return self.open_until > (time.monotonic() if now is None else now)
+
+    def is_busy(self) -> bool:
+        return self.in_flight >= HOOK_TARGET_CONCURRENCY or self.is_open()
+
+    async def throttle(self):
+        """Wait for the rate limit of the target"""
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                max(self.rate, 1), self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def record(self, success: bool):
+        if success:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= HOOK_CIRCUIT_FAILURES:
+            LOGGER.warning("Too many failed webhooks, pausing delivery")
+            self.open_until = time.monotonic() + HOOK_CIRCUIT_RESET
+            # once the circuit closes, one more failure opens it again
+            self.failures = HOOK_CIRCUIT_FAILURES - 1
+
+
+class WebhookDeliveryWorker:
+    """
+    Posts queued webhook payloads to subscribers over pooled keep-alive
+    connections, with bounds on the number of concurrent requests overall
+    and to each target.
+
+    Deliveries are claimed as capacity frees up, without waiting for the
+    rest of a batch, and no more are claimed for a target than it has free
+    slots, so a slow subscriber only holds up its own deliveries. The leases
+    of claimed deliveries are renewed until they are sent. Results are
+    recorded in batches.
+    """
+
+    current = None
+
+    def __init__(self, concurrency: int = None):
+        self._concurrency = concurrency or HOOK_DELIVERY_CONCURRENCY
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._wakeup = None
+        self._task = None
+        self._targets = {}
+        self._in_flight = set()
+        self._leased = set()
+        self._renewed = 0.0
+        self._results = []
+        self._batch_due = None
+
+    def setup(self, app=None):
+        LOGGER.info("Setting up webhook delivery worker ...")
+        if app is not None:
+            app["hook_delivery"] = self
+            app.on_startup.append(self.app_start)
+            app.on_cleanup.append(self.app_stop)
+        WebhookDeliveryWorker.current = self
+
+    async def app_start(self, _app=None):
+        self._loop = asyncio.get_event_loop()
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self._concurrency, limit_per_host=HOOK_DELIVERY_PER_HOST
+            ),
+            headers={"Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=HOOK_DELIVERY_TIMEOUT),
+        )
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def app_stop(self, _app=None):
+        LOGGER.info("Stopping webhook delivery worker ...")
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._in_flight):
+            task.cancel()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        # unsent deliveries are sent again once their lease expires
+        await self.flush()
+        await self._loop.run_in_executor(None, run_db, hook_stats.flush)
+        if self._session:
+            await self._session.close()
+            self._session = None
+        if WebhookDeliveryWorker.current is self:
+            WebhookDeliveryWorker.current = None
+
+    def notify(self):
+        """Wake the worker; may be called from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def target(self, url: str) -> TargetState:
+        state = self._targets.get(url)
+        if state is None:
+            state = self._targets[url] = TargetState()
+        return state
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                await self.renew()
+                claimed = await self.dispatch()
+            except Exception:
+                LOGGER.exception("Error delivering webhooks")
+                claimed = 0
+            if claimed and len(self._in_flight) < HOOK_DELIVERY_BATCH:
+                continue
+            timeout = min(HOOK_DELIVERY_POLL_INTERVAL, HOOK_DELIVERY_LEASE / 2)
+            if self._batch_due is not None:
+                timeout = min(timeout, self._batch_due)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch(self) -> int:
+        """Claim deliveries up to the free capacity; returns the number claimed."""
+        self._batch_due = await self._loop.run_in_executor(None, run_db, close_batches)
+        capacity = HOOK_DELIVERY_BATCH - len(self._in_flight)
+        if capacity <= 0:
+            return 0
+        in_flight = {}
+        for url, state in list(self._targets.items()):
+            if state.is_open():
+                in_flight[url] = HOOK_TARGET_CONCURRENCY
+            elif state.in_flight:
+                in_flight[url] = state.in_flight
+            elif not state.failures:
+                # forget idle targets, they start with a full rate allowance
+                del self._targets[url]
+        deliveries = await self._loop.run_in_executor(
+            None, run_db, self.claim, capacity, in_flight
+        )
+        for delivery in deliveries:
+            state = self.target(delivery.target)
+            state.in_flight += 1
+            self._leased.add(delivery.id)
+            task = asyncio.ensure_future(self._deliver(delivery, state))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        return len(deliveries)
+
+    async def flush(self):
+        """Record the results of the deliveries completed so far."""
+        if self._results or hook_stats.is_due():
+            results, self._results = self._results, []
+            await self._loop.run_in_executor(None, run_db, self.record, results)
+
+    async def renew(self):
+        """Renew the leases of the claimed deliveries not sent yet."""
+        if not self._leased:
+            return
+        if time.monotonic() - self._renewed < HOOK_DELIVERY_LEASE / 2:
+            return
+        self._renewed = time.monotonic()
+        await self._loop.run_in_executor(
+            None, run_db, self.renew_lease, list(self._leased)
+        )
+
+    @staticmethod
+    def renew_lease(ids: list):
+        HookDelivery.objects.filter(id__in=ids).update(
+            next_attempt=timezone.now() + timedelta(seconds=HOOK_DELIVERY_LEASE)
+        )
+
+    @staticmethod
+    def claim(limit: int, in_flight: dict = None) -> list:
+        """
+        Claim the oldest due deliveries, at most HOOK_TARGET_CONCURRENCY for
+        each target less the number in flight to it.
+        """
+        in_flight = in_flight or {}
+        now = timezone.now()
+        due = HookDelivery.objects.filter(
+            Q(next_attempt__isnull=True) | Q(next_attempt__lte=now),
+            batched=False,
+        )
+        full = [
+            url for url, count in in_flight.items() if count >= HOOK_TARGET_CONCURRENCY
+        ]
+        # the first deliveries of each target, numbered by a window function
+        ranked_sql, params = (
+            due.exclude(target__in=full)
+            .annotate(
+                position=Window(
+                    RowNumber(), partition_by=[F("target")], order_by=F("id").asc()
+                )
+            )
+            .values("id", "target", "position")
+            .query.sql_with_params()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, target, position FROM ({}) ranked"
+                " WHERE position <= %s ORDER BY id LIMIT %s".format(ranked_sql),
+                params
+                + (
+                    HOOK_TARGET_CONCURRENCY,
+                    limit + sum(count for count in in_flight.values()),
+                ),
+            )
+            ids = [
+                row_id
+                for row_id, target, position in cursor.fetchall()
+                if position <= HOOK_TARGET_CONCURRENCY - in_flight.get(target, 0)
+            ][:limit]
+        with transaction.atomic():
+            deliveries = list(
+                due.filter(id__in=ids)
+                .select_for_update(skip_locked=True)
+                .order_by("id")
+            )
+            # lease the deliveries while they are in flight
+            HookDelivery.objects.filter(
+                id__in=[delivery.id for delivery in deliveries]
+            ).update(next_attempt=now + timedelta(seconds=HOOK_DELIVERY_LEASE))
+        return deliveries
+
+    @staticmethod
+    def record(results: list):
+        """
+        Remove the delivered payloads and those that ran out of attempts,
+        schedule retries for the others, and update the delivery stats of
+        their subscriptions with one statement per outcome.
+        """
+        now = timezone.now()
+        max_attempts = int(settings.HOOK_RETRY_THRESHOLD) + 1
+        delivered = []
+        given_up = []
+        failed = []
+        sent_subscriptions = set()
+        failed_subscriptions = Counter()
+        for delivery, error in results:
+            if error is None:
+                log_webhook_execution_result(
+                    False,
+                    HookStep.RETRY if delivery.attempts else HookStep.FIRST_ATTEMPT,
+                )
+                log_webhook_execution_result(True)
+                delivered.append(delivery.id)
+                if delivery.subscription_id:
+                    sent_subscriptions.add(delivery.subscription_id)
+                continue
+            if isinstance(error, CircuitOpen):
+                # deferred without being sent
+                delivery.next_attempt = now + timedelta(
+                    seconds=max(error.until - time.monotonic(), 0)
+                )
+                failed.append(delivery)
+                continue
+            log_webhook_execution_result(
+                False,
+                HookStep.RETRY if delivery.attempts else HookStep.FIRST_ATTEMPT,
+            )
+            delivery.error = str(error) or error.__class__.__name__
+            delivery.attempts += 1
+            if delivery.attempts >= max_attempts:
+                LOGGER.error(
+                    " >>> Giving up delivering hook %s to %s: %s",
+                    delivery.hook_id,
+                    delivery.target,
+                    delivery.error,
+                )
+                log_webhook_execution_result(False, HookStep.RETRY_FAIL)
+                log_webhook_execution_result(False)
+                given_up.append(delivery.id)
+                if delivery.subscription_id:
+                    failed_subscriptions[delivery.subscription_id] += 1
+                continue
+            delivery.next_attempt = now + timedelta(
+                seconds=retry_delay(delivery.attempts)
+            )
+            failed.append(delivery)
+        if delivered or given_up:
+            HookDelivery.objects.filter(id__in=delivered + given_up).delete()
+        if failed:
+            HookDelivery.objects.bulk_update(
+                failed, ["attempts", "next_attempt", "error"]
+            )
+        # the last outcome of a subscription decides its error count
+        sent_subscriptions.difference_update(failed_subscriptions)
+        if sent_subscriptions:
+            Subscription.objects.filter(id__in=sent_subscriptions).update(
+                last_sent_date=now, error_count=0, update_timestamp=now
+            )
+        if failed_subscriptions:
+            by_count = defaultdict(list)
+            for sub_id, count in failed_subscriptions.items():
+                by_count[count].append(sub_id)
+            for count, sub_ids in by_count.items():
+                Subscription.objects.filter(id__in=sub_ids).update(
+                    last_error_date=now,
+                    error_count=F("error_count") + count,
+                    update_timestamp=now,
+                )
+            # if too many consecutive errors expire the subscription
+            expired = Subscription.objects.filter(
+                id__in=list(failed_subscriptions),
+                error_count__gt=int(settings.HOOK_MAX_SUBSCRIPTION_ERRORS),
+                subscription_expiry__isnull=True,
+            ).update(subscription_expiry=now.date(), update_timestamp=now)
+            if expired:
+                subscription_matcher.invalidate()
+        hook_stats.maybe_flush()
+
+    async def _deliver(self, delivery: HookDelivery, state: TargetState):
+        try:
+            async with state.semaphore:
+                if state.is_open():
+                    raise CircuitOpen(state.open_until)
+                await state.throttle()
+                async with self._semaphore:
+                    await self.post(delivery)
+        except CircuitOpen as e:
+            error = e
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+            state.record(False)
+        else:
+            error = None
+            state.record(True)
+        finally:
+            state.in_flight -= 1
+            self._leased.discard(delivery.id)
+        self._results.append((delivery, error))
+        self.notify()
+
+    async def post(self, delivery: HookDelivery):
+        LOGGER.info("Delivering hook to: {}".format(delivery.target))
+        start_time = time.perf_counter()
+        try:
+            async with self._session.post(
+                delivery.target, data=delivery.payload
+            ) as resp:
+                LOGGER.info("--> response {}".format(resp.status))
+                resp.raise_for_status()
+        finally:
+            hook_stats.observe(delivery.target, time.perf_counter() - start_time)
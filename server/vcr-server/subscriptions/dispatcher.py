@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+import zlib
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from agent_webhooks.utils.credential_store import run_db
+
+from .hook_utils import find_and_fire_hook
+from .models.HookableCredential import HookableCredential
+
+LOGGER = logging.getLogger(__name__)
+
+HOOK_EVENT = "hookable_cred.added"
+
+# max number of hookable credentials dispatched in one transaction
+HOOK_DISPATCH_BATCH = int(os.getenv("HOOK_DISPATCH_BATCH") or 200)
+# seconds between checks for credentials queued by other server instances
+HOOK_DISPATCH_POLL_INTERVAL = float(os.getenv("HOOK_DISPATCH_POLL_INTERVAL") or 5)
+HOOK_DISPATCH_MAX_ATTEMPTS = int(os.getenv("HOOK_DISPATCH_MAX_ATTEMPTS") or 10)
+HOOK_DISPATCH_RETRY_DELAY = float(os.getenv("HOOK_DISPATCH_RETRY_DELAY") or 5)
+HOOK_DISPATCH_MAX_RETRY_DELAY = float(os.getenv("HOOK_DISPATCH_MAX_RETRY_DELAY") or 600)
+
+DISPATCH_LOCK_KEY = zlib.crc32(b"hook_outbox:dispatch")
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before the given attempt, doubling each time."""
+    return min(
+        HOOK_DISPATCH_RETRY_DELAY * 2 ** max(attempts - 1, 0),
+        HOOK_DISPATCH_MAX_RETRY_DELAY,
+    )
+
+
+def notify_dispatcher():
+    """Wake the hook dispatcher when the current transaction commits."""
+    dispatcher = HookDispatcher.current
+    if dispatcher:
+        transaction.on_commit(dispatcher.notify)
+
+
+def resolve_topic_status(credentials: list) -> list:
+    """
+    Credentials are queued as 'Stream' unless their topic was just created.
+    The first credential of a topic without any 'New' credential becomes
+    'New'; returns the credentials that changed.
+    """
+    pending = {
+        credential.corp_num
+        for credential in credentials
+        if credential.topic_status != "New"
+    }
+    if not pending:
+        return []
+    has_new = set(
+        HookableCredential.objects.filter(corp_num__in=pending, topic_status="New")
+        .values_list("corp_num", flat=True)
+        .distinct()
+    )
+    changed = []
+    for credential in credentials:
+        if credential.topic_status != "New" and credential.corp_num not in has_new:
+            credential.topic_status = "New"
+            changed.append(credential)
+        if credential.topic_status == "New":
+            has_new.add(credential.corp_num)
+    return changed
+
+
+def dispatch(limit: int = None) -> int:
+    """
+    Fire the hooks of one batch of queued credentials, in the order they were
+    queued; returns the number of credentials processed.
+
+    One dispatcher runs at a time, holding a Postgres advisory lock until the
+    batch commits. If it dies part way through, the batch is rolled back and
+    dispatched again, so a hook may fire more than once for a credential.
+    Credentials whose hooks fail to fire are retried later.
+    """
+    limit = limit or HOOK_DISPATCH_BATCH
+    now = timezone.now()
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_try_advisory_xact_lock(%s)", [DISPATCH_LOCK_KEY]
+                )
+                if not cursor.fetchone()[0]:
+                    return 0
+        credentials = list(
+            HookableCredential.objects.filter(
+                Q(next_attempt__isnull=True) | Q(next_attempt__lte=now),
+                dispatched=False,
+                attempts__lt=HOOK_DISPATCH_MAX_ATTEMPTS,
+            ).order_by("id")[:limit]
+        )
+        if not credentials:
+            return 0
+        changed = resolve_topic_status(credentials)
+        if changed:
+            HookableCredential.objects.bulk_update(changed, ["topic_status"])
+        dispatched = []
+        failed = []
+        for credential in credentials:
+            try:
+                # a savepoint, so that a failed fan-out queues no deliveries
+                with transaction.atomic():
+                    find_and_fire_hook(HOOK_EVENT, credential)
+            except Exception as e:
+                LOGGER.exception(
+                    "Error firing hooks for hookable credential %s", credential.id
+                )
+                credential.error = str(e) or e.__class__.__name__
+                credential.attempts += 1
+                if credential.attempts >= HOOK_DISPATCH_MAX_ATTEMPTS:
+                    LOGGER.error(
+                        " >>> Giving up firing hooks for hookable credential %s: %s",
+                        credential.id,
+                        credential.error,
+                    )
+                    credential.next_attempt = None
+                else:
+                    credential.next_attempt = now + timedelta(
+                        seconds=retry_delay(credential.attempts)
+                    )
+                failed.append(credential)
+            else:
+                dispatched.append(credential.id)
+        if dispatched:
+            HookableCredential.objects.filter(id__in=dispatched).update(dispatched=True)
+        if failed:
+            HookableCredential.objects.bulk_update(
+                failed, ["attempts", "next_attempt", "error"]
+            )
+    return len(credentials)
+
+
+class HookDispatcher:
+    """
+    Fires the hooks of credentials queued in the hookable credential outbox,
+    in batches, outside of the transactions that store the credentials.
+    """
+
+    current = None
+
+    def __init__(self):
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    def setup(self, app=None):
+        LOGGER.info("Setting up hook dispatcher ...")
+        if app is not None:
+            app["hook_dispatcher"] = self
+            app.on_startup.append(self.app_start)
+            app.on_cleanup.append(self.app_stop)
+        HookDispatcher.current = self
+
+    async def app_start(self, _app=None):
+        self._loop = asyncio.get_event_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def app_stop(self, _app=None):
+        LOGGER.info("Stopping hook dispatcher ...")
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if HookDispatcher.current is self:
+            HookDispatcher.current = None
+
+    def notify(self):
+        """Wake the dispatcher; may be called from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                dispatched = await self._loop.run_in_executor(
+                    None, run_db, dispatch, HOOK_DISPATCH_BATCH
+                )
+            except Exception:
+                LOGGER.exception("Error dispatching hooks")
+                dispatched = 0
+            if dispatched >= HOOK_DISPATCH_BATCH:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), HOOK_DISPATCH_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
@@ -1,58 +1,27 @@
 import datetime
 import time
 
+from .matcher import subscription_matcher
 from .models.CredentialHook import CredentialHook
 from .models.HookUser import HookUser
-from .models.Subscription import Subscription
 
 from api.v2.utils import log_timing_method
 
 
 def find_and_fire_hook(event_name, instance, **kwargs):
-    filters = {"event": event_name, "is_active": True}
-
     start_time = time.perf_counter()
     method = "web_hook." + event_name
-    hooks = CredentialHook.objects.filter(**filters)
+    # only the hooks with a subscription matching the credential are loaded
+    hooks = subscription_matcher.match(event_name, instance)
     for hook in hooks:
         if is_registration_valid(hook):
-            send_hook = False
-            # find subscription(s) related to this hook
-            subscriptions = Subscription.objects.filter(hook=hook).all()
-            if 0 < len(subscriptions):
-                # check if we should fire per subscription
-                for subscription in subscriptions:
-                    if subscription.subscription_expiry is not None:
-                        # skip for any non-null subscription expiry date
-                        pass
-                    elif subscription.subscription_type == "New":
-                        if subscription.subscription_type == instance.topic_status:
-                            send_hook = True
-                    elif subscription.subscription_type == "Stream":
-                        if (
-                            subscription.topic_source_id == instance.corp_num
-                            and subscription.credential_type == instance.credential_type
-                        ):
-                            send_hook = True
-                    elif subscription.subscription_type == "Topic":
-                        if subscription.topic_source_id == instance.corp_num:
-                            send_hook = True
-                    else:
-                        print(
-                            "      >>> Error invalid subscription type:",
-                            subscription.subscription_type,
-                        )
-                        raise Exception("Invalid subscription type")
+            hook_start_time = time.perf_counter()
+            hook_method = "web_hook.deliver_hook"
 
-            # logic around whether we hook or not
-            if send_hook:
-                hook_start_time = time.perf_counter()
-                hook_method = "web_hook.deliver_hook"
+            hook.deliver_hook(instance)
 
-                hook.deliver_hook(instance)
-                
-                hook_end_time = time.perf_counter()
-                log_timing_method(hook_method, hook_start_time, hook_end_time, True)
+            hook_end_time = time.perf_counter()
+            log_timing_method(hook_method, hook_start_time, hook_end_time, True)
 
     end_time = time.perf_counter()
     log_timing_method(method, start_time, end_time, True)
@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from api.v2.models.CredentialType import CredentialType
+
+from .models.CredentialHook import CredentialHook
+from .models.Subscription import Subscription
+
+LOGGER = logging.getLogger(__name__)
+
+GENERATION_KEY = "subscription_matcher.generation"
+# seconds before the subscription index is reloaded, for changes made by
+# processes that don't share this cache
+HOOK_SUBSCRIPTION_REFRESH_INTERVAL = float(
+    os.getenv("HOOK_SUBSCRIPTION_REFRESH_INTERVAL") or 30
+)
+
+# delivery bookkeeping saves of these fields alone don't change which hooks match
+DELIVERY_FIELDS = frozenset(
+    ("last_sent_date", "last_error_date", "error_count", "update_timestamp")
+)
+
+
+class EventSubscriptions:
+    """
+    The active hooks of an event, indexed by the
+    (subscription_type, topic_source_id, credential_type) keys their
+    subscriptions match; subscriptions of an unknown type are skipped
+    """
+
+    def __init__(self, subscriptions):
+        self.hooks = {}
+        for subscription in subscriptions:
+            key = self.subscription_key(subscription)
+            if key is None:
+                LOGGER.warning(
+                    "Skipping subscription %s of invalid type: %s",
+                    subscription.id,
+                    subscription.subscription_type,
+                )
+            else:
+                # serializing the hook payload needs the subscription
+                subscription.hook.subscription = subscription
+                self.hooks.setdefault(key, {})[subscription.hook_id] = subscription.hook
+
+    @staticmethod
+    def subscription_key(subscription):
+        if subscription.subscription_type == "New":
+            return ("New", None, None)
+        if subscription.subscription_type == "Stream":
+            return (
+                "Stream",
+                subscription.topic_source_id,
+                credential_type_key(subscription.credential_type),
+            )
+        if subscription.subscription_type == "Topic":
+            return ("Topic", subscription.topic_source_id, None)
+        return None
+
+    @staticmethod
+    def credential_keys(instance):
+        if instance.topic_status == "New":
+            yield ("New", None, None)
+        if instance.corp_num:
+            yield ("Topic", instance.corp_num, None)
+            if instance.credential_type:
+                yield (
+                    "Stream",
+                    instance.corp_num,
+                    credential_type_key(instance.credential_type),
+                )
+
+    def match(self, instance) -> list:
+        """The hooks with a subscription matching a hookable credential"""
+        matched = {}
+        for key in self.credential_keys(instance):
+            matched.update(self.hooks.get(key, {}))
+        return [matched[hook_id] for hook_id in sorted(matched)]
+
+
+def credential_type_key(credential_type):
+    """
+    Hookable credentials name their credential type by schema name, while
+    subscriptions reference the credential type
+    """
+    if isinstance(credential_type, CredentialType):
+        return credential_type.schema.name
+    return credential_type
+
+
+class SubscriptionMatcher:
+    """
+    Subscriptions of each event, loaded once per process and indexed so that
+    matching a credential only looks at the subscriptions it matches.
+
+    Saving or deleting a hook or subscription bumps a generation counter in
+    the cache, which discards the index in all workers sharing it. With a
+    per-process cache (the default LocMemCache) changes made by the API are
+    only seen once the index is reloaded, every
+    HOOK_SUBSCRIPTION_REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._events = {}
+        self._generation = None
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            cache.add(GENERATION_KEY, self._generation_seed(), timeout=None)
+            generation = cache.get(GENERATION_KEY)
+        return generation
+
+    def event_subscriptions(self, event_name: str) -> EventSubscriptions:
+        generation = self.generation()
+        now = time.monotonic()
+        with self._lock:
+            if (
+                generation != self._generation
+                or now - self._loaded >= HOOK_SUBSCRIPTION_REFRESH_INTERVAL
+            ):
+                self._events = {}
+                self._generation = generation
+                self._loaded = now
+            subscriptions = self._events.get(event_name)
+        if subscriptions is None:
+            subscriptions = EventSubscriptions(
+                Subscription.objects.filter(
+                    hook__event=event_name,
+                    hook__is_active=True,
+                    subscription_expiry__isnull=True,
+                )
+                .select_related("hook", "owner", "credential_type__schema")
+                .order_by("id")
+            )
+            with self._lock:
+                if generation == self._generation:
+                    self._events[event_name] = subscriptions
+        return subscriptions
+
+    def match(self, event_name: str, instance) -> list:
+        return self.event_subscriptions(event_name).match(instance)
+
+    def invalidate(self):
+        """
+        Discard the subscription index of every worker
+
+        This is repeated when the current transaction commits, in case another
+        worker loaded the previous subscriptions in the meantime.
+        """
+        self._invalidate()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(self._invalidate)
+
+    def _invalidate(self):
+        LOGGER.debug("Invalidating the subscription index")
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            # the counter was evicted
+            cache.set(GENERATION_KEY, self._generation_seed(), timeout=None)
+        with self._lock:
+            self._events = {}
+            self._generation = None
+
+    @staticmethod
+    def _generation_seed() -> int:
+        return int.from_bytes(os.urandom(4), "big")
+
+
+subscription_matcher = SubscriptionMatcher()
+
+
+@receiver(signals.post_save, sender=Subscription)
+def subscription_saved(sender, update_fields=None, **kwargs):
+    if update_fields and DELIVERY_FIELDS.issuperset(update_fields):
+        return
+    subscription_matcher.invalidate()
+
+
+@receiver(signals.post_delete, sender=Subscription)
+@receiver(signals.post_save, sender=CredentialHook)
+@receiver(signals.post_delete, sender=CredentialHook)
+def subscriptions_changed(sender, **kwargs):
+    subscription_matcher.invalidate()
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0006_credentialhookstats'),
+    ]
+
+    operations = [
+        # hooks were already fired for the existing rows
+        migrations.AddField(
+            model_name='hookablecredential',
+            name='dispatched',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='hookablecredential',
+            name='dispatched',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='hookablecredential',
+            index=models.Index(condition=models.Q(dispatched=False), fields=['id'], name='hook_outbox_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0007_hookablecredential_dispatched'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HookDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, null=True)),
+                ('target', models.TextField()),
+                ('payload', models.TextField()),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(db_index=True, null=True)),
+                ('error', models.TextField(null=True)),
+                ('hook', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='subscriptions.CredentialHook')),
+                ('subscription', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='subscriptions.Subscription')),
+            ],
+            options={
+                'db_table': 'hook_delivery_outbox',
+                'ordering': ('id',),
+            },
+        ),
+    ]
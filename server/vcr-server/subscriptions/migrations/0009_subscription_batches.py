@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0008_hookdelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hookdelivery',
+            name='batched',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='batch_interval',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='batch_sequence',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='batch_size',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
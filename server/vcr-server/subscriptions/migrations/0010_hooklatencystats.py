@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0009_subscription_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HookLatencyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_timestamp', models.DateTimeField(auto_now_add=True, null=True)),
+                ('update_timestamp', models.DateTimeField(auto_now=True, null=True)),
+                ('worker_id', models.TextField(max_length=64)),
+                ('target', models.TextField()),
+                ('le', models.FloatField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('total_time', models.FloatField(default=0)),
+            ],
+            options={
+                'db_table': 'hook_latency_stats',
+                'ordering': ('id',),
+                'unique_together': {('worker_id', 'target', 'le')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0010_hooklatencystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hookablecredential',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hookablecredential',
+            name='error',
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='hookablecredential',
+            name='next_attempt',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
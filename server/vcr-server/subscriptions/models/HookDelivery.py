@@ -0,0 +1,32 @@
+from django.db import models
+
+from api.v2.models.Auditable import Auditable
+
+from .CredentialHook import CredentialHook
+from .Subscription import Subscription
+
+
+class HookDelivery(Auditable):
+    """
+    A webhook payload waiting to be posted to a subscriber; the delivery is
+    retried until the subscriber accepts it or the retries run out
+    """
+
+    hook = models.ForeignKey(
+        CredentialHook, related_name="+", on_delete=models.CASCADE, null=True
+    )
+    subscription = models.ForeignKey(
+        Subscription, related_name="+", on_delete=models.CASCADE, null=True
+    )
+    target = models.TextField()
+    # a record waiting to be sent in a batch to a batched subscription
+    batched = models.BooleanField(default=False)
+    # the serialized payload
+    payload = models.TextField()
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, db_index=True)
+    error = models.TextField(null=True)
+
+    class Meta:
+        db_table = "hook_delivery_outbox"
+        ordering = ("id",)
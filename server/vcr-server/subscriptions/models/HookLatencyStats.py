@@ -0,0 +1,22 @@
+from django.db import models
+
+from api.v2.models.Auditable import Auditable
+
+
+class HookLatencyStats(Auditable):
+    """
+    Webhook response time histogram of a target host, one row per worker and
+    latency bucket
+    """
+
+    worker_id = models.TextField(max_length=64)
+    target = models.TextField()
+    # upper bound of the bucket in seconds
+    le = models.FloatField()
+    count = models.BigIntegerField(default=0)
+    total_time = models.FloatField(default=0)
+
+    class Meta:
+        db_table = "hook_latency_stats"
+        ordering = ("id",)
+        unique_together = (("worker_id", "target", "le"),)
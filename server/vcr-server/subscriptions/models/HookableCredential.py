@@ -23,7 +23,7 @@ class HookableCredential(Auditable):
     cred = HookableCredential(corp_num='BC1234568', credential_type='122', credential_json='{}')
     cred.save()
 
-    ... should fire off a hook to the feedback api
+    ... the hook dispatcher fires off a hook to the feedback api
     """
 
     # corp_num = models.ForeignKey("Topic", related_name="+", to_field="source_id", on_delete=models.DO_NOTHING)
@@ -33,14 +33,23 @@ class HookableCredential(Auditable):
     corp_num = models.TextField(null=True)
     credential_type = models.TextField(null=True)
     credential_json = contrib.JSONField(blank=True, null=True)
+    # set once the dispatcher has fired the hooks subscribed to the credential
+    dispatched = models.BooleanField(default=False)
+    # failed attempts to fire the hooks, retried with a growing delay
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True)
+    error = models.TextField(null=True)
 
     def serialize_hook(self, hook):
         # optional, there are serialization defaults
         # we recommend always sending the Hook
         # metadata along for the ride as well
-        subscriptions = Subscription.objects.filter(hook=hook)
-        if 0 < len(subscriptions):
-            hook_dict = subscriptions[0].dict()
+        # hooks found by the subscription matcher carry their subscription
+        subscription = getattr(hook, "subscription", None)
+        if subscription is None:
+            subscription = Subscription.objects.filter(hook=hook).first()
+        if subscription is not None:
+            hook_dict = subscription.dict()
         else:
             hook_dict = hook.dict()
         dict = {
@@ -62,4 +71,9 @@ class HookableCredential(Auditable):
         ordering = ("corp_num", "credential_type")
         indexes = [
             models.Index(fields=['corp_num', 'topic_status'], name='new_hook_idx'),
+            models.Index(
+                fields=['id'],
+                name='hook_outbox_idx',
+                condition=models.Q(dispatched=False),
+            ),
         ]
@@ -48,6 +48,13 @@ class Subscription(Auditable):
     # expire the subscription if we get too many errors
     subscription_expiry = models.DateField(blank=True, null=True)
 
+    # opt-in batching - deliver up to batch_size records per call, waiting at
+    # most batch_interval milliseconds for a batch to fill up
+    batch_size = models.IntegerField(blank=True, null=True)
+    batch_interval = models.IntegerField(blank=True, null=True)
+    # sequence number of the last batch, for subscribers to detect duplicates
+    batch_sequence = models.BigIntegerField(default=0)
+
     def __str__(self):
         return (
             str(id)
@@ -1,5 +1,7 @@
 from .CredentialHook import CredentialHook
 from .CredentialHookStats import CredentialHookStats
 from .HookableCredential import HookableCredential
+from .HookDelivery import HookDelivery
+from .HookLatencyStats import HookLatencyStats
 from .HookUser import HookUser
 from .Subscription import Subscription
@@ -16,6 +16,7 @@ from api.v2.auth import generate_random_username
 from api.v2.models.CredentialType import CredentialType
 from api.v2.models.User import User
 
+from ..delivery import HOOK_BATCH_MAX_SIZE
 from ..models.Subscription import Subscription
 
 logger = logging.getLogger(__name__)
@@ -149,6 +150,12 @@ class SubscriptionSerializer(serializers.Serializer):
     )
     target_url = serializers.CharField(required=False, max_length=240)
     hook_token = serializers.CharField(required=False, max_length=240)
+    batch_size = serializers.IntegerField(
+        required=False, allow_null=True, min_value=1, max_value=HOOK_BATCH_MAX_SIZE
+    )
+    batch_interval = serializers.IntegerField(
+        required=False, allow_null=True, min_value=0
+    )
     last_sent_date = serializers.ReadOnlyField()
     last_error_date = serializers.ReadOnlyField()
     error_count = serializers.ReadOnlyField()
@@ -267,6 +274,10 @@ class SubscriptionSerializer(serializers.Serializer):
             subscription.target_url = validated_data["target_url"]
         if "target_url" in validated_data:
             subscription.target_url = validated_data["target_url"]
+        if "batch_size" in validated_data:
+            subscription.batch_size = validated_data["batch_size"]
+        if "batch_interval" in validated_data:
+            subscription.batch_interval = validated_data["batch_interval"]
 
         # automatically reset expiry date on update
         print("Reset subscription expiry date")
@@ -1,19 +1,25 @@
 import json
 import logging
 import os
+import time
 from datetime import datetime
 
 import pytz
 import requests
 from celery.exceptions import Retry
 # from celery.result import AsyncResult
-from celery.signals import celeryd_after_setup
+from celery.signals import celeryd_after_setup, worker_process_shutdown
 from celery import shared_task
 from django.conf import settings
 
 from subscriptions.models.Subscription import Subscription
 
-from .utils import HookStep, TooManyRetriesException, log_webhook_execution_result
+from .utils import (
+    HookStep,
+    TooManyRetriesException,
+    hook_stats,
+    log_webhook_execution_result,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -50,11 +56,15 @@ def deliver_hook(Task):
                 log_webhook_execution_result(False, HookStep.FIRST_ATTEMPT)
 
                 LOGGER.info("Delivering hook to: {}".format(target))
-                response = requests.post(
-                    url=target,
-                    data=json.dumps(payload),
-                    headers={"Content-Type": "application/json"},
-                )
+                start_time = time.perf_counter()
+                try:
+                    response = requests.post(
+                        url=target,
+                        data=json.dumps(payload),
+                        headers={"Content-Type": "application/json"},
+                    )
+                finally:
+                    hook_stats.observe(target, time.perf_counter() - start_time)
                 LOGGER.info("--> response {}".format(response.status_code))
                 response.raise_for_status()
 
@@ -64,7 +74,9 @@ def deliver_hook(Task):
                 )
                 subscription.last_sent_date = datetime.now(pytz.utc)
                 subscription.error_count = 0
-                subscription.save()
+                subscription.save(
+                    update_fields=["last_sent_date", "error_count", "update_timestamp"]
+                )
 
                 log_webhook_execution_result(True)
 
@@ -115,7 +127,15 @@ def deliver_hook(Task):
                 # if too many consecutive errors expire the subscription
                 if subscription.error_count > settings.HOOK_MAX_SUBSCRIPTION_ERRORS:
                     subscription.subscription_expiry = datetime.now()
-                subscription.save()
+                    subscription.save()
+                else:
+                    subscription.save(
+                        update_fields=[
+                            "last_error_date",
+                            "error_count",
+                            "update_timestamp",
+                        ]
+                    )
 
                 log_webhook_execution_result(False)
 
@@ -150,3 +170,9 @@ def capture_worker_name(sender, instance, **kwargs):
     if "CELERY_WORKER_NAME" not in os.environ:
         os.environ["CELERY_WORKER_NAME"] = "{0}".format(sender)
         LOGGER.info(f'Setting worker name: {os.environ["CELERY_WORKER_NAME"]}')
+
+
+@worker_process_shutdown.connect
+def flush_hook_stats(**kwargs):
+    """Save the webhook stats counted since the last periodic flush."""
+    hook_stats.flush()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from subscriptions.delivery import (
+    HOOK_CIRCUIT_FAILURES,
+    HOOK_DELIVERY_LEASE,
+    HOOK_TARGET_CONCURRENCY,
+    CircuitOpen,
+    TargetState,
+    WebhookDeliveryWorker,
+    close_batches,
+    queue_delivery,
+)
+from subscriptions.models import CredentialHook, HookDelivery, Subscription
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise Exception(f"HTTP {self.status}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def post(self, url, data=None):
+        self.calls.append((url, json.loads(data)))
+        return FakeResponse(self.responses[url])
+
+
+@override_settings(
+    HOOK_RETRY_THRESHOLD=2, HOOK_RETRY_DELAY=5, HOOK_MAX_SUBSCRIPTION_ERRORS=1
+)
+@patch("subscriptions.delivery.log_webhook_execution_result", autospec=True)
+class WebhookDeliveryWorker_TestCase(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create(username="user1", DID="not:a:did:123")
+        self.hook = CredentialHook.objects.create(
+            user_id=user.id, event="hookable_cred.added", target="http://target"
+        )
+        self.subscription = Subscription.objects.create(
+            hook=self.hook, subscription_type="New", owner_id=user.id
+        )
+        self.hook.subscription = self.subscription
+
+    def queue(self, target="http://target", data=None):
+        queue_delivery(
+            target,
+            {"subscription": self.subscription.dict(), "data": data},
+            hook=self.hook,
+        )
+
+    def test_batched_delivery(self, _mock_log):
+        self.subscription.batch_size = 2
+        self.subscription.batch_interval = 500
+        self.subscription.save()
+        for idx in range(3):
+            self.queue(data={"id": idx})
+        # batch records are only delivered in a batch
+        assert WebhookDeliveryWorker.claim(10) == []
+
+        # the last record waits for its batch to fill up
+        due = close_batches()
+        assert 0 < due <= 0.5
+        (delivery,) = WebhookDeliveryWorker.claim(10)
+        payload = json.loads(delivery.payload)
+        assert payload["subscription"]["id"] == self.subscription.id
+        assert payload["sequence"] == 1
+        assert payload["data"] == [{"id": 0}, {"id": 1}]
+
+        assert close_batches(timezone.now() + timedelta(milliseconds=500)) is None
+        (delivery,) = WebhookDeliveryWorker.claim(10)
+        payload = json.loads(delivery.payload)
+        assert payload["sequence"] == 2
+        assert payload["data"] == [{"id": 2}]
+        assert not HookDelivery.objects.filter(batched=True).exists()
+
+    def deliver(self, deliveries, responses):
+        worker = WebhookDeliveryWorker()
+        worker._session = FakeSession(responses)
+        worker._semaphore = asyncio.Semaphore(1)
+        loop = asyncio.get_event_loop()
+        for delivery in deliveries:
+            loop.run_until_complete(
+                worker._deliver(delivery, worker.target(delivery.target))
+            )
+        return worker
+
+    def test_queue_delivery(self, _mock_log):
+        self.queue(data={"id": 1})
+
+        delivery = HookDelivery.objects.get()
+        assert delivery.hook == self.hook
+        assert delivery.subscription == self.subscription
+        assert json.loads(delivery.payload)["data"] == {"id": 1}
+
+    def test_claim_skips_busy_targets(self, _mock_log):
+        self.queue("http://slow")
+        self.queue("http://target")
+
+        claimed = WebhookDeliveryWorker.claim(
+            10, {"http://slow": HOOK_TARGET_CONCURRENCY}
+        )
+        assert [delivery.target for delivery in claimed] == ["http://target"]
+        # in flight deliveries are not claimed again
+        assert WebhookDeliveryWorker.claim(10) == [
+            HookDelivery.objects.get(target="http://slow")
+        ]
+
+    def test_claim_per_target(self, _mock_log):
+        for _idx in range(HOOK_TARGET_CONCURRENCY + 2):
+            self.queue("http://slow")
+        self.queue("http://target")
+
+        # a backlog for one target doesn't hold up the others
+        claimed = WebhookDeliveryWorker.claim(10, {"http://slow": 1})
+        assert [delivery.target for delivery in claimed] == ["http://slow"] * (
+            HOOK_TARGET_CONCURRENCY - 1
+        ) + ["http://target"]
+
+        claimed = WebhookDeliveryWorker.claim(1)
+        assert [delivery.target for delivery in claimed] == ["http://slow"]
+
+    def test_renew_lease(self, _mock_log):
+        self.queue()
+        (delivery,) = WebhookDeliveryWorker.claim(10)
+        leased = HookDelivery.objects.get().next_attempt
+
+        WebhookDeliveryWorker.renew_lease([delivery.id])
+        renewed = HookDelivery.objects.get().next_attempt
+        assert renewed >= leased
+        assert renewed > timezone.now() + timedelta(seconds=HOOK_DELIVERY_LEASE - 5)
+
+    def test_deliver(self, _mock_log):
+        self.queue("http://target", {"id": 1})
+        self.queue("http://failing", {"id": 2})
+
+        worker = self.deliver(
+            HookDelivery.objects.all(), {"http://target": 200, "http://failing": 500}
+        )
+        assert [call[1]["data"] for call in worker._session.calls] == [
+            {"id": 1},
+            {"id": 2},
+        ]
+        assert [error is None for _delivery, error in worker._results] == [
+            True,
+            False,
+        ]
+
+        with self.assertNumQueries(4):
+            WebhookDeliveryWorker.record(worker._results)
+        failed = HookDelivery.objects.get()
+        assert failed.target == "http://failing"
+        assert failed.attempts == 1
+        assert failed.error == "HTTP 500"
+        assert failed.next_attempt is not None
+
+    def test_record_subscription_stats(self, _mock_log):
+        self.queue()
+        delivery = HookDelivery.objects.get()
+
+        WebhookDeliveryWorker.record([(delivery, None)])
+        subscription = Subscription.objects.get(pk=self.subscription.pk)
+        assert subscription.last_sent_date is not None
+        assert subscription.error_count == 0
+
+        for _attempt in range(3):
+            self.queue()
+            delivery = HookDelivery.objects.latest("id")
+            delivery.attempts = 2
+            WebhookDeliveryWorker.record([(delivery, Exception("Failed"))])
+        subscription = Subscription.objects.get(pk=self.subscription.pk)
+        assert subscription.last_error_date is not None
+        assert subscription.error_count == 3
+        assert subscription.subscription_expiry is not None
+        # given up deliveries are removed
+        assert not HookDelivery.objects.exists()
+
+    def test_circuit_breaker(self, _mock_log):
+        for idx in range(HOOK_CIRCUIT_FAILURES + 1):
+            self.queue("http://failing", {"id": idx})
+
+        worker = self.deliver(HookDelivery.objects.all(), {"http://failing": 503})
+        assert len(worker._session.calls) == HOOK_CIRCUIT_FAILURES
+        assert isinstance(worker._results[-1][1], CircuitOpen)
+        assert worker.target("http://failing").is_busy()
+
+        WebhookDeliveryWorker.record(worker._results[-1:])
+        deferred = HookDelivery.objects.latest("id")
+        assert deferred.attempts == 0
+        assert deferred.next_attempt is not None
+
+
+class TargetState_TestCase(TestCase):
+    def test_throttle(self):
+        state = TargetState(rate=20)
+        loop = asyncio.get_event_loop()
+        start = time.monotonic()
+        for _request in range(20):
+            loop.run_until_complete(state.throttle())
+        assert time.monotonic() - start < 0.04
+        loop.run_until_complete(state.throttle())
+        assert time.monotonic() - start >= 0.04
+
+    def test_circuit_closes_after_reset(self):
+        state = TargetState()
+        for _attempt in range(HOOK_CIRCUIT_FAILURES):
+            state.record(False)
+        assert state.is_open()
+
+        state.open_until = 0
+        assert not state.is_open()
+        state.record(False)
+        assert state.is_open()
@@ -0,0 +1,82 @@
+from unittest.mock import call, patch
+
+from django.test import TestCase
+from subscriptions.dispatcher import (
+    HOOK_DISPATCH_MAX_ATTEMPTS,
+    HOOK_EVENT,
+    dispatch,
+    resolve_topic_status,
+)
+from subscriptions.models import HookableCredential
+
+
+class HookDispatcher_TestCase(TestCase):
+    def queue(self, corp_num, topic_status="Stream", **kwargs):
+        return HookableCredential.objects.create(
+            corp_num=corp_num, topic_status=topic_status, credential_type="ctype"
+        )
+
+    def test_resolve_topic_status(self):
+        HookableCredential.objects.create(
+            corp_num="BC0000001", topic_status="New", dispatched=True
+        )
+        credentials = [
+            self.queue("BC0000001"),
+            self.queue("BC0000002"),
+            self.queue("BC0000002"),
+            self.queue("BC0000003", "New"),
+            self.queue("BC0000003"),
+        ]
+
+        changed = resolve_topic_status(credentials)
+        assert changed == [credentials[1]]
+        assert [credential.topic_status for credential in credentials] == [
+            "Stream",
+            "New",
+            "Stream",
+            "New",
+            "Stream",
+        ]
+
+    @patch("subscriptions.dispatcher.find_and_fire_hook", autospec=True)
+    def test_dispatch(self, mock_find_and_fire_hook):
+        credentials = [self.queue(f"BC000000{idx}") for idx in range(3)]
+        mock_find_and_fire_hook.side_effect = [None, Exception("Invalid"), None]
+
+        assert dispatch(2) == 2
+        assert mock_find_and_fire_hook.call_args_list == [
+            call(HOOK_EVENT, credentials[0]),
+            call(HOOK_EVENT, credentials[1]),
+        ]
+        assert (
+            HookableCredential.objects.get(pk=credentials[0].pk).topic_status == "New"
+        )
+
+        assert dispatch(2) == 1
+        assert dispatch(2) == 0
+        # the failed credential is kept, and retried once its delay has passed
+        failed = HookableCredential.objects.get(dispatched=False)
+        assert failed.pk == credentials[1].pk
+        assert failed.attempts == 1
+        assert failed.error == "Invalid"
+        assert failed.next_attempt is not None
+
+        mock_find_and_fire_hook.side_effect = None
+        HookableCredential.objects.update(next_attempt=None)
+        assert dispatch(2) == 1
+        assert not HookableCredential.objects.filter(dispatched=False).exists()
+
+    @patch("subscriptions.dispatcher.find_and_fire_hook", autospec=True)
+    def test_dispatch_gives_up(self, mock_find_and_fire_hook):
+        credential = self.queue("BC0000001")
+        mock_find_and_fire_hook.side_effect = Exception("Invalid")
+
+        for _attempt in range(HOOK_DISPATCH_MAX_ATTEMPTS):
+            HookableCredential.objects.update(next_attempt=None)
+            assert dispatch() == 1
+        credential = HookableCredential.objects.get(pk=credential.pk)
+        assert not credential.dispatched
+        assert credential.attempts == HOOK_DISPATCH_MAX_ATTEMPTS
+        assert credential.next_attempt is None
+        # given up credentials are kept, but not dispatched again
+        assert dispatch() == 0
@@ -162,10 +162,12 @@ class HookUtils_FindAndFireHook_TestCase(TestCase):
 
         mock_is_reg_valid.return_value = True
 
-        with self.assertRaises(Exception):
-            instance = HookableCredential(topic_status="Invalid")
+        # subscriptions of an invalid type are skipped
+        instance = HookableCredential(topic_status="Invalid")
 
-            hook_utils.find_and_fire_hook(self.event_name + "-invalid", instance)
+        hook_utils.find_and_fire_hook(self.event_name + "-invalid", instance)
+
+        mock_is_reg_valid.assert_not_called()
 
     @patch("subscriptions.hook_utils.is_registration_valid", autospec=True)
     @patch("subscriptions.models.CredentialHook.deliver_hook", autospec=True)
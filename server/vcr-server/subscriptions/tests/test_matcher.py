@@ -0,0 +1,123 @@
+import datetime
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from subscriptions.matcher import (
+    HOOK_SUBSCRIPTION_REFRESH_INTERVAL,
+    SubscriptionMatcher,
+    subscription_matcher,
+)
+from subscriptions.models import CredentialHook, HookableCredential, Subscription
+
+from api.v2.models import CredentialType, Issuer, Schema
+
+
+class SubscriptionMatcher_TestCase(TestCase):
+    event_name = "hookable_cred.added"
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            username="user1", DID="not:a:did:123"
+        )
+        issuer = Issuer.objects.create(did="not:a:did:456", name="Test Issuer")
+        schema = Schema.objects.create(
+            name="registration.registries.ca",
+            version="0.0.1",
+            origin_did="not:a:did:456",
+        )
+        self.credType = CredentialType.objects.create(schema=schema, issuer=issuer)
+
+        self.newhook = self.subscribe("New")
+        self.streamhook = self.subscribe(
+            "Stream", topic_source_id="BC0000001", credential_type=self.credType
+        )
+        self.topichook = self.subscribe("Topic", topic_source_id="BC0000001")
+        # subscriptions to other topics
+        for idx in range(2, 10):
+            self.subscribe("Topic", topic_source_id=f"BC000000{idx}")
+
+    def subscribe(self, subscription_type, **kwargs):
+        hook = CredentialHook.objects.create(
+            user_id=self.user.id, event=self.event_name, target="http://target"
+        )
+        Subscription.objects.create(
+            hook=hook,
+            subscription_type=subscription_type,
+            owner_id=self.user.id,
+            **kwargs,
+        )
+        return hook
+
+    def test_match(self):
+        matcher = SubscriptionMatcher()
+        new = HookableCredential(
+            topic_status="New",
+            corp_num="BC0000001",
+            credential_type="registration.registries.ca",
+        )
+        assert matcher.match(self.event_name, new) == [
+            self.newhook,
+            self.streamhook,
+            self.topichook,
+        ]
+
+        with self.assertNumQueries(0):
+            stream = HookableCredential(
+                topic_status="Stream",
+                corp_num="BC0000001",
+                credential_type="other.schema",
+            )
+            assert matcher.match(self.event_name, stream) == [self.topichook]
+            other = HookableCredential(topic_status="Stream", corp_num="BC0000099")
+            assert matcher.match(self.event_name, other) == []
+        assert matcher.match("other.event", other) == []
+
+    def test_serialize_matched_hook(self):
+        matcher = SubscriptionMatcher()
+        instance = HookableCredential(topic_status="Stream", corp_num="BC0000002")
+        (hook,) = matcher.match(self.event_name, instance)
+
+        # the payload is built from the subscription loaded by the matcher
+        with self.assertNumQueries(0):
+            payload = instance.serialize_hook(hook)
+        assert payload["subscription"]["topic_id"] == "BC0000002"
+        assert payload["subscription"]["owner"] == "user1"
+
+    def test_subscription_changes_invalidate(self):
+        matcher = SubscriptionMatcher()
+        instance = HookableCredential(topic_status="Stream", corp_num="BC0000099")
+        assert matcher.match(self.event_name, instance) == []
+
+        hook = self.subscribe("Topic", topic_source_id="BC0000099")
+        assert matcher.match(self.event_name, instance) == [hook]
+
+        # delivery bookkeeping doesn't reload the index
+        subscription = Subscription.objects.get(hook=hook)
+        subscription.error_count = 1
+        subscription.save(update_fields=["error_count", "update_timestamp"])
+        with self.assertNumQueries(0):
+            assert matcher.match(self.event_name, instance) == [hook]
+
+        subscription.subscription_expiry = datetime.date.today()
+        subscription.save()
+        assert matcher.match(self.event_name, instance) == []
+
+        hook.is_active = False
+        hook.save()
+        subscription.subscription_expiry = None
+        subscription.save()
+        assert matcher.match(self.event_name, instance) == []
+
+    def test_refresh_interval(self):
+        matcher = SubscriptionMatcher()
+        instance = HookableCredential(topic_status="Stream", corp_num="BC0000099")
+        assert matcher.match(self.event_name, instance) == []
+
+        # changed by a process that doesn't share the cache
+        with patch.object(subscription_matcher, "invalidate"):
+            hook = self.subscribe("Topic", topic_source_id="BC0000099")
+        assert matcher.match(self.event_name, instance) == []
+
+        matcher._loaded -= HOOK_SUBSCRIPTION_REFRESH_INTERVAL
+        assert matcher.match(self.event_name, instance) == [hook]
@@ -1,12 +1,26 @@
 import logging
 import os
+import socket
 import threading
+import time
+from collections import Counter
 from enum import Enum
+from urllib.parse import urlsplit
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
 
 from .models.CredentialHookStats import CredentialHookStats
+from .models.HookLatencyStats import HookLatencyStats
 
 LOGGER = logging.getLogger(__name__)
 
+# seconds between saving the webhook stats of a worker
+HOOK_STATS_FLUSH_INTERVAL = float(os.getenv("HOOK_STATS_FLUSH_INTERVAL") or 10)
+# upper bounds of the webhook latency histogram buckets, in seconds
+HOOK_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
 
 class HookStep(Enum):
     FIRST_ATTEMPT = "first_attempt"
@@ -18,36 +32,149 @@ class TooManyRetriesException(Exception):
     pass
 
 
-def log_webhook_execution_result(success, hook_step=None, json_data=None):
+STEP_COUNTS = {
+    HookStep.FIRST_ATTEMPT: ("attempt_count", "total_count"),
+    HookStep.RETRY: ("retry_count", "total_count"),
+    HookStep.RETRY_FAIL: ("retry_fail_count",),
+}
 
-    worker_name = os.environ["CELERY_WORKER_NAME"]
-    if worker_name is None:
-        LOGGER.warning(
-            "No name set for current worker, falling back to using OS-assigned thread ID"
-        )
-        worker_name = threading.get_native_id()
 
-    # Store stats for current worker
-    current_stats = (
-        CredentialHookStats.objects.filter(worker_id=worker_name).first()
-        or CredentialHookStats(worker_id=worker_name)
-    )
+def worker_name() -> str:
+    return os.environ.get("CELERY_WORKER_NAME") or socket.gethostname()
+
+
+def target_host(url: str) -> str:
+    """Latency is reported by host, target urls may include tokens"""
+    parts = urlsplit(url)
+    if parts.port:
+        return f"{parts.hostname}:{parts.port}"
+    return parts.hostname or ""
+
+
+def add_counts(model, lookup: dict, counts: dict, **values):
+    """
+    Add to the counters of a stats row, creating it if needed; concurrent
+    workers can update the same row
+    """
+    updates = {field: F(field) + count for field, count in counts.items()}
+    if model.objects.filter(**lookup).update(**updates, **values):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **counts)
+    except IntegrityError:
+        # created by another worker in the meantime
+        model.objects.filter(**lookup).update(**updates, **values)
+
+
+class HookStats:
+    """
+    Webhook delivery counts and latency histograms of this process, added to
+    the stats tables at most every HOOK_STATS_FLUSH_INTERVAL seconds
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        # (target host, bucket) -> [count, total time]
+        self._latency = {}
+        self._flushed = time.monotonic()
 
-    if success is False or hook_step is HookStep.FIRST_ATTEMPT:
-        current_stats.attempt_count = current_stats.attempt_count + 1
-        current_stats.total_count = current_stats.total_count + 1
-    elif success is False and hook_step is HookStep.RETRY:
-        current_stats.retry_count = current_stats.retry_count + 1
-        current_stats.total_count = current_stats.total_count + 1
-    elif success is False and hook_step is HookStep.RETRY_FAIL:
-        current_stats.retry_fail_count = current_stats.retry_fail_count + 1
-    elif success is False and hook_step is None:
-        current_stats.fail_count = current_stats.fail_count + 1
-    elif success is True:
-        current_stats.success_count = current_stats.success_count + 1
-    else:
-        LOGGER.warning(
-            f"Unexpected argument combination: success={success}, hook_step={hook_step}"
+    def count(self, success, hook_step=None):
+        if success is True:
+            fields = ("success_count",)
+        elif hook_step is None:
+            fields = ("fail_count",)
+        else:
+            fields = STEP_COUNTS[hook_step]
+        with self._lock:
+            self._counts.update(fields)
+
+    def observe(self, url: str, seconds: float):
+        bucket = next(le for le in HOOK_LATENCY_BUCKETS if seconds <= le)
+        key = (target_host(url), bucket)
+        with self._lock:
+            entry = self._latency.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def is_due(self) -> bool:
+        return bool(self._counts or self._latency) and (
+            time.monotonic() - self._flushed >= HOOK_STATS_FLUSH_INTERVAL
         )
 
-    current_stats.save()
+    def maybe_flush(self):
+        if self.is_due():
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            latency, self._latency = self._latency, {}
+            self._flushed = time.monotonic()
+        if not counts and not latency:
+            return
+        worker_id = worker_name()
+        try:
+            with transaction.atomic():
+                if counts:
+                    add_counts(
+                        CredentialHookStats,
+                        {"worker_id": worker_id},
+                        counts,
+                        update_timestamp=timezone.now(),
+                    )
+                for (target, le), (count, total_time) in latency.items():
+                    add_counts(
+                        HookLatencyStats,
+                        {"worker_id": worker_id, "target": target, "le": le},
+                        {"count": count, "total_time": total_time},
+                        update_timestamp=timezone.now(),
+                    )
+        except Exception:
+            LOGGER.exception("Error saving webhook stats")
+            # keep the counts for the next attempt
+            with self._lock:
+                self._counts.update(counts)
+                for key, (count, total_time) in latency.items():
+                    entry = self._latency.setdefault(key, [0, 0.0])
+                    entry[0] += count
+                    entry[1] += total_time
+
+
+hook_stats = HookStats()
+
+
+def log_webhook_execution_result(success, hook_step=None, json_data=None):
+    hook_stats.count(success, hook_step)
+    hook_stats.maybe_flush()
+
+
+def hook_stats_report() -> dict:
+    """The saved webhook stats of each worker, and latency by target host"""
+    report = {}
+    for item in CredentialHookStats.objects.all():
+        report[f"web_hook.worker_stats.{item.worker_id}"] = {
+            "total_count": item.total_count,
+            "attempt_count": item.attempt_count,
+            "success_count": item.success_count,
+            "fail_count": item.fail_count,
+            "retry_count": item.retry_count,
+            "retry_fail_count": item.retry_fail_count,
+        }
+    latency = (
+        HookLatencyStats.objects.values("target", "le")
+        .annotate(count=Sum("count"), total_time=Sum("total_time"))
+        .order_by("target", "le")
+    )
+    for row in latency:
+        stats = report.setdefault(
+            f"web_hook.latency.{row['target']}",
+            {"total_count": 0, "total_time": 0.0, "avg_time": 0.0, "buckets": {}},
+        )
+        bucket = "+Inf" if row["le"] == float("inf") else str(row["le"])
+        stats["buckets"][bucket] = row["count"]
+        stats["total_count"] += row["count"]
+        stats["total_time"] += row["total_time"]
+        stats["avg_time"] = stats["total_time"] / stats["total_count"]
+    return report
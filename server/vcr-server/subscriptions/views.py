@@ -129,6 +129,18 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
       "target_url": "http://echo-app:8000/api/echo",
       "hook_token": "ashdkjahsdkjhaasd88a7d9a8sd9asasda"
     }
+
+    Subscriptions with a batch_size receive up to batch_size credentials per
+    call, waiting at most batch_interval milliseconds for a batch to fill up:
+
+    {
+      "subscription": {...},
+      "sequence": 42,
+      "data": [{...}, {...}]
+    }
+
+    Batches are numbered in sequence per subscription; a batch may be
+    delivered more than once, or out of order.
     """
 
     serializer_class = SubscriptionSerializer
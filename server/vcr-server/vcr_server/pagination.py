@@ -1,9 +1,13 @@
+import binascii
 import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from collections import OrderedDict
 
-from django.core.paginator import Paginator
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.conf import settings
 
 LOGGER = logging.getLogger(__name__)
@@ -31,6 +35,153 @@ class EnhancedPageNumberPagination(PageNumberPagination):
         )
 
 
+class SearchPaginator(Paginator):
+    """
+    Fetches the requested page before counting the results: the search
+    backend returns the number of hits with each page, so no separate count
+    query is made
+    """
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        bottom = (number - 1) * self.per_page
+        results = list(self.object_list[bottom : bottom + self.per_page])
+        if number > self.num_pages:
+            raise EmptyPage("That page contains no results")
+        return self._get_page(results, number, self)
+
+
+class SearchPagination(EnhancedPageNumberPagination):
+    """
+    Page number pagination for search results, with a cursor mode for crawling
+    deep result sets. Pass cursor=* for the first page and follow the next
+    links; pages are fetched with a Solr cursorMark, sorted by the requested
+    ordering and then by document id. The total is only returned when
+    count=true.
+    """
+
+    django_paginator_class = SearchPaginator
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    cursor = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            self.cursor = None
+            return super(SearchPagination, self).paginate_queryset(
+                queryset, request, view
+            )
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(cursor)
+        results, self.next_cursor, self.total = self.cursor_page(
+            queryset, self.cursor, self.page_size
+        )
+        return results
+
+    def cursor_page(self, queryset, cursor, page_size):
+        """
+        Fetch the page of results following the cursor mark; returns the
+        results, the mark of the next page (None on the last page) and the
+        total number of results.
+        """
+        query = queryset.query._clone()
+        # a cursor needs a sort on the unique key to break ties
+        order_by = list(query.order_by) or ["-score"]
+        if not {"id", "-id"}.intersection(order_by):
+            query.order_by = order_by + ["id"]
+        query.set_limits(0, page_size)
+
+        backend = query.backend
+        query_string = query.build_query()
+        search_kwargs = query.build_params()
+        raw_results = backend.conn.search(
+            query_string,
+            cursorMark=cursor,
+            **backend.build_search_kwargs(query_string, **search_kwargs),
+        )
+        results = backend._process_results(
+            raw_results,
+            highlight=search_kwargs.get("highlight"),
+            result_class=search_kwargs.get("result_class"),
+        )["results"]
+        # decided before loading the objects, a page with stale hits is not
+        # the last page
+        next_cursor = getattr(raw_results, "nextCursorMark", None)
+        if len(results) < page_size or next_cursor == cursor:
+            next_cursor = None
+        if queryset._load_all:
+            results = self.load_objects(queryset, results)
+        return results, next_cursor, raw_results.hits
+
+    @staticmethod
+    def load_objects(queryset, results):
+        """Attach the model objects to the results, skipping deleted ones"""
+        pks = OrderedDict()
+        for result in results:
+            pks.setdefault(result.model, []).append(result.pk)
+        objects = {
+            model: queryset._load_model_objects(model, model_pks)
+            for model, model_pks in pks.items()
+        }
+        loaded = []
+        for result in results:
+            model_objects = objects[result.model]
+            if model_objects:
+                pk = type(next(iter(model_objects)))(result.pk)
+                if pk in model_objects:
+                    result._object = model_objects[pk]
+                    loaded.append(result)
+        return loaded
+
+    def encode_cursor(self, cursor):
+        return urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, encoded):
+        if encoded == "*":
+            return encoded
+        try:
+            return urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8")
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.cursor is None:
+            return super(SearchPagination, self).get_next_link()
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_cursor),
+        )
+
+    def get_previous_link(self):
+        if self.cursor is None:
+            return super(SearchPagination, self).get_previous_link()
+        # cursors only move forward
+        return None
+
+    def get_paginated_response(self, data):
+        if self.cursor is None:
+            return super(SearchPagination, self).get_paginated_response(data)
+        response = OrderedDict([("page_size", self.page_size)])
+        if self.request.query_params.get(self.count_query_param) == "true":
+            response["total"] = self.total
+        response["next"] = self.get_next_link()
+        response["results"] = data
+        return Response(response)
+
+
 class NullDjangoPaginator(Paginator):
     @property
     def count(self):
@@ -147,6 +147,18 @@ CONN_MAX_AGE = CREDS_BATCH_SIZE = int(os.getenv("CONN_MAX_AGE", "0"))
 if CONN_MAX_AGE < 0:
     CONN_MAX_AGE = None
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Configure a shared backend (e.g. memcached) to share cached lookups between workers
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND")
+        or "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
@@ -346,8 +358,11 @@ if custom_settings_file.exists():
 # authenticate REST hook services so only the subscriber can view/update their subscriptions
 AUTHENTICATION_BACKENDS = ["subscriptions.icatrestauth.IcatAuthBackend"]
 
-# wrapper function that delivers the web hook (passes the task to a rabbitmq worker)
-HOOK_DELIVERER = "subscriptions.tasks.deliver_hook_wrapper"
+# function that delivers the web hook - queues it for the async delivery worker,
+# or "subscriptions.tasks.deliver_hook_wrapper" to pass it to a rabbitmq worker
+HOOK_DELIVERER = (
+    os.getenv("HOOK_DELIVERER") or "subscriptions.delivery.queue_delivery"
+)
 
 # data model that triggers hooks to be sent - when a new record is added it triggers the hook services to run
 HOOK_CUSTOM_MODEL = "subscriptions.models.CredentialHook"
@@ -355,10 +370,11 @@ HOOK_CUSTOM_MODEL = "subscriptions.models.CredentialHook"
 # for hook events, checks the credential against the subscriptions to see which hooks to fire
 HOOK_FINDER = "subscriptions.hook_utils.find_and_fire_hook"
 
-# how to monitor for events - look for "created" events
+# hook events - "hookable_cred.added" is fired by subscriptions.dispatcher for
+# each credential queued in the hookable credential outbox, not on save
 HOOK_EVENTS = {
     # 'any.event.name': 'App.Model.Action' (created/updated/deleted)
-    "hookable_cred.added": "subscriptions.HookableCredential.created+"
+    "hookable_cred.added": None
 }
 
 # celery settings
@@ -0,0 +1,111 @@
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs, urlparse
+
+from django.core.paginator import EmptyPage
+from django.test import TestCase
+from haystack.models import SearchResult
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from vcr_server.pagination import SearchPagination, SearchPaginator
+
+
+class RawResults:
+    def __init__(self, ids, next_cursor, hits):
+        self.ids = ids
+        self.nextCursorMark = next_cursor
+        self.hits = hits
+
+
+class SearchPagination_TestCase(TestCase):
+    def setUp(self):
+        self.query = MagicMock(order_by=["-score"])
+        self.query._clone.return_value = self.query
+        self.query.build_query.return_value = "*:*"
+        self.query.build_params.return_value = {"start_offset": 0, "end_offset": 2}
+        self.backend = self.query.backend
+        self.backend.build_search_kwargs.side_effect = lambda query, **kwargs: {
+            "sort": ", ".join(
+                f"{field[1:]} desc" if field.startswith("-") else f"{field} asc"
+                for field in self.query.order_by
+            )
+        }
+        self.backend._process_results.side_effect = lambda raw, **kwargs: {
+            "results": [
+                SearchResult("api_v2", "topic", object_id, 1.0) for object_id in raw.ids
+            ]
+        }
+        self.queryset = MagicMock(query=self.query, _load_all=False)
+
+    def paginate(self, params, raw_results):
+        self.backend.conn.search.return_value = raw_results
+        paginator = SearchPagination()
+        request = Request(APIRequestFactory().get("/search/topic", params))
+        results = paginator.paginate_queryset(self.queryset, request)
+        return (
+            results,
+            paginator.get_paginated_response([result.pk for result in results]).data,
+        )
+
+    def test_cursor_pages(self):
+        results, data = self.paginate(
+            {"cursor": "*", "page_size": 2}, RawResults(["1", "2"], "AoE=", 5)
+        )
+        self.backend.conn.search.assert_called_once_with(
+            "*:*", cursorMark="*", sort="score desc, id asc"
+        )
+        assert data["results"] == ["1", "2"]
+        assert "total" not in data
+        cursor = parse_qs(urlparse(data["next"]).query)["cursor"][0]
+
+        _, data = self.paginate(
+            {"cursor": cursor, "page_size": 2, "count": "true"},
+            RawResults(["3"], "AoE=", 5),
+        )
+        assert self.backend.conn.search.call_args[1]["cursorMark"] == "AoE="
+        assert data["results"] == ["3"]
+        assert data["total"] == 5
+        assert data["next"] is None
+
+    def test_cursor_page_with_stale_hit(self):
+        self.queryset._load_all = True
+        # the database row of hit 2 is gone
+        self.queryset._load_model_objects.side_effect = lambda model, pks: {
+            pk: object() for pk in pks if pk != "2"
+        }
+        results, data = self.paginate(
+            {"cursor": "*", "page_size": 2}, RawResults(["1", "2"], "AoE=", 5)
+        )
+        assert data["results"] == ["1"]
+        assert data["next"] is not None
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(NotFound):
+            self.paginate({"cursor": "not a cursor"}, RawResults([], None, 0))
+
+
+class SearchResults:
+    """Results that can only be counted once a page has been fetched"""
+
+    def __init__(self, hits):
+        self.hits = hits
+        self.fetched = False
+
+    def __getitem__(self, k):
+        self.fetched = True
+        return list(range(self.hits))[k]
+
+    def count(self):
+        assert self.fetched, "counted before fetching the page"
+        return self.hits
+
+
+class SearchPaginator_TestCase(TestCase):
+    def test_page_is_fetched_before_counting(self):
+        page = SearchPaginator(SearchResults(5), 2).page("2")
+        assert list(page) == [2, 3]
+        assert page.paginator.count == 5
+
+        with self.assertRaises(EmptyPage):
+            SearchPaginator(SearchResults(5), 2).page(4)
@@ -0,0 +1,245 @@
+from unittest.mock import MagicMock, patch
+
+from django.db import transaction
+from django.test import TestCase
+from pysolr import SolrError
+
+from api.v2.models.SolrDeadLetter import SolrDeadLetter
+from api.v2.models.SolrQueueItem import SolrQueueItem
+from api.v2.search_indexes import CredentialIndex
+from vcr_server.utils.solrqueue import (
+    AdaptiveBatchSize,
+    DatabaseQueueStore,
+    MemoryQueueStore,
+    SolrQueue,
+    queue_partition,
+    redrive_dead_letters,
+)
+
+
+class SolrQueue_TestCase(TestCase):
+    def test_database_store_claim(self):
+        store = DatabaseQueueStore()
+        store.put(CredentialIndex, None, [1, 9], 0)
+        store.put(CredentialIndex, None, [1], 1)
+        assert store.qsize() == 3
+
+        # 1 and 9 share a partition, so all three rows are claimed in order
+        with store.claim(10) as items:
+            assert [item[:4] for item in items] == [
+                (CredentialIndex, None, "1", 0),
+                (CredentialIndex, None, "9", 0),
+                (CredentialIndex, None, "1", 1),
+            ]
+        assert store.qsize() == 0
+
+    def test_database_store_claim_leases_rows(self):
+        store = DatabaseQueueStore()
+        store.put(CredentialIndex, None, [1, 9], 0)
+        savepoints = list(transaction.get_connection().savepoint_ids)
+
+        with store.claim(10) as items:
+            # the rows are indexed outside of the claiming transaction
+            assert transaction.get_connection().savepoint_ids == savepoints
+            assert len(items) == 2
+            assert store.pending()[0] == 0
+            with store.claim(10) as others:
+                assert others == []
+        assert store.qsize() == 0
+
+    def test_database_store_keeps_order_behind_retry(self):
+        store = DatabaseQueueStore()
+        store.put(CredentialIndex, None, [1], 1)
+        with store.claim(10) as (item,):
+            store.fail(item, Exception("Bad document"))
+        store.put(CredentialIndex, None, [1, 9], 0)
+
+        # the update of 1 waits for the earlier removal to be retried
+        with store.claim(10) as items:
+            assert [item[:4] for item in items] == [(CredentialIndex, None, "9", 0)]
+
+        SolrQueueItem.objects.update(next_attempt=None)
+        with store.claim(10) as items:
+            assert [item[:4] for item in items] == [
+                (CredentialIndex, None, "1", 1),
+                (CredentialIndex, None, "1", 0),
+            ]
+
+    def test_database_store_claim_failure_keeps_items(self):
+        store = DatabaseQueueStore()
+        store.put(CredentialIndex, None, [1, 9, 17], 0)
+
+        try:
+            with store.claim(2) as items:
+                assert [item[:4] for item in items] == [
+                    (CredentialIndex, None, "1", 0),
+                    (CredentialIndex, None, "9", 0),
+                ]
+                raise Exception("Solr is down")
+        except Exception:
+            pass
+        assert store.qsize() == 3
+        # the lease is released
+        assert store.pending()[0] == 3
+
+    def test_memory_store_claims_one_partition_per_worker(self):
+        store = MemoryQueueStore()
+        store.put(CredentialIndex, None, [1, 2, 9], 0)
+
+        with store.claim(10) as first:
+            with store.claim(10) as second:
+                with store.claim(10) as third:
+                    assert queue_partition(1) == queue_partition(9)
+                    assert [item.object_id for item in first] == [1, 9]
+                    assert [item.object_id for item in second] == [2]
+                    assert third == []
+        assert store.qsize() == 0
+
+    @patch("vcr_server.utils.solrqueue.MAX_LATENCY", 0)
+    @patch.object(SolrQueue, "remove")
+    @patch.object(SolrQueue, "update")
+    def test_drain_applies_last_operation_per_id(self, mock_update, mock_remove):
+        queue = SolrQueue("database")
+        queue.add(CredentialIndex, None, [MagicMock(id=1), MagicMock(id=9)])
+        queue.delete(CredentialIndex, None, [MagicMock(id=1)])
+        queue._drain()
+
+        mock_update.assert_called_once_with(CredentialIndex, None, {"9"})
+        mock_remove.assert_called_once_with(CredentialIndex, None, {"1"})
+        assert queue.qsize() == 0
+        assert not queue.isactive()
+        assert queue.stats()["solr_queue.worker_stats.0"]["item_count"] == 3
+
+    @patch("vcr_server.utils.solrqueue.MAX_LATENCY", 0)
+    @patch("vcr_server.utils.solrqueue.bump_index_generation")
+    @patch.object(SolrQueue, "update")
+    def test_drain_bumps_index_generation(self, mock_update, mock_bump):
+        queue = SolrQueue("memory")
+        mock_update.side_effect = SolrError("Failed to connect to server at solr")
+        queue.add(CredentialIndex, None, [MagicMock(id=1)])
+        queue._drain()
+        mock_bump.assert_not_called()
+
+        mock_update.side_effect = None
+        queue._unavailable_until = 0.0
+        queue.add(CredentialIndex, None, [MagicMock(id=9)])
+        queue._drain()
+        mock_bump.assert_called_once_with()
+
+    def test_index_queues_once_per_transaction(self):
+        queue = MagicMock(transactional=True)
+        index = CredentialIndex()
+        instance = MagicMock(id=1)
+        with patch.object(CredentialIndex, "_backend_queue", queue):
+            with transaction.atomic():
+                index.update_object(instance)
+                index.update_object(instance)
+                assert queue.add.call_count == 1
+
+                # rows queued in a rolled back savepoint must be queued again
+                try:
+                    with transaction.atomic():
+                        index.update_object(MagicMock(id=2))
+                        raise Exception("rollback")
+                except Exception:
+                    pass
+                index.update_object(MagicMock(id=2))
+                assert queue.add.call_count == 3
+
+                # an atomic block without a savepoint is the same transaction
+                with transaction.atomic(savepoint=False):
+                    index.update_object(MagicMock(id=2))
+                assert queue.add.call_count == 3
+
+                index.remove_object(instance)
+                queue.delete.assert_called_once_with(CredentialIndex, None, [instance])
+                assert SolrQueueItem.objects.count() == 0
+
+    @patch("vcr_server.utils.solrqueue.MAX_LATENCY", 60)
+    @patch.object(SolrQueue, "update")
+    def test_drain_waits_for_partial_batch(self, mock_update):
+        queue = SolrQueue("memory")
+        queue.add(CredentialIndex, None, [MagicMock(id=1)])
+
+        next_due = queue._drain()
+        assert 0 < next_due <= 60
+        mock_update.assert_not_called()
+        assert queue.qsize() == 1
+
+    def test_adaptive_batch_size(self):
+        batch_size = AdaptiveBatchSize(minimum=10, maximum=1000, target_time=1.0)
+        assert batch_size.size == 10
+
+        # fast updates grow the batch up to the max
+        batch_size.record(10, 0.01)
+        assert batch_size.size == 1000
+        assert batch_size.limit(depth=400, workers=4) == 100
+        assert batch_size.limit(depth=5, workers=4) == 10
+
+        # slow updates shrink it
+        for _ in range(20):
+            batch_size.record(100, 5.0)
+        assert batch_size.size == 20
+
+        assert not batch_size.due(depth=0, oldest_age=100)
+        assert batch_size.due(depth=20, oldest_age=0)
+
+    @patch("vcr_server.utils.solrqueue.MAX_LATENCY", 0)
+    @patch("vcr_server.utils.solrqueue.MAX_ATTEMPTS", 2)
+    @patch.object(SolrQueue, "update")
+    def test_drain_isolates_failing_ids(self, mock_update):
+        def update(index_cls, using, ids):
+            if "17" in ids:
+                raise Exception("Bad document")
+
+        mock_update.side_effect = update
+        queue = SolrQueue("database")
+        queue.add(CredentialIndex, None, [MagicMock(id=i) for i in (1, 9, 17, 25)])
+        queue._drain()
+
+        # the batch is split until only the bad id fails, then it is retried later
+        indexed = set().union(*(call[0][2] for call in mock_update.call_args_list))
+        assert {"1", "9", "25"} <= indexed
+        retry = SolrQueueItem.objects.get()
+        assert (retry.object_id, retry.attempts) == ("17", 1)
+        assert retry.next_attempt is not None
+        assert queue.stats()["solr_queue.worker_stats.0"]["fail_count"] == 1
+
+        # on its last attempt the item is moved to the dead letters
+        SolrQueueItem.objects.update(next_attempt=None)
+        queue._drain()
+        assert SolrQueueItem.objects.count() == 0
+        letter = SolrDeadLetter.objects.get()
+        assert (letter.object_id, letter.attempts, letter.error) == (
+            "17",
+            2,
+            "Bad document",
+        )
+
+        assert redrive_dead_letters() == 1
+        assert SolrDeadLetter.objects.count() == 0
+        assert SolrQueueItem.objects.get().object_id == "17"
+
+    @patch("vcr_server.utils.solrqueue.MAX_LATENCY", 0)
+    @patch.object(SolrQueue, "update")
+    def test_drain_retries_batch_when_solr_is_unavailable(self, mock_update):
+        mock_update.side_effect = SolrError("Failed to connect to server at solr")
+        queue = SolrQueue("memory")
+        queue.add(CredentialIndex, None, [MagicMock(id=i) for i in (1, 9, 17)])
+        delay = queue._drain()
+
+        # the batch is released without counting an attempt, and the workers wait
+        assert delay > 0
+        assert mock_update.call_count == 1
+        assert queue.qsize() == 3
+        assert queue._store.pending()[0] == 3
+        (pending,) = queue._store._partitions.values()
+        assert [item.attempts for _queued_at, item in pending] == [0, 0, 0]
+
+        assert 0 < queue._drain() <= delay
+        assert mock_update.call_count == 1
+
+        # the pause doubles while Solr stays unavailable
+        queue._unavailable_until = 0.0
+        assert queue._drain() == 2 * delay
+        assert mock_update.call_count == 2
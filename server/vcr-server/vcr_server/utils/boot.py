@@ -49,10 +49,9 @@ def run_django(proc, *args) -> asyncio.Future:
 def run_reindex():
     from django.core.management import call_command
 
+    # only records updated since the last completed run are reindexed
     batch_size = os.getenv("SOLR_BATCH_SIZE", 500)
-    call_command(
-        "update_index", "--max-retries=5", "--batch-size={}".format(batch_size)
-    )
+    call_command("incremental_reindex", "--batch-size={}".format(batch_size))
 
 
 def run_migration():
@@ -68,6 +67,9 @@ async def add_server_headers(request, response):
 
 
 app_solrqueue = None
+app_credential_store = None
+app_hook_dispatcher = None
+app_hook_delivery = None
 
 
 async def connect_agent():
@@ -129,8 +131,14 @@ async def init_app(on_startup=None, on_cleanup=None, on_shutdown=None):
     from aiohttp.web import Application
     from aiohttp_wsgi import WSGIHandler
     from vcr_server.utils.solrqueue import SolrQueue
+    from agent_webhooks.utils.credential_store import CredentialStoreDispatcher
+    from subscriptions.delivery import WebhookDeliveryWorker
+    from subscriptions.dispatcher import HookDispatcher
 
     global app_solrqueue
+    global app_credential_store
+    global app_hook_dispatcher
+    global app_hook_delivery
 
     wsgi_handler = WSGIHandler(application)
     app = Application()
@@ -140,6 +148,15 @@ async def init_app(on_startup=None, on_cleanup=None, on_shutdown=None):
     app_solrqueue = SolrQueue()
     app_solrqueue.setup(app=app)
 
+    app_credential_store = CredentialStoreDispatcher()
+    app_credential_store.setup(app=app)
+
+    app_hook_dispatcher = HookDispatcher()
+    app_hook_dispatcher.setup(app=app)
+
+    app_hook_delivery = WebhookDeliveryWorker()
+    app_hook_delivery.setup(app=app)
+
     if on_startup:
         app.on_startup.append(on_startup)
     if on_cleanup:
@@ -1,47 +1,532 @@
 import logging
 import os
+import random
 import threading
-from queue import Empty, Full, Queue
+import time
+import heapq
+import zlib
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from math import ceil
 
+from datetime import timedelta
+
+from api.v2.models.SolrDeadLetter import SolrDeadLetter
+from api.v2.models.SolrQueueItem import SolrQueueItem
 from api.v2.search.index import TxnAwareSearchIndex
-from haystack.utils import get_identifier
+from api.v4.search.cache import bump_index_generation
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Count, Exists, Min, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from haystack.utils import get_model_ct
+from pysolr import SolrError
 
 LOGGER = logging.getLogger(__name__)
 
 
+# failing documents are retried and then dead-lettered; these settings only
+# apply to unexpected errors in the queue itself, e.g. losing the database
 # this will kill the vcr-api process
-RTI_ABORT_ON_ERRORS = os.getenv("RTI_ABORT_ON_ERRORS", "TRUE").upper()
+RTI_ABORT_ON_ERRORS = os.getenv("RTI_ABORT_ON_ERRORS", "FALSE").upper()
 ABORT_ON_ERRORS = RTI_ABORT_ON_ERRORS == "TRUE"
 # this will re-raise errors, which will kill the indexing thread
 RTI_RAISE_ERRORS = os.getenv("RTI_RAISE_ERRORS", "FALSE").upper()
 RAISE_ERRORS = RTI_RAISE_ERRORS == "TRUE"
 # if both of the above are false, indexing errors will be ignored
 
-# number of seconds to wait when solr queue is empty before retry
+# max number of seconds to wait when solr queue is empty before checking again
 RTI_WAIT_TIME = os.getenv("RTI_WAIT_TIME", "5")
 WAIT_TIME = int(RTI_WAIT_TIME)
 
-# max number of items to trigger an update to the solr index
-RTI_MAX_SOLR_BATCH = os.getenv("RTI_MAX_SOLR_BATCH", "25")
+# max number of seconds an item should wait in the queue before it is indexed;
+# smaller batches are flushed once their oldest item reaches this age
+RTI_MAX_LATENCY = os.getenv("RTI_MAX_LATENCY", "2")
+MAX_LATENCY = float(RTI_MAX_LATENCY)
+
+# target number of seconds for a single update to the solr index; batch sizes
+# are adjusted between the min and max to match the observed indexing rate
+RTI_TARGET_BATCH_TIME = os.getenv("RTI_TARGET_BATCH_TIME", "2")
+TARGET_BATCH_TIME = float(RTI_TARGET_BATCH_TIME)
+
+# min and max number of items in an update to the solr index
+RTI_MIN_SOLR_BATCH = os.getenv("RTI_MIN_SOLR_BATCH", "25")
+MIN_SOLR_BATCH = int(RTI_MIN_SOLR_BATCH)
+RTI_MAX_SOLR_BATCH = os.getenv("RTI_MAX_SOLR_BATCH", "500")
 MAX_SOLR_BATCH = int(RTI_MAX_SOLR_BATCH)
 
+# where pending index items are kept until they are indexed:
+#   "database" - the solr_queue table, written in the same transaction as the
+#                indexed records; survives restarts and is shared by replicas
+#   "memory"   - an in-process queue; pending items are lost if the process exits
+RTI_QUEUE_BACKEND = (os.getenv("RTI_QUEUE_BACKEND") or "database").lower()
 
-class SolrQueue:
-    is_active = False
+# number of worker threads draining the queue
+RTI_WORKERS = os.getenv("RTI_WORKERS") or "4"
+WORKERS = int(RTI_WORKERS)
+
+# queued ids are spread over this many partitions per index class; a partition
+# is only drained by one worker at a time, which keeps the order of updates
+# and deletes for any single id
+RTI_QUEUE_PARTITIONS = os.getenv("RTI_QUEUE_PARTITIONS") or "8"
+QUEUE_PARTITIONS = int(RTI_QUEUE_PARTITIONS)
+
+# number of times a failing item is tried before it is moved to the dead
+# letter table, and the backoff between tries (doubling up to the max)
+RTI_MAX_ATTEMPTS = os.getenv("RTI_MAX_ATTEMPTS") or "8"
+MAX_ATTEMPTS = int(RTI_MAX_ATTEMPTS)
+RTI_RETRY_DELAY = os.getenv("RTI_RETRY_DELAY") or "5"
+RETRY_DELAY = float(RTI_RETRY_DELAY)
+RTI_MAX_RETRY_DELAY = os.getenv("RTI_MAX_RETRY_DELAY") or "600"
+MAX_RETRY_DELAY = float(RTI_MAX_RETRY_DELAY)
+
+# number of seconds claimed rows are hidden from other workers; if a worker
+# dies part way through a batch its rows are picked up again after this
+RTI_QUEUE_LEASE = os.getenv("RTI_QUEUE_LEASE") or "300"
+QUEUE_LEASE = float(RTI_QUEUE_LEASE)
+
+
+QueuedItem = namedtuple("QueuedItem", "index_cls using object_id delete attempts ref")
+
+
+class SolrUnavailable(Exception):
+    pass
+
+
+def queue_partition(object_id):
+    """Partition number for a queued id."""
+    try:
+        return int(object_id) % QUEUE_PARTITIONS
+    except (TypeError, ValueError):
+        return zlib.crc32(str(object_id).encode()) % QUEUE_PARTITIONS
+
+
+def index_path(index_cls):
+    return "{}.{}".format(index_cls.__module__, index_cls.__qualname__)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next try of an item that failed attempts times."""
+    return min(MAX_RETRY_DELAY, max(RETRY_DELAY, 1.0) * 2 ** (attempts - 1))
+
+
+def dead_letter(item, attempts, error):
+    LOGGER.error(
+        "Giving up on Solr queue item after %d attempt(s); Class: %s, Id: %s, Delete: %s: %s",
+        attempts, item.index_cls, item.object_id, item.delete, error,
+    )
+    SolrDeadLetter.objects.create(
+        index_cls=index_path(item.index_cls),
+        using=item.using,
+        object_id=str(item.object_id),
+        remove=bool(item.delete),
+        attempts=attempts,
+        error=str(error),
+    )
+
+
+def redrive_dead_letters(ids=None):
+    """
+    Move dead letters (all of them, or the given ids) back onto the Solr queue.
+    Returns the number of items requeued.
+    """
+    queue = TxnAwareSearchIndex._backend_queue
+    store = queue._store if queue else DatabaseQueueStore()
+    with transaction.atomic():
+        letters = SolrDeadLetter.objects.select_for_update()
+        if ids is not None:
+            letters = letters.filter(id__in=ids)
+        letters = list(letters)
+        grouped = {}
+        for letter in letters:
+            grouped.setdefault(
+                (letter.index_cls, letter.using, letter.remove), []
+            ).append(letter.object_id)
+        for (index_cls, using, remove), object_ids in grouped.items():
+            store.put(import_string(index_cls), using, object_ids, 1 if remove else 0)
+        SolrDeadLetter.objects.filter(id__in=[letter.id for letter in letters]).delete()
+    LOGGER.info("Requeued %d dead letter(s) for Solr indexing", len(letters))
+    return len(letters)
+
+
+class MemoryQueueStore:
+    """Keeps pending index items in in-process queues, one per partition."""
+
+    durable = False
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self._partitions = {}
+        self._claimed = set()
+        # (not before, sequence, entry) of items waiting to be retried
+        self._retries = []
+        self._retry_seq = 0
+
+    def qsize(self):
+        with self._lock:
+            return sum(
+                len(pending) for pending in self._partitions.values()
+            ) + len(self._retries)
+
+    def pending(self):
+        """Number of queued items and the age in seconds of the oldest one."""
+        with self._lock:
+            depth = sum(len(pending) for pending in self._partitions.values())
+            oldest = min(
+                (pending[0][0] for pending in self._partitions.values() if pending),
+                default=None,
+            )
+        return depth, (time.monotonic() - oldest if oldest is not None else 0.0)
+
+    def put(self, index_cls, using, ids, delete):
+        queued_at = time.monotonic()
+        with self._lock:
+            for object_id in ids:
+                key = (index_cls, using, queue_partition(object_id))
+                self._partitions.setdefault(key, deque()).append(
+                    (queued_at, QueuedItem(index_cls, using, object_id, delete, 0, None))
+                )
+
+    def _release_retries(self):
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now:
+            _not_before, _seq, entry = heapq.heappop(self._retries)
+            item = entry[1]
+            key = (item.index_cls, item.using, queue_partition(item.object_id))
+            self._partitions.setdefault(key, deque()).append(entry)
+
+    def fail(self, item, error):
+        """Schedule a failed item for another try, or dead-letter it."""
+        attempts = item.attempts + 1
+        if attempts >= MAX_ATTEMPTS:
+            dead_letter(item, attempts, error)
+            return
+        with self._lock:
+            self._retry_seq += 1
+            heapq.heappush(
+                self._retries,
+                (
+                    time.monotonic() + retry_delay(attempts),
+                    self._retry_seq,
+                    (time.monotonic(), item._replace(attempts=attempts)),
+                ),
+            )
+
+    @contextmanager
+    def claim(self, limit):
+        """
+        Pop up to limit items from a partition no other worker is draining,
+        putting them back at the front of the partition if processing fails.
+        """
+        key = None
+        entries = []
+        with self._lock:
+            self._release_retries()
+            for candidate in list(self._partitions):
+                if candidate not in self._claimed:
+                    key = candidate
+                    self._claimed.add(key)
+                    # rotate the partition to the back so others get a turn
+                    pending = self._partitions.pop(key)
+                    while pending and len(entries) < limit:
+                        entries.append(pending.popleft())
+                    if pending:
+                        self._partitions[key] = pending
+                    break
+        try:
+            yield [item for _queued_at, item in entries]
+        except Exception:
+            LOGGER.info("Requeueing items for later processing ...")
+            with self._lock:
+                self._partitions.setdefault(key, deque()).extendleft(reversed(entries))
+            raise
+        finally:
+            if key is not None:
+                with self._lock:
+                    self._claimed.discard(key)
+
+
+class DatabaseQueueStore:
+    """
+    Keeps pending index items in the solr_queue table.
+
+    Each batch is claimed from a single (index class, partition) guarded by a
+    Postgres advisory lock, so any number of workers and replicas can drain the
+    same table without reordering operations on an id. Claimed rows are leased
+    in a short transaction and only deleted once they have been sent to Solr;
+    if the process dies part way through a batch the rows are picked up again
+    when the lease expires.
+    """
+
+    durable = True
+
+    def qsize(self):
+        return SolrQueueItem.objects.count()
+
+    def ready(self):
+        """
+        Queued rows that are not waiting for a retry or leased, and that have
+        no earlier row for the same id waiting, so operations on an id are
+        applied in order.
+        """
+        now = timezone.now()
+        waiting = SolrQueueItem.objects.filter(
+            index_cls=OuterRef("index_cls"),
+            object_id=OuterRef("object_id"),
+            id__lt=OuterRef("id"),
+            next_attempt__gt=now,
+        )
+        return (
+            SolrQueueItem.objects.filter(
+                Q(next_attempt__isnull=True) | Q(next_attempt__lte=now)
+            )
+            .annotate(earlier_waiting=Exists(waiting))
+            .filter(earlier_waiting=False)
+        )
+
+    def pending(self):
+        """Number of queued rows and the age in seconds of the oldest one."""
+        pending = self.ready().order_by().aggregate(
+            depth=Count("id"), oldest=Min("create_timestamp")
+        )
+        if not pending["oldest"]:
+            return pending["depth"], 0.0
+        return pending["depth"], (timezone.now() - pending["oldest"]).total_seconds()
+
+    def put(self, index_cls, using, ids, delete):
+        index_cls_path = index_path(index_cls)
+        SolrQueueItem.objects.bulk_create(
+            [
+                SolrQueueItem(
+                    index_cls=index_cls_path,
+                    using=using,
+                    object_id=str(object_id),
+                    partition=queue_partition(object_id),
+                    remove=bool(delete),
+                )
+                for object_id in ids
+            ]
+        )
+
+    def partitions(self):
+        """Partitions with pending rows, in random order to spread out workers."""
+        keys = list(
+            self.ready()
+            .order_by()
+            .values_list("index_cls", "partition")
+            .distinct()
+        )
+        random.shuffle(keys)
+        return keys
+
+    def lock_key(self, index_path, partition):
+        return zlib.crc32("solr_queue:{}:{}".format(index_path, partition).encode())
+
+    def try_lock(self, index_path, partition):
+        if connection.vendor != "postgresql":
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_lock(%s)", [self.lock_key(index_path, partition)]
+            )
+            return cursor.fetchone()[0]
+
+    def unlock(self, index_path, partition):
+        if connection.vendor != "postgresql":
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_unlock(%s)", [self.lock_key(index_path, partition)]
+            )
+
+    def fail(self, item, error):
+        """Schedule a failed row for another try, or dead-letter it."""
+        attempts = item.attempts + 1
+        if attempts >= MAX_ATTEMPTS:
+            # the row is deleted with the rest of the batch
+            dead_letter(item, attempts, error)
+            return
+        SolrQueueItem.objects.filter(id=item.ref).update(
+            attempts=attempts,
+            next_attempt=timezone.now() + timedelta(seconds=retry_delay(attempts)),
+        )
+
+    @contextmanager
+    def claim(self, limit):
+        """
+        Lease up to limit rows from one partition, deleting them once processed
+        unless they were scheduled for a retry. No transaction is held while
+        the rows are indexed.
+        """
+        locked = None
+        try:
+            with transaction.atomic():
+                rows = []
+                for index_cls_path, partition in self.partitions():
+                    if not self.try_lock(index_cls_path, partition):
+                        continue
+                    locked = (index_cls_path, partition)
+                    rows = list(
+                        self.ready()
+                        .select_for_update(skip_locked=True)
+                        .filter(index_cls=index_cls_path, partition=partition)
+                        .order_by("id")[:limit]
+                    )
+                    if rows:
+                        break
+                    self.unlock(index_cls_path, partition)
+                    locked = None
+                ids = [row.id for row in rows]
+                # retried rows are scheduled at another time
+                leased_until = timezone.now() + timedelta(seconds=QUEUE_LEASE)
+                if rows:
+                    SolrQueueItem.objects.filter(id__in=ids).update(
+                        next_attempt=leased_until
+                    )
+            leased = SolrQueueItem.objects.filter(id__in=ids, next_attempt=leased_until)
+            try:
+                yield [
+                    QueuedItem(
+                        import_string(row.index_cls),
+                        row.using,
+                        row.object_id,
+                        1 if row.remove else 0,
+                        row.attempts,
+                        row.id,
+                    )
+                    for row in rows
+                ]
+            except Exception:
+                # release the rows to be picked up again in order
+                if rows:
+                    leased.update(next_attempt=None)
+                raise
+            if rows:
+                leased.delete()
+        finally:
+            if locked:
+                self.unlock(*locked)
+
+
+QUEUE_STORES = {
+    "database": DatabaseQueueStore,
+    "memory": MemoryQueueStore,
+}
+
+
+class AdaptiveBatchSize:
+    """
+    Sizes Solr update batches from the observed indexing time per item, so a
+    single update takes about TARGET_BATCH_TIME seconds.
+    """
+
+    # weight of the latest batch in the moving average of time per item
+    SMOOTHING = 0.3
+
+    def __init__(self, minimum=None, maximum=None, target_time=None):
+        self.minimum = minimum or MIN_SOLR_BATCH
+        self.maximum = max(maximum or MAX_SOLR_BATCH, self.minimum)
+        self.target_time = target_time or TARGET_BATCH_TIME
+        self.item_time = None
+        self.size = self.minimum
+
+    def record(self, item_count, elapsed):
+        if not item_count:
+            return
+        item_time = elapsed / item_count
+        if self.item_time is None:
+            self.item_time = item_time
+        else:
+            self.item_time += self.SMOOTHING * (item_time - self.item_time)
+        if self.item_time > 0:
+            size = int(self.target_time / self.item_time)
+        else:
+            size = self.maximum
+        self.size = max(self.minimum, min(self.maximum, size))
+
+    def limit(self, depth, workers=1):
+        """Batch size to claim, sharing a large queue between the workers."""
+        return max(self.minimum, min(self.size, ceil(depth / max(workers, 1))))
+
+    def due(self, depth, oldest_age):
+        """A batch is due once it is full or its oldest item has waited long enough."""
+        return depth > 0 and (depth >= self.size or oldest_age >= MAX_LATENCY)
+
+
+class WorkerStats:
+    """Throughput counters for one Solr queue worker."""
+
+    def __init__(self):
+        self.batch_count = 0
+        self.item_count = 0
+        self.fail_count = 0
+        self.busy_time = 0.0
+
+    def record(self, item_count, elapsed, fail_count=0):
+        self.batch_count += 1
+        self.busy_time += elapsed
+        self.item_count += item_count - fail_count
+        self.fail_count += fail_count
+
+    def dict(self):
+        return {
+            "batch_count": self.batch_count,
+            "item_count": self.item_count,
+            "fail_count": self.fail_count,
+            "busy_time": self.busy_time,
+            "items_per_second": (
+                self.item_count / self.busy_time if self.busy_time else 0.0
+            ),
+        }
+
+
+class SolrQueue:
+    def __init__(self, queue_backend=None, workers=None):
         LOGGER.info("Initializing Solr queue ...")
-        self._queue = Queue()
+        queue_backend = queue_backend or RTI_QUEUE_BACKEND
+        if queue_backend not in QUEUE_STORES:
+            raise ValueError("Unknown Solr queue backend: {}".format(queue_backend))
+        LOGGER.info("Using the %s Solr queue backend.", queue_backend)
+        self._store = QUEUE_STORES[queue_backend]()
+        self._workers = workers or WORKERS
         self._prev_queue = None
         self._stop = threading.Event()
-        self._thread = None
+        self._threads = []
         self._trigger = threading.Event()
+        self._active = set()
+        # pause of all workers while Solr is unavailable
+        self._unavailable_delay = 0.0
+        self._unavailable_until = 0.0
+        self.worker_stats = {}
+        self.batch_sizes = {}
+
+    @property
+    def transactional(self):
+        """Items are written as part of the caller's transaction and survive restarts."""
+        return self._store.durable
+
+    @property
+    def is_active(self):
+        return bool(self._active)
 
     def isactive(self):
-        return (self.is_active or not self._queue.empty())
+        if self._store.durable:
+            # pending items stay in the table for the next run or another replica
+            return self.is_active
+        return (self.is_active or self._store.qsize() > 0)
 
     def qsize(self):
-        return self._queue.qsize()
+        return self._store.qsize()
+
+    def stats(self):
+        """Per-worker throughput, keyed for the status endpoint."""
+        return {
+            f"solr_queue.worker_stats.{worker_id}": {
+                **stats.dict(),
+                "batch_size": self.batch_sizes[worker_id].size,
+            }
+            for worker_id, stats in sorted(self.worker_stats.items())
+        }
 
     def add(self, index_cls, using, instances):
         ids = [instance.id for instance in instances]
@@ -49,23 +534,15 @@ class SolrQueue:
         # The record ids are not indexed so they are not searchable.
         # wallet_ids = [instance.credential_id for instance in instances]
         LOGGER.debug("Adding items to Solr queue for indexing; Class: %s, Using: %s", index_cls, using)
-        try:
-            self._queue.put((index_cls, using, ids, 0))
-        except Full:
-            LOGGER.error("Can't add items to the Solr queue because it is full")
-            raise
+        self._store.put(index_cls, using, ids, 0)
 
     def delete(self, index_cls, using, instances):
-        ids = [get_identifier(instance) for instance in instances]
+        ids = [instance.id for instance in instances]
         # Log the wallet_id to make it easy to search for the credentials when troubleshooting
         # The record ids are not indexed so they are not searchable.
         # wallet_ids = [instance.credential_id for instance in instances]
         LOGGER.debug("Deleteing items from Solr queue/index; Class: %s, Using: %s", index_cls, using)
-        try:
-            self._queue.put((index_cls, using, ids, 1))
-        except Full:
-            LOGGER.error("Can't delete items from the Solr queue because it is full")
-            raise
+        self._store.put(index_cls, using, ids, 1)
 
     def setup(self, app=None):
         LOGGER.info("Setting up Solr queue ...")
@@ -97,91 +574,125 @@ class SolrQueue:
         TxnAwareSearchIndex._backend_queue = self._prev_queue
 
     def start(self):
-        LOGGER.info("Starting Solr queue ...")
-        self._thread = threading.Thread(target=self._run)
-        self._thread.start()
+        LOGGER.info("Starting Solr queue with %d worker(s) ...", self._workers)
+        self._threads = [
+            threading.Thread(target=self._run, args=(worker_id,), name=f"solrqueue-{worker_id}")
+            for worker_id in range(self._workers)
+        ]
+        for thread in self._threads:
+            thread.start()
 
     def stop(self, join=True):
         LOGGER.info("Stoping Solr queue ...")
-        if not self._queue.empty():
-            LOGGER.error("The Solr queue is not empty, there are about %s items that will not be indexed", self._queue.qsize())
+        if not self._store.durable and self._store.qsize() > 0:
+            LOGGER.error("The Solr queue is not empty, there are about %s items that will not be indexed", self._store.qsize())
         self._stop.set()
         self._trigger.set()
         if join:
-            self._thread.join()
+            for thread in self._threads:
+                thread.join()
 
     def trigger(self):
         LOGGER.info("Triggering Solr queue ...")
         self._trigger.set()
 
-    def _run(self):
-        LOGGER.info("Running Solr queue ...")
+    def _run(self, worker_id=0):
+        LOGGER.info("Running Solr queue worker %d ...", worker_id)
+        # check an idle queue often enough to honour the max latency
+        wait_time = min(WAIT_TIME, MAX_LATENCY / 2)
         while True:
-            LOGGER.debug("Waiting [%d] ...", WAIT_TIME)
-            self._trigger.wait(WAIT_TIME)
-            self._drain()
+            LOGGER.debug("Waiting [%.2f] ...", wait_time)
+            self._trigger.wait(wait_time)
+            next_due = self._drain(worker_id)
+            wait_time = min(WAIT_TIME, MAX_LATENCY / 2)
+            if next_due is not None:
+                wait_time = min(wait_time, next_due)
             if self._stop.is_set():
                 LOGGER.info("Finished running Solr queue ...")
                 return
 
-
     def index_type(self, index_cls, delete, using):
         """String representing the index class type."""
         if not index_cls:
             return None
         return ("delete" if delete == 1 else "update") + "::" + str(index_cls) + "::" + str(using)
 
+    def _back_off(self):
+        """
+        Pause all workers after Solr was found unavailable, doubling the pause
+        up to the max retry delay; returns the number of seconds to wait.
+        """
+        self._unavailable_delay = min(
+            MAX_RETRY_DELAY, max(self._unavailable_delay * 2, RETRY_DELAY, 1.0)
+        )
+        self._unavailable_until = time.monotonic() + self._unavailable_delay
+        return self._unavailable_delay
+
+    def _drain(self, worker_id=0):
+        """
+        Index batches until the queue holds no full or overdue batch. Returns
+        the number of seconds until the oldest waiting item is due, if any.
 
-    def _drain(self):
+        When Solr is unavailable the batch is released untouched and every
+        worker waits before trying again, so the items keep their order and
+        are not dead-lettered by an outage.
+        """
         LOGGER.debug("Indexing Solr queue items ...")
         global RAISE_ERRORS
         global ABORT_ON_ERRORS
-        last_ids = {}
+        stats = self.worker_stats.setdefault(worker_id, WorkerStats())
+        batch_size = self.batch_sizes.setdefault(worker_id, AdaptiveBatchSize())
         try:
-            self.is_active = True
+            self._active.add(worker_id)
+            # the worker thread keeps its own database connection between runs
+            close_old_connections()
             while True:
-                try:
-                    index_cls, using, ids, delete = self._queue.get_nowait()
-                    LOGGER.debug("Pop items off the Solr queue for indexing; Class: %s, Using: %s, Delete: %s, Instances: %s", index_cls, using, delete, ids)
-                except Empty:
-                    LOGGER.debug("Solr queue is empty ...")
-                    index_cls = None
-                    delete = 0
-                    using = None
-                index_cls_type = self.index_type(index_cls, delete, using)
-                if index_cls:
-                    LOGGER.debug("Updating list of ids for [%s]..." % index_cls_type)
-                    if not index_cls_type in last_ids:
-                        last_ids[index_cls_type] = {
-                            "index_cls": index_cls,
-                            "delete": delete,
-                            "using": using,
-                            "ids": set(),
-                        }
-                    last_ids[index_cls_type]["ids"].update(ids)
-                for attr, val in last_ids.items():
-                    if (not index_cls) or MAX_SOLR_BATCH <= len(val["ids"]):
-                        LOGGER.debug("Processing %s items for [%s]", len(val["ids"]), attr)
+                if self._stop.is_set() and self._store.durable:
+                    # queued rows are kept for the next start or another replica
+                    return None
+                paused = self._unavailable_until - time.monotonic()
+                if paused > 0:
+                    LOGGER.debug("Waiting [%.2f] for Solr to be available ...", paused)
+                    return paused
+                depth, oldest_age = self._store.pending()
+                if not depth:
+                    LOGGER.debug("Done indexing items from Solr queue ...")
+                    return None
+                # flush everything left in memory when stopping
+                if not self._stop.is_set() and not batch_size.due(depth, oldest_age):
+                    LOGGER.debug("Waiting for more items; %d queued ...", depth)
+                    return MAX_LATENCY - oldest_age
+                limit = batch_size.limit(depth, self._workers)
+                while True:
+                    with self._store.claim(limit) as items:
+                        if not items:
+                            break
+                        start = time.perf_counter()
                         try:
-                            if val["delete"] == 1:
-                                self.remove(val["index_cls"], val["using"], val["ids"])
-                            else:
-                                self.update(val["index_cls"], val["using"], val["ids"])
-                            last_ids[attr]["ids"] = set()
-                        except:
-                            LOGGER.exception("An unexpected exception was encountered while processing items from the Solr queue.", exc_info=True)
-                            LOGGER.info("Requeueing items for later processing ...")
-                            try:
-                                self._queue.put( (val["index_cls"], val["using"], val["ids"], val["delete"]) )
-                            except Full:
-                                LOGGER.error("Can't requeue items to the Solr queue because it is full; %s", val["ids"])
-                                raise
+                            failed = self._process(items)
+                        except Exception:
+                            stats.record(len(items), time.perf_counter() - start, len(items))
                             raise
+                        for item, error in failed:
+                            self._store.fail(item, error)
+                        if len(failed) < len(items):
+                            # updates are committed, cached search responses are stale
+                            bump_index_generation()
+                        elapsed = time.perf_counter() - start
+                        stats.record(len(items), elapsed, len(failed))
+                        self._unavailable_delay = 0.0
+                        if not failed:
+                            batch_size.record(len(items), elapsed)
+                    if len(items) < limit:
+                        break
+                if not items:
+                    # the remaining items are being indexed by other workers
+                    return None
 
-                if not index_cls:
-                    LOGGER.debug("Done indexing items from Solr queue ...")
-                    break
-
+        except SolrUnavailable as e:
+            delay = self._back_off()
+            LOGGER.error("Solr is unavailable, pausing the Solr queue for %.0f seconds: %s", delay, e)
+            return delay
         except Exception as e:
             LOGGER.error("Error processing real-time index queue: %s", str(e))
             if ABORT_ON_ERRORS:
@@ -192,7 +703,63 @@ class SolrQueue:
                 raise
             # if both of the above are false, indexing errors will be ignored
         finally:
-            self.is_active = False
+            self._active.discard(worker_id)
+
+    def _process(self, items):
+        """
+        Apply the last queued operation for each id, merged by index class.
+        Returns the (item, error) pairs that could not be indexed; raises
+        SolrUnavailable if Solr can't be reached.
+        """
+        latest = {}
+        for item in items:
+            latest[(item.index_cls, item.using, str(item.object_id))] = item
+        last_ids = {}
+        for (index_cls, using, object_id), item in latest.items():
+            index_cls_type = self.index_type(index_cls, item.delete, using)
+            if not index_cls_type in last_ids:
+                last_ids[index_cls_type] = {
+                    "index_cls": index_cls,
+                    "delete": item.delete,
+                    "using": using,
+                    "items": {},
+                }
+            last_ids[index_cls_type]["items"][object_id] = item
+        failed = []
+        for attr, val in last_ids.items():
+            LOGGER.debug("Processing %s items for [%s]", len(val["items"]), attr)
+            errors = self._index(val["index_cls"], val["using"], sorted(val["items"]), val["delete"])
+            failed.extend((val["items"][object_id], error) for object_id, error in errors.items())
+        return failed
+
+    def _index(self, index_cls, using, ids, delete):
+        """
+        Send a batch of ids to Solr. If the batch fails it is split in half
+        until the failing ids are isolated; returns a dict of id to error.
+        """
+        try:
+            if delete == 1:
+                self.remove(index_cls, using, set(ids))
+            else:
+                self.update(index_cls, using, set(ids))
+            return {}
+        except (DatabaseError, SolrUnavailable):
+            raise
+        except SolrError as e:
+            message = str(e)
+            if message.startswith("Failed to connect") or "timed out" in message:
+                # nothing will index until Solr is back, don't bisect
+                raise SolrUnavailable(message) from e
+            error = e
+        except Exception as e:
+            error = e
+        if len(ids) == 1:
+            LOGGER.warning("Failed to index Solr queue item; Class: %s, Id: %s: %s", index_cls, ids[0], error)
+            return {ids[0]: error}
+        middle = len(ids) // 2
+        errors = self._index(index_cls, using, ids[:middle], delete)
+        errors.update(self._index(index_cls, using, ids[middle:], delete))
+        return errors
 
     def update(self, index_cls, using, ids):
         LOGGER.debug("Updating the indexes for Solr queue items ...")
@@ -207,7 +774,7 @@ class SolrQueue:
             # LOGGER.debug("Index update complete.")
         else:
             LOGGER.error("Failed to get backend.  Unable to update the index for %d row(s) from the Solr queue: %s", len(ids), ids)
-            raise Exception("Failed to get backend.  Unable to update the index for Solr queue")
+            raise SolrUnavailable("Failed to get backend.  Unable to update the index for Solr queue")
 
     def remove(self, index_cls, using, ids):
         LOGGER.debug("Removing the indexes for Solr queue items ...")
@@ -219,9 +786,10 @@ class SolrQueue:
             backend.silently_fail = False
             # backend.remove has no support for a list of IDs
             if len(ids) > 0:
-                backend.conn.delete(id=ids)
+                model_ct = get_model_ct(index.get_model())
+                backend.conn.delete(id=["{}.{}".format(model_ct, object_id) for object_id in ids])
             else:
                 LOGGER.warning("No IDs provided for deletion from Solr queue, skipping.")
         else:
             LOGGER.error("Failed to get backend.  Unable to remove the indexes for %d row(s) from the solr queue: %s", len(ids), ids)
-            raise Exception("Failed to get backend.  Unable to remove the index for Solr queue")
+            raise SolrUnavailable("Failed to get backend.  Unable to remove the index for Solr queue")